@@ -1,4 +1,15 @@
 """BetterStock backend application package."""
-from .main import app
+from __future__ import annotations
+
+from typing import Any
 
 __all__ = ["app"]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported lazily so ``python -m app.worker`` does not build the API.
+    if name == "app":
+        from .main import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,19 @@
 """Database configuration using SQLAlchemy and SQLite for demo purposes."""
 from __future__ import annotations
 
+import logging
 import os
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
+from .models import Base
+from .services.search import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("BETTERSTOCK_DATABASE_URL", "sqlite:///./betterstock.db")
 
 engine = create_engine(
@@ -29,3 +36,46 @@ def session_scope():
         raise
     finally:
         session.close()
+
+
+def initialize_database(engine: Engine = engine) -> None:
+    """Create missing tables/columns/indexes and the search index; safe to run repeatedly."""
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _add_missing_indexes(engine)
+    ensure_search_index(engine)
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """Add nullable columns introduced after a table was first created.
+
+    ``create_all`` only creates missing tables, so databases created by an
+    older release would otherwise lack new columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable or column.primary_key:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _add_missing_indexes(engine: Engine) -> None:
+    """Create indexes declared after a table was first created (``create_all`` skips them)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                index.create(bind=conn, checkfirst=True)
+                logger.info("Added index %s on %s", index.name, table.name)
@@ -0,0 +1,166 @@
+"""Fast JSON responses for large list endpoints.
+
+Handlers that return thousands of rows encode plain dicts/lists straight to
+bytes (``orjson`` when installed, the standard library otherwise) and return a
+ready :class:`~starlette.responses.Response`, so FastAPI neither builds nor
+re-validates one Pydantic model per row. The ``response_model`` on the route
+still documents the shape.
+
+Bodies are compressed according to ``Accept-Encoding`` (brotli when the
+``brotli`` package is installed, else gzip) once they exceed
+``BETTERSTOCK_COMPRESS_MIN_BYTES``. :class:`PayloadCache` keeps the encoded and
+compressed variants of a payload derived from a cached object (a quote
+snapshot, a score list) so repeated requests only copy bytes, and answers
+``If-None-Match`` with ``304``.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Mapping
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore[assignment]
+
+COMPRESS_MIN_BYTES = int(os.getenv("BETTERSTOCK_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("BETTERSTOCK_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BETTERSTOCK_BROTLI_QUALITY", "5"))
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Unsupported type {type(value)!r}")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialise ``value`` to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Pick ``br`` or ``gzip`` from an ``Accept-Encoding`` header, honouring ``q=0``."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+@dataclass(slots=True)
+class EncodedPayload:
+    """An encoded JSON body plus lazily built compressed variants."""
+
+    body: bytes
+    etag: str | None = None
+    _variants: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def tagged(cls, body: bytes) -> "EncodedPayload":
+        return cls(body, etag='"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"')
+
+    def variant(self, encoding: str | None) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._variants.get(encoding)
+        if data is None:
+            data = self._variants[encoding] = compress(self.body, encoding)
+        return data
+
+
+def json_response(
+    request: Request,
+    payload: EncodedPayload | bytes,
+    headers: Mapping[str, str] | None = None,
+    status_code: int = 200,
+) -> Response:
+    """Build a JSON response for ``payload``, compressed as the client allows."""
+    if isinstance(payload, bytes):
+        payload = EncodedPayload(payload)
+    response_headers = dict(headers or {})
+    response_headers["Vary"] = "Accept-Encoding"
+    if payload.etag is not None:
+        response_headers["ETag"] = payload.etag
+        if request.headers.get("if-none-match") == payload.etag:
+            return Response(status_code=304, headers=response_headers)
+    encoding = negotiate(request.headers.get("accept-encoding")) if len(payload.body) >= COMPRESS_MIN_BYTES else None
+    if encoding is not None:
+        response_headers["Content-Encoding"] = encoding
+    return Response(
+        content=payload.variant(encoding),
+        status_code=status_code,
+        media_type=JSON_MEDIA_TYPE,
+        headers=response_headers,
+    )
+
+
+class PayloadCache:
+    """Keeps one encoded payload per key, valid while its source object is unchanged.
+
+    ``source`` is compared by identity: pass the cached object the payload is
+    derived from (e.g. the snapshot returned by the quote cache), so a new
+    snapshot naturally invalidates the entry.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, tuple[object, EncodedPayload]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, source: object, build: Callable[[], Any]) -> EncodedPayload:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is source:
+            return entry[1]
+        payload = EncodedPayload.tagged(dumps(build()))
+        with self._lock:
+            self._entries[key] = (source, payload)
+        return payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+PAYLOADS = PayloadCache()
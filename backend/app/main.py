@@ -1,17 +1,38 @@
-"""FastAPI entrypoint for BetterStock backend."""
+"""FastAPI entrypoint for BetterStock backend.
+
+Importing this module only builds the routes; the database is initialised and
+the scheduler (if embedded) started from the startup hook, and heavy modules
+(pandas, the crawler, Akshare) load on first use. Set
+``BETTERSTOCK_EMBEDDED_SCHEDULER=0`` when the jobs run in ``python -m app.worker``.
+"""
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+from dataclasses import asdict
+from typing import TYPE_CHECKING
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from .database import engine, initialize_database
+from .metrics import METRICS_ENABLED, REGISTRY, MetricsMiddleware
+from .profiling import LOOP_LAG_THRESHOLD, PROFILING_ENABLED, LoopLagMonitor, ProfilingMiddleware
+from .routers import analytics, backtest, export, market, news
+from .services.market import get_default_provider
+from .services.quote_cache import QUOTE_CACHE, DatabaseQuoteProvider
+from .services.streaming import QUOTE_STREAM
 
-from .database import engine
-from .routers import analytics, backtest, market, news
-from .tasks.scheduler import TaskScheduler, initialize_database
+if TYPE_CHECKING:  # pragma: no cover
+    from .tasks.leader import LeaderElector
+    from .tasks.scheduler import TaskScheduler
 
 logging.basicConfig(level=logging.INFO)
 
+EMBEDDED_SCHEDULER = os.getenv("BETTERSTOCK_EMBEDDED_SCHEDULER", "1").lower() not in ("0", "false", "no")
+
 app = FastAPI(title="BetterStock Platform", version="0.1.0")
 
 app.add_middleware(
@@ -20,24 +41,104 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Quotes-Stale-Since"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    from .routers import profiling
+
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiling.router)
 
 app.include_router(news.router)
 app.include_router(market.router)
 app.include_router(analytics.router)
 app.include_router(backtest.router)
+app.include_router(export.router)
 
-initialize_database(engine)
 _scheduler: TaskScheduler | None = None
+_elector: LeaderElector | None = None
+_follower_task: asyncio.Task | None = None
+_lag_monitor: LoopLagMonitor | None = None
+
+
+def _is_leader() -> bool:
+    return _elector is not None and _elector.is_leader
+
+
+def _become_leader() -> None:
+    """Scrape upstream and run the background jobs in this worker."""
+    QUOTE_CACHE.provider = get_default_provider()
+    if _scheduler is not None and not _scheduler.running:
+        _scheduler.start()
+
+
+def _become_follower() -> None:
+    """Stop the background jobs and serve quotes persisted by the leader."""
+    if _scheduler is not None:
+        _scheduler.shutdown()
+    QUOTE_CACHE.provider = DatabaseQuoteProvider()
+    QUOTE_CACHE.invalidate()
+
+
+async def _follow_quotes() -> None:
+    """Re-read persisted quotes so streaming clients of a follower still get updates."""
+    while True:
+        await asyncio.sleep(QUOTE_CACHE.ttl)
+        if _is_leader() or not QUOTE_STREAM.subscriber_count:
+            continue
+        try:
+            await QUOTE_CACHE.refresh()
+        except Exception:  # pragma: no cover - database unavailable
+            logging.getLogger(__name__).exception("Follower quote refresh failed")
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
-    global _scheduler
+    global _scheduler, _elector, _follower_task, _lag_monitor
+    if LOOP_LAG_THRESHOLD > 0:
+        _lag_monitor = LoopLagMonitor()
+        _lag_monitor.start()
+    await asyncio.to_thread(initialize_database, engine)
+    QUOTE_CACHE.provider = DatabaseQuoteProvider()
+    _follower_task = asyncio.get_running_loop().create_task(_follow_quotes())
+    if not EMBEDDED_SCHEDULER:
+        return
+    from .tasks.leader import LeaderElector
+    from .tasks.scheduler import TaskScheduler
+
     _scheduler = TaskScheduler()
-    _scheduler.start()
+    _elector = LeaderElector(on_elected=_become_leader, on_demoted=_become_follower)
+    _elector.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    if _follower_task is not None:
+        _follower_task.cancel()
+    if _lag_monitor is not None:
+        _lag_monitor.stop()
+    if _elector is not None:
+        await _elector.stop()
+    if _scheduler is not None:
+        _scheduler.shutdown()
 
 
 @app.get("/health")
 async def health() -> dict[str, str]:
-    return {"status": "ok"}
+    return {"status": "ok", "role": "leader" if _is_leader() else "follower"}
+
+
+@app.get("/scheduler/runs")
+async def scheduler_runs() -> list[dict]:
+    """Most recent scheduled job runs with duration and outcome, newest first."""
+    if _scheduler is None:
+        return []
+    return [asdict(run) for run in reversed(_scheduler.runs)]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Pipeline counters and latency histograms in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,280 @@
+"""In-process pipeline metrics exposed at ``/metrics`` in Prometheus text format.
+
+Counters and latency histograms are plain objects with a lock per metric, so
+they work from the event loop and from executor threads alike. Set
+``BETTERSTOCK_METRICS=0`` to disable them: updates then return immediately and
+the HTTP middleware is not installed.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+METRICS_ENABLED = os.getenv("BETTERSTOCK_METRICS", "1").lower() not in ("0", "false", "no")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+F = TypeVar("F", bound=Callable[..., Any])
+LabelKey = Tuple[str, ...]
+
+_NULL_TIMER = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def collect(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.collect())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_began")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, Any]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._histogram.observe(time.perf_counter() - self._began, **self._labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), sum, count.
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def time(self, **labels: Any) -> ContextManager[Any]:
+        """Context manager observing the wall time of its block."""
+        if not METRICS_ENABLED:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def timed(self, **labels: Any) -> Callable[[F], F]:
+        """Decorator observing the wall time of every call of a synchronous function."""
+
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[1][1]) if series else 0
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, (list(buckets), list(totals))) for key, (buckets, totals) in self._series.items())
+        for key, (buckets, (total, count)) in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += hits
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {int(count)}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+CRAWL_SECONDS = Histogram(
+    "betterstock_crawl_seconds", "Time spent per news source, by phase (fetch or parse).", ("source", "phase")
+)
+CRAWL_ITEMS = Counter("betterstock_crawl_items_total", "News items parsed per source.", ("source",))
+CRAWL_ERRORS = Counter("betterstock_crawl_errors_total", "Failed crawls per source.", ("source",))
+SENTIMENT_SECONDS = Histogram(
+    "betterstock_sentiment_seconds", "Latency of one sentiment analysis call.", ("provider",)
+)
+SENTIMENT_ERRORS = Counter("betterstock_sentiment_errors_total", "Failed sentiment calls.", ("provider",))
+SENTIMENT_BACKFILLED = Counter(
+    "betterstock_sentiment_backfilled_total", "Stored articles re-scored by the backfill job.", ("provider",)
+)
+DB_WRITE_SECONDS = Histogram("betterstock_db_write_seconds", "Time to write and commit one batch.", ("table",))
+DB_ROWS_WRITTEN = Counter("betterstock_db_rows_written_total", "Rows written in write batches.", ("table",))
+MARKET_REFRESH_SECONDS = Histogram(
+    "betterstock_market_refresh_seconds", "Time to fetch one quote snapshot.", ("provider",)
+)
+MARKET_REFRESH_ERRORS = Counter(
+    "betterstock_market_refresh_errors_total", "Failed quote snapshot fetches.", ("provider",)
+)
+MARKET_PROVIDER_SECONDS = Histogram(
+    "betterstock_market_provider_seconds", "Latency of successful calls per chained provider.", ("provider",)
+)
+MARKET_PROVIDER_CALLS = Counter(
+    "betterstock_market_provider_calls_total",
+    "Chained provider calls by outcome (ok, error, timeout, abandoned).",
+    ("provider", "outcome"),
+)
+MARKET_HEDGES = Counter(
+    "betterstock_market_hedges_total", "Hedged requests sent to a provider because an earlier one was slow.", ("provider",)
+)
+MARKET_STALE_SERVED = Counter(
+    "betterstock_market_stale_served_total", "Snapshots served from the last good fetch after all providers failed."
+)
+COMPUTE_SECONDS = Histogram(
+    "betterstock_compute_seconds", "Time spent in analytics computations.", ("stage",)
+)
+HTTP_REQUESTS = Counter(
+    "betterstock_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "betterstock_http_request_seconds", "HTTP request latency by route.", ("method", "route")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template."""
+
+    def __init__(self, app: Callable[..., Any]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        began = time.perf_counter()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - began, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+
+
+async def serve_metrics(host: str, port: int) -> asyncio.AbstractServer:
+    """Minimal HTTP listener answering every request with :data:`REGISTRY`.
+
+    Used by ``python -m app.worker``, which has no FastAPI app to mount
+    ``/metrics`` on.
+    """
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        body = REGISTRY.render().encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
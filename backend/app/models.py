@@ -1,10 +1,24 @@
 """SQLAlchemy ORM models for BetterStock platform."""
 from __future__ import annotations
 
+import json
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import Column, DateTime, Float, Integer, JSON, String, Table, Text, ForeignKey
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -19,6 +33,7 @@ news_stock_association = Table(
 
 class NewsArticle(Base):
     __tablename__ = "news_articles"
+    __table_args__ = (Index("ix_news_articles_published_at_id", "published_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     source = Column(String(128), index=True, nullable=False)
@@ -26,11 +41,59 @@ class NewsArticle(Base):
     url = Column(String(1024), unique=True, nullable=False)
     published_at = Column(DateTime, default=datetime.utcnow)
     summary = Column(String(1024), default="")
-    content = Column(Text)
-    raw_payload = Column(JSON, default={})
+    # Legacy inline storage; new rows keep bodies in ``content_blobs``.
+    _content = Column("content", Text)
+    _raw_payload = Column("raw_payload", JSON(none_as_null=True))
+    content_hash = Column(String(64), ForeignKey("content_blobs.hash"), index=True)
+    payload_hash = Column(String(64), ForeignKey("content_blobs.hash"))
 
     sentiments = relationship("SentimentScore", back_populates="article", cascade="all, delete-orphan")
     stocks = relationship("StockQuote", secondary=news_stock_association, back_populates="news")
+    content_blob = relationship("ContentBlob", foreign_keys=[content_hash])
+    payload_blob = relationship("ContentBlob", foreign_keys=[payload_hash])
+
+    @property
+    def content(self) -> str | None:
+        """Article body, decompressed on first access."""
+        if self.content_hash is not None and self.content_blob is not None:
+            return self.content_blob.text()
+        return self._content
+
+    @content.setter
+    def content(self, value: str | None) -> None:
+        self._content = value
+
+    @property
+    def raw_payload(self) -> dict:
+        if self.payload_hash is not None and self.payload_blob is not None:
+            return json.loads(self.payload_blob.text())
+        return self._raw_payload or {}
+
+    @raw_payload.setter
+    def raw_payload(self, value: dict | None) -> None:
+        self._raw_payload = value
+
+    def set_content(self, value: str | None, store) -> None:
+        self.content_blob = store.put_text(value)
+        self._content = None
+
+    def set_raw_payload(self, value: dict | None, store) -> None:
+        self.payload_blob = store.put_json(value)
+        self._raw_payload = None
+
+
+class ContentBlob(Base):
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False)
+    size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    def text(self) -> str:
+        from .services.content_store import decompress
+
+        return decompress(self.data, self.codec).decode("utf-8")
 
 
 class SentimentScore(Base):
@@ -39,9 +102,11 @@ class SentimentScore(Base):
     id = Column(Integer, primary_key=True)
     article_id = Column(Integer, ForeignKey("news_articles.id"), nullable=False, index=True)
     provider = Column(String(64), nullable=False)
+    model_version = Column(String(64), default="")
     sentiment = Column(Float, nullable=False)
     confidence = Column(Float, default=0.0)
-    metadata = Column(JSON, default={})
+    # ``metadata`` is reserved on declarative classes; the column keeps its name.
+    metadata_ = Column("metadata", JSON, default=dict)
 
     article = relationship("NewsArticle", back_populates="sentiments")
 
@@ -67,6 +132,19 @@ class StockQuote(Base):
     factors = relationship("IndustryFactor", back_populates="stock", cascade="all, delete-orphan")
 
 
+class QuoteBar(Base):
+    __tablename__ = "quote_bars"
+    __table_args__ = (UniqueConstraint("ticker", "trade_date", name="uq_quote_bars_ticker_date"),)
+
+    id = Column(Integer, primary_key=True)
+    ticker = Column(String(16), index=True, nullable=False)
+    trade_date = Column(DateTime, index=True, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, default=0.0)
+    amount = Column(Float, default=0.0)
+    turnover_rate = Column(Float, default=0.0)
+
+
 class IndustryFactor(Base):
     __tablename__ = "industry_factors"
 
@@ -80,6 +158,78 @@ class IndustryFactor(Base):
     stock = relationship("StockQuote", back_populates="factors")
 
 
+class IndustryStat(Base):
+    """Per-industry aggregates of one market snapshot; the input series of the industry z-scores."""
+
+    __tablename__ = "industry_stats"
+    __table_args__ = (UniqueConstraint("industry", "as_of", name="uq_industry_stats_industry_as_of"),)
+
+    id = Column(Integer, primary_key=True)
+    industry = Column(String(128), index=True, nullable=False)
+    as_of = Column(DateTime, index=True, nullable=False)
+    members = Column(Integer, default=0)
+    cap_return = Column(Float, default=0.0)
+    breadth = Column(Float, default=0.0)
+    turnover = Column(Float, default=0.0)
+    sentiment = Column(Float, default=0.0)
+
+
+class ArchiveWatermark(Base):
+    """Rows of ``name`` older than ``archived_before`` live in the Parquet archive."""
+
+    __tablename__ = "archive_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    archived_before = Column(DateTime, nullable=False)
+    rows = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SentimentBackfill(Base):
+    """Checkpoint of a re-scoring run: articles up to ``last_article_id`` are done."""
+
+    __tablename__ = "sentiment_backfills"
+
+    name = Column(String(160), primary_key=True)
+    provider = Column(String(64), nullable=False)
+    model_version = Column(String(64), default="")
+    last_article_id = Column(Integer, default=0)
+    articles_scored = Column(Integer, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+
+class SchedulerLease(Base):
+    """Time-limited lease naming the process that runs the background jobs."""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True)
+    holder = Column(String(128), nullable=False)
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class JobRequest(Base):
+    """Background job asked for through the API and run by the scheduler leader."""
+
+    __tablename__ = "job_requests"
+    __table_args__ = (Index("ix_job_requests_name_status", "name", "status"),)
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(64), nullable=False)
+    options = Column(JSON, default=dict)
+    status = Column(String(16), nullable=False, default="pending")
+    claimed_by = Column(String(128))
+    progress = Column(JSON, default=dict)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 class BacktestResult(Base):
     __tablename__ = "backtest_results"
 
@@ -91,5 +241,21 @@ class BacktestResult(Base):
     annualized_return = Column(Float, nullable=False)
     max_drawdown = Column(Float, nullable=False)
     sharpe_ratio = Column(Float, nullable=False)
+    # Legacy inline trade log; new runs store it in ``backtest_series``.
     trades = Column(JSON, default=list)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    series = relationship("BacktestSeries", uselist=False, cascade="all, delete-orphan")
+
+
+class BacktestSeries(Base):
+    """Equity curve and trade log of one backtest run as compressed column arrays."""
+
+    __tablename__ = "backtest_series"
+
+    run_id = Column(Integer, ForeignKey("backtest_results.id"), primary_key=True)
+    codec = Column(String(16), nullable=False)
+    points = Column(Integer, default=0)
+    trade_count = Column(Integer, default=0)
+    equity = Column(LargeBinary, nullable=False)
+    trades = Column(LargeBinary, nullable=False)
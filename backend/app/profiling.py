@@ -0,0 +1,305 @@
+"""On-demand profiling of API requests and scheduler jobs, plus an event-loop lag monitor.
+
+Profiling is opt-in (``BETTERSTOCK_PROFILING=1``). Once enabled:
+
+* an HTTP request carrying ``X-Profile: sample`` (or ``cprofile``), or the
+  ``?profile=`` query flag, is profiled and answered with ``X-Profile-Id``;
+* ``POST /admin/profiles/jobs/{job_id}`` arms the next run(s) of a scheduler
+  job, and ``BETTERSTOCK_PROFILE_JOBS=refresh_news:sample`` arms every run;
+* the last ``BETTERSTOCK_PROFILE_HISTORY`` profiles can be downloaded from
+  ``/admin/profiles`` as collapsed stacks (flamegraph/speedscope input),
+  pstats files or a text summary.
+
+Both modes observe the thread that runs the event loop, so anything else the
+loop executes meanwhile shows up too, and work pushed to executor threads
+(``asyncio.to_thread`` database calls) does not. The sampler costs one stack
+walk every ``BETTERSTOCK_PROFILE_INTERVAL_MS``; cProfile is exact but slows
+the profiled code down noticeably.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as TallyCounter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import FrameType
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from urllib.parse import parse_qs
+
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("BETTERSTOCK_PROFILING", "0").lower() in ("1", "true", "yes")
+PROFILE_HISTORY = int(os.getenv("BETTERSTOCK_PROFILE_HISTORY", "20"))
+SAMPLE_INTERVAL = float(os.getenv("BETTERSTOCK_PROFILE_INTERVAL_MS", "5")) / 1000
+LOOP_LAG_THRESHOLD = float(os.getenv("BETTERSTOCK_LOOP_LAG_MS", "250")) / 1000
+
+MODES = ("sample", "cprofile")
+
+LOOP_LAG_SECONDS = Histogram(
+    "betterstock_event_loop_lag_seconds",
+    "How late the event loop ran a periodic heartbeat.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+@dataclass(slots=True)
+class Profile:
+    id: str
+    target: str
+    mode: str
+    started_at: datetime
+    duration: float = 0.0
+    samples: int = 0
+    collapsed: Dict[str, int] = field(default_factory=dict)
+    stats: bytes | None = None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "target": self.target,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "samples": self.samples,
+        }
+
+    def collapsed_text(self) -> str:
+        lines = sorted(self.collapsed.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in lines)
+
+    def stats_text(self, limit: int = 50) -> str:
+        if self.stats is None:
+            return self.collapsed_text()
+        stream = io.StringIO()
+        pstats.Stats(_MarshalledStats(self.stats), stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+
+class _MarshalledStats:
+    """Adapter letting :class:`pstats.Stats` load stats kept in memory."""
+
+    def __init__(self, data: bytes) -> None:
+        self.stats = marshal.loads(data)
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame: FrameType | None) -> str:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="betterstock-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: TallyCounter[str] = TallyCounter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+
+class Profiler:
+    """Runs at most one profile at a time and keeps the most recent ones."""
+
+    def __init__(self, history: int = PROFILE_HISTORY, interval: float = SAMPLE_INTERVAL) -> None:
+        self.history = history
+        self.interval = interval
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._armed: Dict[str, Tuple[str, int | None]] = {}
+        self._busy = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @contextmanager
+    def session(self, target: str, mode: str = "sample") -> Iterator[Profile | None]:
+        """Profile the enclosed block; yields ``None`` if another profile is running."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if not self._busy.acquire(blocking=False):
+            yield None
+            return
+        profile = Profile(id=f"p{next(self._ids)}", target=target, mode=mode, started_at=datetime.utcnow())
+        began = time.perf_counter()
+        sampler: _Sampler | None = None
+        profiler: cProfile.Profile | None = None
+        try:
+            if mode == "sample":
+                sampler = _Sampler(threading.get_ident(), self.interval)
+                sampler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            yield profile
+        finally:
+            profile.duration = time.perf_counter() - began
+            if sampler is not None:
+                sampler.stop()
+                profile.collapsed = dict(sampler.stacks)
+                profile.samples = sampler.samples
+            if profiler is not None:
+                profiler.disable()
+                profiler.create_stats()
+                profile.stats = marshal.dumps(profiler.stats)
+            self._busy.release()
+            self._store(profile)
+
+    def _store(self, profile: Profile) -> None:
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.history:
+            self._profiles.popitem(last=False)
+        logger.info("Stored %s profile %s of %s (%.3fs)", profile.mode, profile.id, profile.target, profile.duration)
+
+    def get(self, profile_id: str) -> Profile | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Profile]:
+        return list(reversed(self._profiles.values()))
+
+    def arm(self, target: str, mode: str = "sample", runs: int | None = 1) -> None:
+        """Profile the next ``runs`` executions of ``target`` (every one if ``None``)."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self._armed[target] = (mode, runs)
+
+    def take_armed(self, target: str) -> str | None:
+        """The mode to profile this run of ``target`` with, consuming one armed run."""
+        armed = self._armed.get(target)
+        if armed is None:
+            return None
+        mode, runs = armed
+        if runs is not None:
+            if runs <= 1:
+                del self._armed[target]
+            else:
+                self._armed[target] = (mode, runs - 1)
+        return mode
+
+    def armed(self) -> Dict[str, Tuple[str, int | None]]:
+        return dict(self._armed)
+
+
+PROFILER = Profiler()
+
+for _entry in filter(None, os.getenv("BETTERSTOCK_PROFILE_JOBS", "").split(",")):
+    _job_id, _, _mode = _entry.strip().partition(":")
+    PROFILER.arm(_job_id, _mode or "sample", runs=None)
+
+
+class ProfilingMiddleware:
+    """Profile HTTP requests that ask for it via ``X-Profile`` or ``?profile=``."""
+
+    def __init__(self, app: Callable[..., Any], profiler: Profiler = PROFILER) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    @staticmethod
+    def requested_mode(scope: Dict[str, Any]) -> str | None:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                mode = value.decode("latin-1").strip().lower()
+                return mode if mode in MODES else "sample"
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if "profile" in query:
+            mode = query["profile"][-1].lower()
+            return mode if mode in MODES else "sample"
+        return None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        mode = self.requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        target = f"{scope['method']} {scope['path']}"
+        with self.profiler.session(target, mode) as profile:
+
+            async def send_wrapper(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start" and profile is not None:
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class LoopLagMonitor:
+    """Logs the event loop's stack whenever a callback blocks it for longer than ``threshold``.
+
+    A heartbeat task stamps the time every ``interval``; a watchdog thread
+    notices when the stamp goes stale and captures what the loop thread is
+    executing at that moment. Lag is also recorded in ``/metrics``.
+    """
+
+    def __init__(self, threshold: float = LOOP_LAG_THRESHOLD, interval: float | None = None) -> None:
+        self.threshold = threshold
+        self.interval = interval if interval is not None else max(threshold / 4, 0.01)
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="betterstock-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG_SECONDS.observe(max(now - expected, 0.0))
+            self._beat = now
+
+    def _watch(self) -> None:
+        reported = 0.0
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == reported:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread) if self._loop_thread else None
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+            logger.warning("Event loop blocked for %.0f ms; loop thread is at:\n%s", stalled * 1000, stack)
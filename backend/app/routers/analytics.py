@@ -1,109 +1,120 @@
 """Analytics endpoints covering scoring and industry z-score."""
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from ..dependencies import get_db
-from ..models import IndustryFactor, NewsArticle, SentimentScore, StockQuote
-from ..schemas import IndustryFactorSchema, ScoreResultSchema
-from ..services.scoring import ScoreEngine
-from ..services.zscore import IndustryMetric, ZScoreCalculator
+from ..encoding import PAYLOADS, dumps, json_response
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import IndustryFactor
+from ..schemas import IndustryFactorSchema, ScoreResultSchema, WhatIfRequestSchema, WhatIfResultSchema
+from ..services.events import EVENTS, IndustryFactorUpdated
+from ..services.factors import FACTOR_ENGINE
+from ..services.industry import INDUSTRY_HISTORY, heat_scores, load_series
+from ..services.live_scores import INDUSTRY_PREFIX, LIVE_SCORES
+from ..services.quote_cache import QUOTE_CACHE
+from ..services.scoring import COMPONENTS
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
 @router.get("/scores", response_model=List[ScoreResultSchema])
-async def get_scores(db: Session = Depends(get_db)) -> List[ScoreResultSchema]:
-    score_engine = ScoreEngine()
-    stmt = select(StockQuote)
-    stocks = db.execute(stmt).scalars().all()
-    scores = []
-    for stock in stocks:
-        sentiment_value = 0.0
-        if stock.news:
-            sentiments = [s.sentiment for article in stock.news for s in article.sentiments]
-            if sentiments:
-                sentiment_value = float(sum(sentiments) / len(sentiments))
-        industry_factor = (
-            db.query(IndustryFactor)
-            .filter(IndustryFactor.ticker == f"industry::{stock.industry}")
-            .order_by(IndustryFactor.as_of.desc())
-            .first()
-        )
-        industry_value = industry_factor.zscore if industry_factor else 0.0
-        technical = stock.percent_change / 100
-        fundamental = 0.5
-        if hasattr(stock, "pe_ratio") and getattr(stock, "pe_ratio"):
-            fundamental = min(2.0, 1.0 / float(getattr(stock, "pe_ratio")))
-        stock_score = score_engine.score(
-            ticker=stock.ticker,
-            name=stock.name,
-            sentiment=sentiment_value,
-            industry_heat=industry_value,
-            technical=technical,
-            fundamental=fundamental,
-        )
-        scores.append(stock_score)
-    normalized = score_engine.normalize(scores)
-    return [
-        ScoreResultSchema(
-            ticker=score.ticker,
-            name=score.name,
-            score=score.to_dict().get("normalized", score.total),
-            components=score.to_dict(),
+async def get_scores(request: Request) -> Response:
+    normalized = await LIVE_SCORES.scores(await QUOTE_CACHE.get())
+
+    def build() -> List[dict]:
+        rows = []
+        for score in normalized:
+            components = score.to_dict()
+            rows.append(
+                {
+                    "ticker": score.ticker,
+                    "name": score.name,
+                    "score": components.get("normalized", score.total),
+                    "components": components,
+                }
+            )
+        return rows
+
+    # ``normalized`` is the same list object until the next change event.
+    return json_response(request, PAYLOADS.get("analytics.scores", normalized, build))
+
+
+@router.post("/scores/whatif", response_model=WhatIfResultSchema)
+async def score_what_if(request: Request, body: WhatIfRequestSchema) -> Response:
+    """Rank the live universe under many weightings at once and compare the rankings."""
+    engine = LIVE_SCORES.engine
+    try:
+        weights = engine.weight_matrix([weighting.weights for weighting in body.weightings])
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    tickers, names, values = await LIVE_SCORES.components(await QUOTE_CACHE.get())
+    result = engine.what_if(values, weights, body.top_k)
+    weightings = []
+    for position, (weighting, row_weights, picks) in enumerate(zip(body.weightings, weights.tolist(), result.top)):
+        scores = result.scores[picks, position].tolist()
+        weightings.append(
+            {
+                "name": weighting.name or f"w{position}",
+                "weights": dict(zip(COMPONENTS, row_weights)),
+                "top": [
+                    {"ticker": tickers[row], "name": names[row], "score": score}
+                    for row, score in zip(picks.tolist(), scores)
+                ],
+            }
         )
-        for score in normalized
-    ]
+    payload = {
+        "tickers": len(tickers),
+        "components": list(COMPONENTS),
+        "weightings": weightings,
+        "spearman": result.spearman.round(6).tolist(),
+    }
+    return json_response(request, dumps(payload))
+
+
+@router.get("/factors", response_model=List[Dict[str, Optional[float | str]]])
+async def get_factors(
+    request: Request,
+    tickers: str | None = Query(None, description="Comma separated tickers; default the whole market"),
+) -> Response:
+    """Technical factors per ticker as of the live quotes (``null`` without enough history)."""
+    await FACTOR_ENGINE.sync()
+    snapshot = await QUOTE_CACHE.get()
+    frame = FACTOR_ENGINE.frame(snapshot if FACTOR_ENGINE.ready else None)
+    selected = [ticker.strip() for ticker in tickers.split(",") if ticker.strip()] if tickers else None
+    headers = {"X-Factors-As-Of": frame.as_of.isoformat()} if frame.as_of is not None else {}
+    if selected:
+        return json_response(request, dumps(frame.records(selected)), headers)
+    return json_response(request, PAYLOADS.get("analytics.factors", frame, frame.records), headers)
 
 
 @router.post("/industry/zscore", response_model=List[IndustryFactorSchema])
-async def compute_industry_zscore(db: Session = Depends(get_db)) -> List[IndustryFactorSchema]:
+async def compute_industry_zscore(request: Request, db: Session = Depends(get_db)) -> Response:
+    """Standardise the recorded industry series; the per-industry ``heat_z`` feeds the scores."""
+    from ..services.zscore import ZScoreCalculator  # pandas; loaded on first use
+
     calculator = ZScoreCalculator(window=20)
-    metrics: List[IndustryMetric] = []
-    since = datetime.utcnow() - timedelta(days=60)
-    stmt = select(StockQuote).where(StockQuote.updated_at >= since)
-    stocks = db.execute(stmt).scalars().all()
-    for stock in stocks:
-        metrics.append(
-            IndustryMetric(
-                industry=stock.industry,
-                metric_name="turnover",
-                timestamp=stock.updated_at,
-                value=stock.turnover_rate,
-            )
-        )
-        metrics.append(
-            IndustryMetric(
-                industry=stock.industry,
-                metric_name="sentiment",
-                timestamp=stock.updated_at,
-                value=stock.percent_change,
-            )
-        )
-    results = calculator.compute(metrics)
-    db.query(IndustryFactor).delete()
-    for result in results:
-        db.add(
-            IndustryFactor(
-                ticker="industry::" + result.industry,
-                factor_name=f"{result.metric_name}_z",
-                value=result.value,
-                zscore=result.zscore,
-                as_of=result.timestamp,
-            )
-        )
-    db.commit()
-    return [
-        IndustryFactorSchema(
-            ticker="industry::" + res.industry,
-            factor_name=f"{res.metric_name}_z",
-            value=res.value,
-            zscore=res.zscore,
-            as_of=res.timestamp,
-        )
-        for res in results
+    results = calculator.compute(load_series(db, INDUSTRY_HISTORY))
+    results += heat_scores(results)
+    rows = [
+        {
+            "ticker": INDUSTRY_PREFIX + result.industry,
+            "factor_name": f"{result.metric_name}_z",
+            "value": result.value,
+            "zscore": result.zscore,
+            "as_of": result.timestamp,
+        }
+        for result in results
     ]
+    with DB_WRITE_SECONDS.time(table="industry_factors"):
+        db.query(IndustryFactor).delete()
+        if rows:
+            db.execute(insert(IndustryFactor), rows)
+        db.commit()
+    DB_ROWS_WRITTEN.inc(len(rows), table="industry_factors")
+    EVENTS.publish(IndustryFactorUpdated(frozenset(result.industry for result in results)))
+    return json_response(request, dumps(rows))
@@ -1,30 +1,44 @@
 """Backtesting endpoints."""
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta
-from typing import List
+from typing import Any, List, Tuple
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from ..dependencies import get_db
-from ..models import BacktestResult, StockQuote
-from ..schemas import BacktestResultSchema, BacktestTradeSchema
-from ..services.backtest import Backtester, PriceBar
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import BacktestResult, BacktestSeries, QuoteBar, StockQuote
+from ..schemas import BacktestEquitySchema, BacktestResultSchema, BacktestRunSchema, BacktestTradeSchema
+from ..services.backtest_store import archived_runs, equity_curve, series_values, trade_log
+from ..services.retention import archived_rows
+
+RUN_COLUMNS = tuple(column for column in BacktestResult.__table__.columns if column.name != "trades")
 
 router = APIRouter(prefix="/backtest", tags=["backtest"])
 
 
 @router.post("/run", response_model=BacktestResultSchema)
 async def run_backtest(db: Session = Depends(get_db)) -> BacktestResultSchema:
+    from ..services.backtest import Backtester, PriceBar  # pandas; loaded on first use
+
     backtester = Backtester()
     since = datetime.utcnow() - timedelta(days=60)
     stmt = select(StockQuote).where(StockQuote.updated_at >= since)
     stocks = db.execute(stmt).scalars().all()
-    prices: List[PriceBar] = []
-    for stock in stocks:
-        prices.append(PriceBar(date=stock.updated_at, ticker=stock.ticker, close=stock.price))
+    bars_stmt = select(QuoteBar.trade_date, QuoteBar.ticker, QuoteBar.close).where(QuoteBar.trade_date >= since)
+    # Bars older than the retention watermark are read back from the archive.
+    archived = await asyncio.to_thread(archived_rows, "quote_bars", ("trade_date", "ticker", "close"), since)
+    prices: List[PriceBar] = [
+        PriceBar(date=trade_date, ticker=ticker, close=close)
+        for trade_date, ticker, close in [*archived, *db.execute(bars_stmt)]
+    ]
+    if not prices:
+        for stock in stocks:
+            prices.append(PriceBar(date=stock.updated_at, ticker=stock.ticker, close=stock.price))
     scores = {stock.ticker: stock.percent_change for stock in stocks}
     summary = backtester.run(prices, scores)
     result = BacktestResult(
@@ -35,11 +49,16 @@ async def run_backtest(db: Session = Depends(get_db)) -> BacktestResultSchema:
         annualized_return=summary.annualized_return,
         max_drawdown=summary.max_drawdown,
         sharpe_ratio=summary.sharpe_ratio,
-        trades=[trade.__dict__ for trade in summary.trades],
+        trades=[],
+        series=BacktestSeries(**series_values(summary)),
     )
-    db.add(result)
-    db.commit()
+    with DB_WRITE_SECONDS.time(table="backtest_results"):
+        db.add(result)
+        db.commit()
+    DB_ROWS_WRITTEN.inc(table="backtest_results")
+    DB_ROWS_WRITTEN.inc(table="backtest_series")
     return BacktestResultSchema(
+        id=result.id,
         strategy_name=result.strategy_name,
         started_at=result.started_at,
         ended_at=result.ended_at,
@@ -57,3 +76,89 @@ async def run_backtest(db: Session = Depends(get_db)) -> BacktestResultSchema:
             for trade in summary.trades
         ],
     )
+
+
+def _runs_query():
+    return select(
+        *RUN_COLUMNS,
+        func.coalesce(BacktestSeries.points, 0).label("points"),
+        func.coalesce(BacktestSeries.trade_count, 0).label("trade_count"),
+    ).outerjoin(BacktestSeries, BacktestSeries.run_id == BacktestResult.id)
+
+
+@router.get("/runs", response_model=List[BacktestRunSchema])
+async def list_runs(
+    limit: int = Query(50, ge=1, le=500),
+    before: int | None = Query(None, description="Return runs with an id below this one"),
+    db: Session = Depends(get_db),
+) -> List[BacktestRunSchema]:
+    """Run summaries, newest first; series and trade payloads are not loaded."""
+    stmt = _runs_query().order_by(BacktestResult.id.desc()).limit(limit)
+    if before is not None:
+        stmt = stmt.where(BacktestResult.id < before)
+    rows = [dict(row) for row in db.execute(stmt).mappings()]
+    if len(rows) < limit:
+        # Older runs may have been moved to the archive by the retention policy.
+        older = rows[-1]["id"] if rows else before
+        rows.extend(await asyncio.to_thread(archived_runs, before=older, limit=limit - len(rows)))
+    return [BacktestRunSchema(**row) for row in rows]
+
+
+@router.get("/runs/{run_id}", response_model=BacktestRunSchema)
+async def get_run(run_id: int, db: Session = Depends(get_db)) -> BacktestRunSchema:
+    row = db.execute(_runs_query().where(BacktestResult.id == run_id)).mappings().first()
+    if row is None:
+        archived = await asyncio.to_thread(archived_runs, run_id=run_id)
+        if not archived:
+            raise HTTPException(status_code=404, detail="Backtest run not found")
+        row = archived[0]
+    return BacktestRunSchema(**row)
+
+
+async def _series(run_id: int, name: str, db: Session) -> Tuple[str | None, int, Any]:
+    """``(codec, points, payload)`` of a run's ``equity`` or ``trades`` series, from the database or the archive.
+
+    ``codec`` is ``None`` for runs stored before the series table; ``payload`` is then the legacy trade list.
+    """
+    row = db.execute(
+        select(BacktestSeries.codec, BacktestSeries.points, getattr(BacktestSeries, name))
+        .where(BacktestSeries.run_id == run_id)
+    ).first()
+    if row is not None:
+        return tuple(row)
+    legacy = db.execute(select(BacktestResult.id, BacktestResult.trades).where(BacktestResult.id == run_id)).first()
+    if legacy is not None:
+        return None, 0, legacy.trades or []
+    archived = await asyncio.to_thread(archived_runs, run_id=run_id, series=True)
+    if not archived:
+        raise HTTPException(status_code=404, detail="Backtest run not found")
+    run = archived[0]
+    if run["series_codec"] is None:
+        return None, 0, run["trades"]
+    return run["series_codec"], run["points"], run[f"series_{name}"]
+
+
+@router.get("/runs/{run_id}/equity", response_model=BacktestEquitySchema)
+async def get_equity(
+    run_id: int,
+    points: int = Query(500, ge=0, le=20000, description="Maximum points to return; 0 returns every day"),
+    db: Session = Depends(get_db),
+) -> BacktestEquitySchema:
+    codec, total, data = await _series(run_id, "equity", db)
+    if codec is None:
+        return BacktestEquitySchema(run_id=run_id, total=0, dates=[], equity=[], drawdown=[], returns=[])
+    curve = await asyncio.to_thread(equity_curve, data, codec, points)
+    return BacktestEquitySchema(run_id=run_id, total=total, **curve)
+
+
+@router.get("/runs/{run_id}/trades", response_model=List[BacktestTradeSchema])
+async def get_trades(
+    run_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+) -> List[BacktestTradeSchema]:
+    codec, _, data = await _series(run_id, "trades", db)
+    if codec is None:
+        return [BacktestTradeSchema(**trade) for trade in data[offset : offset + limit]]
+    return [BacktestTradeSchema(**trade) for trade in await asyncio.to_thread(trade_log, data, codec, offset, limit)]
@@ -0,0 +1,40 @@
+"""Bulk export endpoints streaming NDJSON, Arrow IPC or Parquet."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..services.export import DATASETS, FORMATS, ExportFilters, export
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson", regex="^(ndjson|arrow|parquet)$"),
+    tickers: str | None = Query(None, description="Comma separated tickers (quotes, quote_bars, industry_factors)"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> StreamingResponse:
+    """Stream every row of ``dataset`` in batches; see :mod:`app.services.export`."""
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset; choose from {', '.join(DATASETS)}")
+    filters = ExportFilters(
+        tickers=[ticker.strip() for ticker in tickers.split(",") if ticker.strip()] if tickers else None,
+        since=since,
+        until=until,
+    )
+    try:
+        chunks = export(dataset, format, filters)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    media_type, extension = FORMATS[format]
+    # A plain iterator: Starlette pulls each batch in a worker thread, off the event loop.
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'},
+    )
@@ -1,17 +1,120 @@
 """Market data endpoints."""
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import json
+from typing import AsyncIterator, List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
+from ..encoding import PAYLOADS, dumps, json_response
 from ..schemas import StockQuoteSchema
-from ..services.market import DEFAULT_PROVIDER, MarketQuote
+from ..services.market import FailoverMarketDataProvider
+from ..services.quote_cache import QUOTE_CACHE
+from ..services.streaming import QUOTE_STREAM
 
 router = APIRouter(prefix="/market", tags=["market"])
 
+SSE_KEEPALIVE_SECONDS = 15.0
+# Close code for frames other than a JSON ``{"tickers": [...]}`` text message.
+UNSUPPORTED_DATA = 1003
+
+
+def _parse_tickers(tickers: str | None) -> List[str] | None:
+    if not tickers:
+        return None
+    return [ticker.strip() for ticker in tickers.split(",") if ticker.strip()]
+
+
+def _parse_subscription(text: str) -> List[str] | None:
+    """Tickers of a ``{"tickers": [...]}`` frame; ``None`` or ``[]`` follows the whole market."""
+    try:
+        tickers = json.loads(text).get("tickers")
+    except (ValueError, AttributeError, TypeError) as exc:
+        raise ValueError('Expected a JSON object such as {"tickers": ["600519"]}') from exc
+    if tickers is not None and not (isinstance(tickers, list) and all(isinstance(t, str) for t in tickers)):
+        raise ValueError('"tickers" must be a list of strings')
+    return tickers or None
+
 
 @router.get("/quotes", response_model=List[StockQuoteSchema])
-async def get_quotes() -> List[StockQuoteSchema]:
-    quotes = await DEFAULT_PROVIDER.fetch_quotes()
-    return [StockQuoteSchema(**quote.__dict__) for quote in quotes]
+async def get_quotes(
+    request: Request,
+    tickers: str | None = Query(None, description="Comma separated tickers, e.g. 600519,000333"),
+) -> Response:
+    selected = _parse_tickers(tickers)
+    snapshot = await QUOTE_CACHE.get(selected)
+    headers = {"X-Quotes-Stale-Since": snapshot.stale_since.isoformat()} if snapshot.stale_since else None
+    if selected:
+        return json_response(request, dumps(list(snapshot.records())), headers)
+    # The full market is encoded (and compressed) once per snapshot.
+    payload = PAYLOADS.get("market.quotes", snapshot, lambda: list(snapshot.records()))
+    return json_response(request, payload, headers)
+
+
+@router.get("/providers")
+async def get_provider_stats() -> List[dict]:
+    """Latency, error rate and hedge counts of the upstream provider chain in this process."""
+    provider = QUOTE_CACHE.provider
+    return provider.provider_stats() if isinstance(provider, FailoverMarketDataProvider) else []
+
+
+@router.websocket("/stream")
+async def stream_quotes(websocket: WebSocket, tickers: str | None = None) -> None:
+    """Push quote deltas; clients may send ``{"tickers": [...]}`` to resubscribe."""
+    await websocket.accept()
+    await QUOTE_CACHE.get()
+    subscriber = QUOTE_STREAM.subscribe(_parse_tickers(tickers))
+
+    async def receive_subscriptions() -> None:
+        """Apply resubscriptions until the client leaves; a malformed frame closes the stream."""
+        while True:
+            try:
+                selected = _parse_subscription(await websocket.receive_text())
+            except WebSocketDisconnect:
+                return
+            except KeyError:  # a binary frame has no "text"
+                await websocket.close(code=UNSUPPORTED_DATA, reason="Expected a JSON text frame")
+                return
+            except ValueError as exc:
+                await websocket.close(code=UNSUPPORTED_DATA, reason=str(exc))
+                return
+            subscriber.resubscribe(selected)
+
+    receiver = asyncio.create_task(receive_subscriptions())
+    try:
+        while not receiver.done():
+            getter = asyncio.create_task(subscriber.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                break
+            await websocket.send_text(getter.result())
+        receiver.result()  # re-raise anything unexpected instead of leaving it unretrieved
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        subscriber.close()
+
+
+@router.get("/stream/sse")
+async def stream_quotes_sse(request: Request, tickers: str | None = None) -> StreamingResponse:
+    """Server-Sent Events variant of :func:`stream_quotes`."""
+    await QUOTE_CACHE.get()
+    subscriber = QUOTE_STREAM.subscribe(_parse_tickers(tickers))
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            subscriber.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -2,56 +2,222 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session, defer, selectinload
 
 from ..dependencies import get_db
-from ..models import NewsArticle, SentimentScore
-from ..schemas import NewsArticleSchema
-from ..services.crawler import fetch_latest_news
-from ..services.sentiment import SentimentAnalyzer
+from ..encoding import dumps, json_response
+from ..models import NewsArticle, StockQuote
+from ..schemas import JobSchema, NewsArticleSchema, NewsSearchHitSchema, SentimentSchema, StockQuoteSchema
+from ..services.job_requests import JobConflict, get_request, leader_alive, request_job
+from ..services.jobs import JOBS
+from ..services.retention import archived_before, read_archive
+from ..services.search import search
 
 router = APIRouter(prefix="/news", tags=["news"])
 
 
-@router.get("/latest", response_model=List[NewsArticleSchema])
-async def latest_news(limit: int = 20, db: Session = Depends(get_db)) -> List[NewsArticleSchema]:
-    stmt = select(NewsArticle).order_by(NewsArticle.published_at.desc()).limit(limit)
-    articles = db.execute(stmt).scalars().unique().all()
-    return [NewsArticleSchema.from_orm(article) for article in articles]
-
-
-@router.post("/refresh", response_model=int)
-async def refresh_news(db: Session = Depends(get_db)) -> int:
-    items = await fetch_latest_news()
-    analyzer = SentimentAnalyzer()
-    for item in items:
-        article = db.query(NewsArticle).filter_by(url=item.url).one_or_none()
-        if article:
-            continue
-        article = NewsArticle(
-            source=item.source,
-            title=item.title,
-            url=item.url,
-            published_at=item.published_at,
-            summary=item.summary,
-            content=item.content,
-            raw_payload=item.payload,
-        )
-        db.add(article)
-        db.flush()
-        result = await analyzer.analyze_text(item.content or item.summary)
-        db.add(
-            SentimentScore(
-                article_id=article.id,
-                provider=analyzer.provider,
-                sentiment=result.sentiment,
-                confidence=result.confidence,
-                metadata=result.raw,
+NEWS_FIELDS = tuple(NewsArticleSchema.__fields__)
+REQUIRED_FIELDS = tuple(name for name, field in NewsArticleSchema.__fields__.items() if field.required)
+RELATIONSHIP_FIELDS = {"sentiments": NewsArticle.sentiments, "stocks": NewsArticle.stocks}
+SENTIMENT_FIELDS = tuple(SentimentSchema.__fields__)
+# SentimentScore stores the "metadata" column as ``metadata_``.
+SENTIMENT_ATTRIBUTES = {field: "metadata_" if field == "metadata" else field for field in SENTIMENT_FIELDS}
+QUOTE_FIELDS = tuple(StockQuoteSchema.__fields__)
+
+
+def encode_cursor(published_at: datetime, article_id: int) -> str:
+    raw = f"{published_at.isoformat()}|{article_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        published_at, article_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(published_at), int(article_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def _parse_fields(fields: str | None) -> Tuple[str, ...]:
+    if not fields:
+        return NEWS_FIELDS
+    selected = tuple(name.strip() for name in fields.split(",") if name.strip())
+    unknown = set(selected) - set(NEWS_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(dict.fromkeys(REQUIRED_FIELDS + selected))
+
+
+def _article_row(article: NewsArticle, selected: Tuple[str, ...]) -> Dict[str, Any]:
+    """The :class:`NewsArticleSchema` fields in ``selected`` as plain JSON-ready values."""
+    row: Dict[str, Any] = {}
+    for name in selected:
+        if name == "sentiments":
+            row[name] = [
+                {field: getattr(score, attribute) for field, attribute in SENTIMENT_ATTRIBUTES.items()}
+                for score in article.sentiments
+            ]
+        elif name == "stocks":
+            row[name] = [{field: getattr(stock, field) for field in QUOTE_FIELDS} for stock in article.stocks]
+        else:
+            row[name] = getattr(article, name)
+    return row
+
+
+def _archived_articles(selected: Tuple[str, ...], before: Tuple[datetime, int] | None, limit: int) -> List[Dict[str, Any]]:
+    """Up to ``limit`` archived articles older than the keyset ``before``, newest first."""
+    columns = [name for name in selected if name != "stocks"] + (["tickers"] if "stocks" in selected else [])
+    records = read_archive("news_articles", columns, before=before, limit=limit, newest_first=True).to_pylist()
+    records.sort(key=lambda record: (record["published_at"], record["id"]), reverse=True)
+    records = records[:limit]
+    for record in records:
+        if "sentiments" in selected:
+            record["sentiments"] = [
+                {field: score.get(field) for field in SENTIMENT_FIELDS} for score in json.loads(record["sentiments"])
+            ]
+        if "stocks" in selected:
+            record["stocks"] = json.loads(record.pop("tickers"))
+        elif "tickers" in record:
+            del record["tickers"]
+    return records
+
+
+def _link_stocks(rows: List[Dict[str, Any]], db: Session) -> None:
+    """Replace archived ticker lists with the current quotes of those tickers."""
+    tickers = {ticker for row in rows for ticker in row["stocks"]}
+    quotes = {
+        quote.ticker: {field: getattr(quote, field) for field in QUOTE_FIELDS}
+        for quote in db.execute(select(StockQuote).where(StockQuote.ticker.in_(tickers))).scalars()
+    } if tickers else {}
+    for row in rows:
+        row["stocks"] = [quotes[ticker] for ticker in row["stocks"] if ticker in quotes]
+
+
+@router.get("/latest", response_model=List[NewsArticleSchema], response_model_exclude_unset=True)
+async def latest_news(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    fields: str | None = Query(None, description="Comma separated projection, e.g. id,title,summary"),
+    db: Session = Depends(get_db),
+) -> Response:
+    """Newest articles first, paginated by keyset on ``(published_at, id)``."""
+    selected = _parse_fields(fields)
+    stmt = select(NewsArticle).options(defer(NewsArticle._raw_payload))
+    if "content" in selected:
+        stmt = stmt.options(selectinload(NewsArticle.content_blob))
+    else:
+        stmt = stmt.options(defer(NewsArticle._content))
+    for name, relationship in RELATIONSHIP_FIELDS.items():
+        if name in selected:
+            stmt = stmt.options(selectinload(relationship))
+    if cursor:
+        published_at, article_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                NewsArticle.published_at < published_at,
+                and_(NewsArticle.published_at == published_at, NewsArticle.id < article_id),
             )
         )
-    db.commit()
-    return len(items)
+    stmt = stmt.order_by(NewsArticle.published_at.desc(), NewsArticle.id.desc()).limit(limit)
+    articles = db.execute(stmt).scalars().all()
+    rows = [_article_row(article, selected) for article in articles]
+    if len(rows) < limit and archived_before("news_articles") is not None:
+        # The database ran out of older rows; continue the keyset into the archive.
+        before = (articles[-1].published_at, articles[-1].id) if articles else (decode_cursor(cursor) if cursor else None)
+        archived = await asyncio.to_thread(_archived_articles, selected, before, limit - len(rows))
+        if "stocks" in selected:
+            _link_stocks(archived, db)
+        rows.extend(archived)
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1]["published_at"], rows[-1]["id"])
+    return json_response(request, dumps(rows), headers)
+
+
+@router.get("/search", response_model=List[NewsSearchHitSchema])
+async def search_news(
+    q: str = Query(..., min_length=1, description="Search terms; every term must match"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+) -> List[NewsSearchHitSchema]:
+    """Full-text search ranked by relevance (BM25 on SQLite)."""
+    hits = search(db, q, since=since, until=until, limit=limit, offset=offset)
+    if not hits:
+        return []
+    stmt = (
+        select(NewsArticle.id, NewsArticle.source, NewsArticle.title, NewsArticle.url,
+               NewsArticle.published_at, NewsArticle.summary)
+        .where(NewsArticle.id.in_([hit.article_id for hit in hits]))
+    )
+    rows = {row.id: row for row in db.execute(stmt)}
+    return [
+        NewsSearchHitSchema(**rows[hit.article_id]._mapping, score=hit.score)
+        for hit in hits
+        if hit.article_id in rows
+    ]
+
+
+async def _request(name: str, options: Dict[str, Any] | None = None) -> JobSchema:
+    """Queue ``name`` for the scheduler leader; crawls and re-scoring never run in a follower."""
+    if not await asyncio.to_thread(leader_alive):
+        raise HTTPException(status_code=503, detail="No scheduler is running to pick up the job")
+    try:
+        return JobSchema(**await asyncio.to_thread(request_job, name, options))
+    except JobConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+@router.post("/refresh", response_model=JobSchema, status_code=202)
+async def refresh_news() -> JobSchema:
+    """Ask the leader for a background crawl, or return the request already queued or running."""
+    return await _request("news_refresh")
+
+
+@router.get("/refresh/{job_id}", response_model=JobSchema)
+async def refresh_status(job_id: str) -> JobSchema:
+    job = JOBS.get(job_id)
+    if job is not None:
+        return JobSchema(**job.to_dict())
+    requested = await asyncio.to_thread(get_request, job_id)
+    if requested is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobSchema(**requested)
+
+
+@router.post("/sentiment/backfill", response_model=JobSchema, status_code=202)
+async def backfill_sentiment(
+    chunk_size: int | None = Query(None, ge=1, le=10000),
+    concurrency: int | None = Query(None, ge=1, le=64),
+    replace: bool = Query(False, description="Delete older scores of the same provider as articles are re-scored"),
+    restart: bool = Query(False, description="Ignore the checkpoint and start from the first article"),
+) -> JobSchema:
+    """Ask the leader to re-score stored articles with the current sentiment model, resuming from its checkpoint.
+
+    Returns the backfill already queued or running when it has the same options, and 409 when it has others.
+    """
+    options = {"chunk_size": chunk_size, "concurrency": concurrency, "replace": replace, "restart": restart}
+    return await _request("sentiment_backfill", {key: value for key, value in options.items() if value is not None})
+
+
+@router.get("/sentiment/backfill", response_model=List[Dict[str, Any]])
+async def backfill_checkpoints() -> List[Dict[str, Any]]:
+    from ..services.backfill import list_checkpoints
+
+    return await asyncio.to_thread(list_checkpoints)
+
+
+@router.get("/sentiment/backfill/{job_id}", response_model=JobSchema)
+async def backfill_status(job_id: str) -> JobSchema:
+    return await refresh_status(job_id)
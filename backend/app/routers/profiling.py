@@ -0,0 +1,55 @@
+"""Admin endpoints for on-demand profiles (mounted when BETTERSTOCK_PROFILING=1)."""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from ..profiling import MODES, PROFILER
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+
+@router.get("")
+async def list_profiles() -> List[Dict[str, Any]]:
+    """Stored profiles, newest first."""
+    return [profile.summary() for profile in PROFILER.list()]
+
+
+@router.get("/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("collapsed", regex="^(collapsed|pstats|text)$"),
+) -> Response:
+    """Collapsed stacks (sampled), a pstats file (cProfile) or a text summary."""
+    profile = PROFILER.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        if profile.stats is None:
+            raise HTTPException(status_code=409, detail="Sampled profiles have no pstats; use format=collapsed")
+        return Response(
+            profile.stats,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile.id}.pstats"'},
+        )
+    if format == "collapsed" and profile.stats is not None:
+        raise HTTPException(status_code=409, detail="cProfile profiles have no stacks; use format=pstats or text")
+    body = profile.collapsed_text() if format == "collapsed" else profile.stats_text()
+    return Response(body, media_type="text/plain; charset=utf-8")
+
+
+@router.get("/jobs/armed")
+async def armed_jobs() -> Dict[str, Dict[str, Any]]:
+    return {target: {"mode": mode, "runs": runs} for target, (mode, runs) in PROFILER.armed().items()}
+
+
+@router.post("/jobs/{job_id}", status_code=202)
+async def arm_job(
+    job_id: str,
+    mode: str = Query("sample", regex="^(" + "|".join(MODES) + ")$"),
+    runs: int = Query(1, ge=1, le=100),
+) -> Dict[str, Any]:
+    """Profile the next ``runs`` executions of a scheduler job in this process."""
+    PROFILER.arm(job_id, mode, runs)
+    return {"job_id": job_id, "mode": mode, "runs": runs}
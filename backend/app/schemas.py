@@ -2,19 +2,29 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from pydantic.utils import GetterDict
+
+
+class _SentimentGetter(GetterDict):
+    """Reads ``metadata`` from ``SentimentScore.metadata_``; declarative models reserve the plain name."""
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return super().get("metadata_" if key == "metadata" else key, default)
 
 
 class SentimentSchema(BaseModel):
     provider: str
+    model_version: Optional[str] = None
     sentiment: float
     confidence: float
     metadata: dict | None = None
 
     class Config:
         orm_mode = True
+        getter_dict = _SentimentGetter
 
 
 class StockQuoteSchema(BaseModel):
@@ -51,6 +61,16 @@ class NewsArticleSchema(BaseModel):
         orm_mode = True
 
 
+class NewsSearchHitSchema(BaseModel):
+    id: int
+    source: str
+    title: str
+    url: str
+    published_at: datetime
+    summary: str | None = None
+    score: float
+
+
 class IndustryFactorSchema(BaseModel):
     ticker: str
     factor_name: str
@@ -69,6 +89,35 @@ class ScoreResultSchema(BaseModel):
     components: dict
 
 
+class WeightingSchema(BaseModel):
+    name: Optional[str] = None
+    weights: Dict[str, float]
+
+
+class WhatIfRequestSchema(BaseModel):
+    weightings: List[WeightingSchema] = Field(..., min_items=1, max_items=500)
+    top_k: int = Field(20, ge=1, le=500)
+
+
+class WhatIfPickSchema(BaseModel):
+    ticker: str
+    name: str
+    score: float
+
+
+class WhatIfWeightingSchema(BaseModel):
+    name: str
+    weights: Dict[str, float]
+    top: List[WhatIfPickSchema]
+
+
+class WhatIfResultSchema(BaseModel):
+    tickers: int
+    components: List[str]
+    weightings: List[WhatIfWeightingSchema]
+    spearman: List[List[float]]
+
+
 class BacktestTradeSchema(BaseModel):
     trade_date: datetime
     ticker: str
@@ -77,6 +126,7 @@ class BacktestTradeSchema(BaseModel):
 
 
 class BacktestResultSchema(BaseModel):
+    id: Optional[int] = None
     strategy_name: str
     started_at: datetime
     ended_at: datetime
@@ -88,3 +138,37 @@ class BacktestResultSchema(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class BacktestRunSchema(BaseModel):
+    id: int
+    strategy_name: str
+    started_at: datetime
+    ended_at: datetime
+    total_return: float
+    annualized_return: float
+    max_drawdown: float
+    sharpe_ratio: float
+    created_at: Optional[datetime] = None
+    points: int = 0
+    trade_count: int = 0
+
+
+class BacktestEquitySchema(BaseModel):
+    run_id: int
+    total: int
+    dates: List[datetime]
+    equity: List[float]
+    drawdown: List[float]
+    returns: List[float]
+
+
+class JobSchema(BaseModel):
+    id: str
+    name: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: dict = {}
+    error: Optional[str] = None
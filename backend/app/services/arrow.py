@@ -0,0 +1,39 @@
+"""SQLAlchemy column types mapped onto Arrow, shared by the export and the archive.
+
+Both write the same tables to Arrow or Parquet, so one mapping keeps an exported
+file and an archived partition of a table interchangeable.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import DateTime, Float, Integer, LargeBinary
+
+
+def require_pyarrow(purpose: str) -> Any:
+    try:
+        import pyarrow  # type: ignore
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError(f"pyarrow package is required for {purpose}") from exc
+    return pyarrow
+
+
+def arrow_type(pa: Any, column_type: Any) -> Any:
+    """Arrow type for a SQLAlchemy column type; anything else (text, JSON) is stored as a string."""
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def arrow_schema(pa: Any, columns: Iterable[Any], strings: Sequence[str] = (), binaries: Sequence[str] = ()) -> Any:
+    """Schema of ``columns`` followed by extra string and binary fields."""
+    fields = [pa.field(column.name, arrow_type(pa, column.type)) for column in columns]
+    fields.extend(pa.field(name, pa.string()) for name in strings)
+    fields.extend(pa.field(name, pa.binary()) for name in binaries)
+    return pa.schema(fields)
@@ -0,0 +1,338 @@
+"""Resumable re-scoring of stored articles with the current sentiment model.
+
+New articles are scored once at ingestion. After a provider, model or lexicon
+change, :func:`run_backfill` walks ``news_articles`` in id order, one keyset
+chunk at a time, and scores each chunk through
+:class:`~.sentiment.SentimentAnalyzer` with at most ``concurrency`` calls in
+flight. New :class:`~..models.SentimentScore` rows, tagged with the provider
+and ``model_version``, are bulk inserted together with the checkpoint row in
+``sentiment_backfills``. A crashed or cancelled run therefore resumes after
+the last committed chunk and never writes a score twice. Articles that
+already have a score from the same provider and version are skipped.
+
+Each article is scored on its own: timeouts, rate limits and other transient
+errors are retried ``BACKFILL_RETRIES`` times with exponential backoff, and
+an article that still fails (or whose model output cannot be parsed) is counted
+in ``articles_failed`` and passed over, so one bad article cannot stall the
+run; ``restart`` picks such articles up again. A chunk in which every article
+failed transiently means the provider is down: the run stops there without
+moving its checkpoint.
+
+The next chunk is read while the current one is being scored, and each
+transaction only covers one bulk insert, so the live API keeps serving. With
+``replace`` the older scores of the same provider are deleted chunk by chunk,
+so per-ticker averages switch to the new model without double counting.
+
+Start it with ``POST /news/sentiment/backfill`` or run
+``python -m app.services.backfill``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select
+
+from ..database import session_scope
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS, SENTIMENT_BACKFILLED
+from ..models import ContentBlob, NewsArticle, SentimentBackfill, SentimentScore, news_stock_association
+from .content_store import decompress
+from .events import EVENTS, SentimentAdded
+from .jobs import JOBS, Job
+from .llm import SentimentResult
+from .sentiment import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK = int(os.getenv("BETTERSTOCK_BACKFILL_CHUNK", "500"))
+BACKFILL_CONCURRENCY = int(os.getenv("BETTERSTOCK_BACKFILL_CONCURRENCY", "4"))
+BACKFILL_RETRIES = int(os.getenv("BETTERSTOCK_BACKFILL_RETRIES", "2"))
+BACKFILL_RETRY_DELAY = float(os.getenv("BETTERSTOCK_BACKFILL_RETRY_DELAY", "1"))
+BACKFILL_JOB_NAME = "sentiment_backfill"
+
+# Malformed model output fails the same way again; anything else is retried.
+PERMANENT_ERRORS = (ValueError, KeyError, TypeError)
+
+ArticleText = Tuple[int, str]
+
+
+def checkpoint_name(provider: str, model_version: str) -> str:
+    return f"sentiment:{provider}:{model_version}"
+
+
+def open_checkpoint(name: str, provider: str, model_version: str, restart: bool = False) -> int:
+    """Create or reopen the checkpoint ``name``; returns the article id to continue after."""
+    with session_scope() as session:
+        checkpoint = session.get(SentimentBackfill, name)
+        if checkpoint is None:
+            checkpoint = SentimentBackfill(name=name, provider=provider, model_version=model_version)
+            session.add(checkpoint)
+        if restart or checkpoint.last_article_id is None:
+            checkpoint.last_article_id = 0
+            checkpoint.articles_scored = 0
+            checkpoint.started_at = datetime.utcnow()
+        checkpoint.finished_at = None
+        checkpoint.updated_at = datetime.utcnow()
+        return checkpoint.last_article_id
+
+
+def finish_checkpoint(name: str) -> None:
+    with session_scope() as session:
+        checkpoint = session.get(SentimentBackfill, name)
+        if checkpoint is not None:
+            checkpoint.finished_at = checkpoint.updated_at = datetime.utcnow()
+
+
+def list_checkpoints() -> List[Dict[str, Any]]:
+    columns = SentimentBackfill.__table__.columns
+    with session_scope() as session:
+        stmt = select(*columns).order_by(SentimentBackfill.updated_at.desc())
+        return [dict(row) for row in session.execute(stmt).mappings()]
+
+
+def remaining(after_id: int) -> int:
+    with session_scope() as session:
+        return session.scalar(select(func.count()).select_from(NewsArticle).where(NewsArticle.id > after_id)) or 0
+
+
+def load_chunk(after_id: int, limit: int, provider: str, model_version: str) -> Tuple[List[ArticleText], List[int]]:
+    """Ids of the next ``limit`` articles after ``after_id`` and the texts of those still to be scored.
+
+    Returns ``(texts, ids read)``; no ids are read once every article has been.
+    """
+    with session_scope() as session:
+        rows = session.execute(
+            select(NewsArticle.id, NewsArticle.summary, NewsArticle._content, NewsArticle.content_hash)
+            .where(NewsArticle.id > after_id)
+            .order_by(NewsArticle.id)
+            .limit(limit)
+        ).all()
+        if not rows:
+            return [], []
+        ids = [row[0] for row in rows]
+        scored = set(
+            session.scalars(
+                select(SentimentScore.article_id).where(
+                    SentimentScore.article_id.in_(ids),
+                    SentimentScore.provider == provider,
+                    SentimentScore.model_version == model_version,
+                )
+            )
+        )
+        hashes = {row[3] for row in rows if row[0] not in scored} - {None}
+        blobs = {
+            blob_hash: decompress(data, codec).decode("utf-8")
+            for blob_hash, codec, data in session.execute(
+                select(ContentBlob.hash, ContentBlob.codec, ContentBlob.data).where(ContentBlob.hash.in_(list(hashes)))
+            )
+        } if hashes else {}
+    texts = [
+        (article_id, (blobs.get(content_hash) if content_hash else content) or summary or "")
+        for article_id, summary, content, content_hash in rows
+        if article_id not in scored
+    ]
+    return texts, ids
+
+
+def write_chunk(
+    name: str,
+    texts: Sequence[ArticleText],
+    results: Sequence[SentimentResult],
+    read: Sequence[int],
+    provider: str,
+    model_version: str,
+    replace: bool = False,
+    failed: Collection[int] = (),
+) -> Set[str]:
+    """Store one chunk's scores and advance the checkpoint past ``read`` atomically.
+
+    ``failed`` articles could not be scored and keep their older scores.
+    Returns the tickers linked to articles whose scores changed.
+    """
+    if replace:
+        changed = [article_id for article_id in read if article_id not in failed]
+    else:
+        changed = [article_id for article_id, _ in texts]
+    rows = [
+        {
+            "article_id": article_id,
+            "provider": provider,
+            "model_version": model_version,
+            "sentiment": result.sentiment,
+            "confidence": result.confidence,
+            "metadata_": result.raw,
+        }
+        for (article_id, _), result in zip(texts, results)
+    ]
+    with DB_WRITE_SECONDS.time(table="sentiment_scores"), session_scope() as session:
+        if replace:
+            session.execute(
+                delete(SentimentScore).where(
+                    SentimentScore.article_id.in_(changed),
+                    SentimentScore.provider == provider,
+                    SentimentScore.model_version.is_distinct_from(model_version),
+                )
+            )
+        if rows:
+            session.execute(insert(SentimentScore), rows)
+        tickers = set(
+            session.scalars(
+                select(news_stock_association.c.ticker).where(news_stock_association.c.news_id.in_(changed)).distinct()
+            )
+        ) if changed else set()
+        checkpoint = session.get(SentimentBackfill, name)
+        checkpoint.last_article_id = read[-1]
+        checkpoint.articles_scored = (checkpoint.articles_scored or 0) + len(rows)
+        checkpoint.updated_at = datetime.utcnow()
+    DB_ROWS_WRITTEN.inc(len(rows), table="sentiment_scores")
+    return tickers
+
+
+async def _score(
+    analyzer: SentimentAnalyzer,
+    texts: Sequence[ArticleText],
+    semaphore: asyncio.Semaphore,
+    retries: int = BACKFILL_RETRIES,
+    delay: float = BACKFILL_RETRY_DELAY,
+) -> List[SentimentResult | Exception]:
+    """The score of each article, or the error it still failed with after ``retries`` retries."""
+
+    async def analyze(article_id: int, text: str) -> SentimentResult | Exception:
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    return await analyzer.analyze_text(text)
+            except PERMANENT_ERRORS as exc:
+                error: Exception = exc
+                break
+            except Exception as exc:
+                error = exc
+                if attempt < retries:
+                    await asyncio.sleep(delay * 2**attempt)
+        logger.warning("Could not score article %s: %r", article_id, error)
+        return error
+
+    return list(await asyncio.gather(*(analyze(article_id, text) for article_id, text in texts)))
+
+
+async def run_backfill(
+    job: Job,
+    analyzer: SentimentAnalyzer | None = None,
+    chunk_size: int = BACKFILL_CHUNK,
+    concurrency: int = BACKFILL_CONCURRENCY,
+    replace: bool = False,
+    restart: bool = False,
+    retries: int = BACKFILL_RETRIES,
+) -> int:
+    """Re-score stored articles with ``analyzer``, reporting progress on ``job``; returns articles scored."""
+    analyzer = analyzer or SentimentAnalyzer()
+    provider, model_version = analyzer.provider, analyzer.model_version
+    name = checkpoint_name(provider, model_version)
+    last_id = await asyncio.to_thread(open_checkpoint, name, provider, model_version, restart)
+    job.progress.update(
+        checkpoint=name,
+        resumed_after=last_id,
+        last_article_id=last_id,
+        articles_total=await asyncio.to_thread(remaining, last_id),
+        articles_read=0,
+        articles_scored=0,
+        articles_skipped=0,
+        articles_failed=0,
+        chunks=0,
+        articles_per_second=0.0,
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    linked: Set[str] = set()
+    scored = 0
+    started = time.monotonic()
+    pending = asyncio.ensure_future(asyncio.to_thread(load_chunk, last_id, chunk_size, provider, model_version))
+    try:
+        while True:
+            texts, read = await pending
+            if not read:
+                break
+            # Read the next chunk while this one is scored.
+            pending = asyncio.ensure_future(
+                asyncio.to_thread(load_chunk, read[-1], chunk_size, provider, model_version)
+            )
+            outcomes = await _score(analyzer, texts, semaphore, retries)
+            failed = {
+                article_id: outcome for (article_id, _), outcome in zip(texts, outcomes) if isinstance(outcome, Exception)
+            }
+            if failed and len(failed) == len(texts) and not any(
+                isinstance(error, PERMANENT_ERRORS) for error in failed.values()
+            ):
+                raise RuntimeError(
+                    f"Scoring failed for every article after id {job.progress['last_article_id']}: "
+                    f"{next(iter(failed.values()))!r}"
+                )
+            done = [(text, outcome) for text, outcome in zip(texts, outcomes) if not isinstance(outcome, Exception)]
+            linked |= await asyncio.to_thread(
+                write_chunk,
+                name,
+                [text for text, _ in done],
+                [result for _, result in done],
+                read,
+                provider,
+                model_version,
+                replace,
+                failed,
+            )
+            scored += len(done)
+            SENTIMENT_BACKFILLED.inc(len(done), provider=provider)
+            job.incr("chunks")
+            job.incr("articles_read", len(read))
+            job.incr("articles_scored", len(done))
+            job.incr("articles_failed", len(failed))
+            job.incr("articles_skipped", len(read) - len(texts))
+            job.progress["last_article_id"] = read[-1]
+            job.progress["articles_per_second"] = round(scored / max(time.monotonic() - started, 1e-9), 1)
+    finally:
+        if not pending.done():
+            pending.cancel()
+        if linked:
+            # Also after a failure: the chunks written so far changed these averages.
+            EVENTS.publish(SentimentAdded(frozenset(linked), articles=scored))
+    await asyncio.to_thread(finish_checkpoint, name)
+    logger.info("Backfill %s scored %d articles", name, scored)
+    return scored
+
+
+def submit_backfill(**options: Any) -> Job:
+    """Start a backfill, or join the one that is already running."""
+    return JOBS.submit(BACKFILL_JOB_NAME, lambda job: run_backfill(job, **options))
+
+
+def main(argv: Sequence[str] | None = None) -> None:  # pragma: no cover - CLI helper
+    from ..database import initialize_database
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK)
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--replace", action="store_true", help="delete older scores of the same provider")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first article")
+    parser.add_argument("--retries", type=int, default=BACKFILL_RETRIES, help="retries per article on transient errors")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    initialize_database()
+    job = Job(id=f"{BACKFILL_JOB_NAME}-cli", name=BACKFILL_JOB_NAME)
+    scored = asyncio.run(
+        run_backfill(
+            job,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            replace=args.replace,
+            restart=args.restart,
+            retries=args.retries,
+        )
+    )
+    logger.info("Scored %d articles (%s)", scored, job.progress)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,13 +1,15 @@
 """Simple backtesting utilities for ranking-based strategies."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, Iterable, List
 
 import numpy as np
 import pandas as pd
 
+from ..metrics import COMPUTE_SECONDS
+
 
 @dataclass(slots=True)
 class PriceBar:
@@ -42,12 +44,17 @@ class BacktestSummary:
     max_drawdown: float
     sharpe_ratio: float
     trades: List[Trade]
+    # Daily series of the run: dates (datetime64[us]), portfolio returns, equity (starts near 1).
+    dates: np.ndarray = field(default_factory=lambda: np.empty(0, dtype="datetime64[us]"))
+    returns: np.ndarray = field(default_factory=lambda: np.empty(0))
+    equity: np.ndarray = field(default_factory=lambda: np.empty(0))
 
 
 class Backtester:
     def __init__(self, config: StrategyConfig | None = None) -> None:
         self.config = config or StrategyConfig(name="SentimentRank")
 
+    @COMPUTE_SECONDS.timed(stage="backtest")
     def run(self, price_history: Iterable[PriceBar], scores: Dict[str, float]) -> BacktestSummary:
         df = pd.DataFrame([
             {"date": bar.date, "ticker": bar.ticker, "close": bar.close}
@@ -101,4 +108,7 @@ class Backtester:
             max_drawdown=max_drawdown,
             sharpe_ratio=sharpe_ratio,
             trades=trades,
+            dates=cumulative.index.to_numpy(dtype="datetime64[us]"),
+            returns=portfolio_returns.to_numpy(dtype=np.float64),
+            equity=cumulative.to_numpy(dtype=np.float64),
         )
@@ -0,0 +1,164 @@
+"""Columnar storage of backtest equity curves and trade logs.
+
+Each run keeps its daily series (dates, portfolio returns, equity) and its
+trade log as NumPy column arrays in one ``backtest_series`` row, keyed by the
+``backtest_results`` id. The arrays are written with ``np.savez`` (no pickling)
+and compressed with the content store codec; tickers and actions are
+dictionary encoded the same way snapshots intern industries. A year of daily
+points is a few KB, so listing runs never has to touch these blobs.
+
+Charts ask for a bounded number of points: :func:`downsample` keeps the first
+and last point plus the minimum and maximum of each bucket, so drawdown
+troughs and peaks survive any zoom level.
+
+Runs moved to the Parquet archive by the ``backtest_results`` retention policy
+keep these blobs in their ``series_*`` columns; :func:`archived_runs` reads
+them back so archived runs stay listable and chartable.
+"""
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+from ..models import BacktestResult
+from .content_store import DEFAULT_CODEC, compress, decompress
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .backtest import BacktestSummary
+
+
+ARCHIVED_RUNS = "backtest_results"
+RUN_FIELDS = tuple(column.name for column in BacktestResult.__table__.columns if column.name != "trades")
+SUMMARY_FIELDS = RUN_FIELDS + ("points", "trade_count")
+SERIES_FIELDS = ("series_codec", "series_equity", "series_trades", "trades")
+
+
+def encode_arrays(arrays: Mapping[str, np.ndarray], codec: str = DEFAULT_CODEC) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return compress(buffer.getvalue(), codec)
+
+
+def decode_arrays(data: bytes, codec: str) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(decompress(data, codec)), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def _intern(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    if not values:
+        return np.empty(0, dtype=str), np.empty(0, dtype=np.int32)
+    vocabulary, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return vocabulary, codes.astype(np.int32)
+
+
+def series_values(summary: "BacktestSummary", codec: str = DEFAULT_CODEC) -> Dict[str, Any]:
+    """Column values of the ``backtest_series`` row for ``summary``."""
+    trades = summary.trades
+    tickers, ticker_codes = _intern([trade.ticker for trade in trades])
+    actions, action_codes = _intern([trade.action for trade in trades])
+    equity = {
+        "dates": np.asarray(summary.dates, dtype="datetime64[us]"),
+        "returns": np.asarray(summary.returns, dtype=np.float64),
+        "equity": np.asarray(summary.equity, dtype=np.float64),
+    }
+    trade_log = {
+        "trade_date": np.asarray([trade.trade_date for trade in trades], dtype="datetime64[us]"),
+        "ticker_codes": ticker_codes,
+        "tickers": tickers,
+        "action_codes": action_codes,
+        "actions": actions,
+        "weight": np.asarray([trade.weight for trade in trades], dtype=np.float64),
+    }
+    return {
+        "codec": codec,
+        "points": len(equity["dates"]),
+        "trade_count": len(trades),
+        "equity": encode_arrays(equity, codec),
+        "trades": encode_arrays(trade_log, codec),
+    }
+
+
+def downsample(values: np.ndarray, points: int) -> np.ndarray:
+    """Indices of at most ``points`` values keeping each bucket's extremes and both ends."""
+    n = len(values)
+    if points <= 0 or n <= points:
+        return np.arange(n)
+    buckets = (points - 2) // 2
+    if buckets < 1:
+        return np.array([0, n - 1])[:points]
+    inner = np.asarray(values[1:-1], dtype=np.float64)
+    size = -(-len(inner) // buckets)
+    offsets = np.arange(buckets) * size
+    lows = np.full(buckets * size, np.inf)
+    highs = np.full(buckets * size, -np.inf)
+    lows[: len(inner)] = inner
+    highs[: len(inner)] = inner
+    extremes = np.concatenate(
+        (lows.reshape(buckets, size).argmin(axis=1) + offsets, highs.reshape(buckets, size).argmax(axis=1) + offsets)
+    )
+    extremes = extremes[extremes < len(inner)] + 1
+    return np.unique(np.concatenate(([0], extremes, [n - 1])))
+
+
+def equity_curve(data: bytes, codec: str, points: int = 0) -> Dict[str, List[Any]]:
+    """Dates, equity and drawdown of a stored run, downsampled to ``points`` (0 = all)."""
+    arrays = decode_arrays(data, codec)
+    equity = arrays["equity"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = equity / np.maximum.accumulate(equity) - 1 if len(equity) else equity
+    keep = downsample(equity, points)
+    return {
+        "dates": arrays["dates"][keep].astype(datetime).tolist(),
+        "equity": equity[keep].tolist(),
+        "drawdown": np.nan_to_num(drawdown[keep]).tolist(),
+        "returns": arrays["returns"][keep].tolist(),
+    }
+
+
+def trade_log(data: bytes, codec: str, offset: int = 0, limit: int | None = None) -> List[Dict[str, Any]]:
+    arrays = decode_arrays(data, codec)
+    window = slice(offset, None if limit is None else offset + limit)
+    return [
+        {"trade_date": trade_date, "ticker": ticker, "action": action, "weight": weight}
+        for trade_date, ticker, action, weight in zip(
+            arrays["trade_date"][window].astype(datetime).tolist(),
+            arrays["tickers"][arrays["ticker_codes"][window]].tolist(),
+            arrays["actions"][arrays["action_codes"][window]].tolist(),
+            arrays["weight"][window].tolist(),
+        )
+    ]
+
+
+def archived_runs(
+    run_id: int | None = None,
+    before: int | None = None,
+    limit: int | None = None,
+    series: bool = False,
+) -> List[Dict[str, Any]]:
+    """Archived run summaries with ``points`` and ``trade_count``, newest first.
+
+    ``before`` keeps runs with a smaller id; with ``limit`` only the newest
+    month partitions needed for one page are read. Summaries never touch the
+    series blobs. With ``series`` each run also carries its ``series_codec``,
+    ``series_equity`` and ``series_trades`` blobs and the legacy ``trades`` list.
+    """
+    from .retention import archived_before, read_archive  # pyarrow; only needed once runs were archived
+
+    if archived_before(ARCHIVED_RUNS) is None:
+        return []
+    where = {"id": [run_id]} if run_id is not None else None
+    columns = SUMMARY_FIELDS + (SERIES_FIELDS if series else ())
+    table = read_archive(ARCHIVED_RUNS, columns, where=where, key_below=before, limit=limit, newest_first=True)
+    runs = sorted(table.to_pylist(), key=itemgetter("id"), reverse=True)[:limit]
+    for run in runs:
+        # Runs stored before the series table, or archived before their counts were, report no points.
+        run["points"] = run["points"] or 0
+        run["trade_count"] = run["trade_count"] or 0
+        if series:
+            run["trades"] = json.loads(run["trades"] or "[]")
+    return runs
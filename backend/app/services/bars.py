@@ -0,0 +1,88 @@
+"""Daily bars in ``quote_bars``, the price history read by the factor engine.
+
+Bars come from :func:`~.simulator.backfill_history` and from the scheduler's
+market refresh, which stores each trading day's closing snapshot with
+:func:`closing_bars`. Bars are keyed by ``(ticker, trade_date)``: writing a
+pair that is already stored replaces its values.
+"""
+from __future__ import annotations
+
+from datetime import datetime, time, timezone
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import QuoteBar
+from .calendar import TradingCalendar
+from .snapshot import QuoteSnapshot
+
+BAR_VALUES = ("close", "volume", "amount", "turnover_rate")
+
+
+def _bar_writer(session: Session):
+    """Statement writing bars, replacing the values of ``(ticker, trade_date)`` pairs that exist.
+
+    SQLite and PostgreSQL upsert; other dialects get ``None`` and the caller
+    skips the pairs that are already stored.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(QuoteBar.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["ticker", "trade_date"], set_={name: stmt.excluded[name] for name in BAR_VALUES}
+    )
+
+
+def write_bars(session: Session, rows: Sequence[Dict[str, object]]) -> int:
+    """Write bar ``rows`` (``ticker``, ``trade_date`` and :data:`BAR_VALUES`); returns the rows written."""
+    if not rows:
+        return 0
+    writer = _bar_writer(session)
+    with DB_WRITE_SECONDS.time(table="quote_bars"):
+        if writer is not None:
+            session.execute(writer, rows)
+        else:
+            dates = [row["trade_date"] for row in rows]
+            stored = set(
+                session.execute(
+                    select(QuoteBar.ticker, QuoteBar.trade_date).where(QuoteBar.trade_date.between(min(dates), max(dates)))
+                ).tuples()
+            )
+            rows = [row for row in rows if (row["ticker"], row["trade_date"]) not in stored]
+            if rows:
+                session.execute(insert(QuoteBar), rows)
+    DB_ROWS_WRITTEN.inc(len(rows), table="quote_bars")
+    return len(rows)
+
+
+def closing_bars(snapshot: QuoteSnapshot, calendar: TradingCalendar) -> List[Dict[str, object]]:
+    """The day's bars from ``snapshot`` when it was taken after the close of a trading day, else none.
+
+    Intraday snapshots are skipped: :meth:`~.factors.FactorEngine.sync` only
+    loads dates after its last one, so a bar stored before the close would
+    never be replaced in the engine's panel by the closing values.
+    """
+    if not len(snapshot) or snapshot.as_of is None:
+        return []
+    local = snapshot.as_of.replace(tzinfo=timezone.utc).astimezone(calendar.tz)
+    if not calendar.is_trading_day(local.date()) or local.time() < calendar.sessions[-1][1]:
+        return []
+    trade_date = datetime.combine(local.date(), time())
+    close = snapshot["price"]
+    priced = np.isfinite(close) & (close > 0)
+    columns = [snapshot.tickers[priced].tolist(), close[priced].tolist()] + [
+        snapshot[name][priced].tolist() for name in ("volume", "amount", "turnover_rate")
+    ]
+    return [
+        {"ticker": ticker, "trade_date": trade_date, "close": price, "volume": volume, "amount": amount,
+         "turnover_rate": turnover}
+        for ticker, price, volume, amount, turnover in zip(*columns)
+    ]
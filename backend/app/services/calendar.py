@@ -0,0 +1,110 @@
+"""A-share trading calendar: exchange sessions and holidays."""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import FrozenSet, Iterable, Sequence, Set, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_TZ = ZoneInfo("Asia/Shanghai")
+
+SESSIONS: Tuple[Tuple[time, time], ...] = ((time(9, 30), time(11, 30)), (time(13, 0), time(15, 0)))
+
+# SSE/SZSE full-day closures, one ``start[,end]`` range per line (weekends
+# are always closed). The exchanges publish next year's schedule each winter;
+# add it to holidays.txt, point BETTERSTOCK_HOLIDAYS_FILE at a maintained copy,
+# or list single days in BETTERSTOCK_EXTRA_HOLIDAYS=2027-01-01,2027-02-08.
+HOLIDAYS_FILE = Path(os.getenv("BETTERSTOCK_HOLIDAYS_FILE", str(Path(__file__).with_name("holidays.txt"))))
+
+_warned_years: Set[int] = set()
+
+
+def _expand(ranges: Iterable[Tuple[str, str]]) -> FrozenSet[date]:
+    days = set()
+    for start, end in ranges:
+        current, last = date.fromisoformat(start), date.fromisoformat(end)
+        while current <= last:
+            days.add(current)
+            current += timedelta(days=1)
+    return frozenset(days)
+
+
+def load_holidays(path: Path = HOLIDAYS_FILE) -> FrozenSet[date]:
+    """Closed days listed in ``path``; blank lines and ``#`` comments are skipped."""
+    ranges = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            start, _, end = line.partition(",")
+            ranges.append((start.strip(), end.strip() or start.strip()))
+    return _expand(ranges)
+
+
+def _env_holidays() -> FrozenSet[date]:
+    raw = os.getenv("BETTERSTOCK_EXTRA_HOLIDAYS", "")
+    return frozenset(date.fromisoformat(value.strip()) for value in raw.split(",") if value.strip())
+
+
+HOLIDAYS = load_holidays() | _env_holidays()
+
+
+@dataclass(frozen=True)
+class TradingCalendar:
+    holidays: FrozenSet[date] = HOLIDAYS
+    sessions: Sequence[Tuple[time, time]] = SESSIONS
+    tz: ZoneInfo = EXCHANGE_TZ
+    # Last year with listed holidays; later years are treated as having none.
+    covered_until: int | None = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "covered_until", max(self.holidays).year if self.holidays else None)
+
+    def _local(self, moment: datetime) -> datetime:
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=self.tz)
+        return moment.astimezone(self.tz)
+
+    def is_trading_day(self, day: date) -> bool:
+        covered = self.covered_until
+        if covered is not None and day.year > covered and day.year not in _warned_years:
+            _warned_years.add(day.year)
+            logger.warning(
+                "Trading calendar lists holidays up to %d only; every weekday of %d counts as a trading day. "
+                "Add the exchange schedule to %s or set BETTERSTOCK_EXTRA_HOLIDAYS.",
+                covered,
+                day.year,
+                HOLIDAYS_FILE,
+            )
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session_at(self, moment: datetime) -> Tuple[datetime, datetime] | None:
+        """The (open, close) of the session containing ``moment``, if any."""
+        local = self._local(moment)
+        if not self.is_trading_day(local.date()):
+            return None
+        for start, end in self.sessions:
+            opens = datetime.combine(local.date(), start, self.tz)
+            closes = datetime.combine(local.date(), end, self.tz)
+            if opens <= local < closes:
+                return opens, closes
+        return None
+
+    def in_session(self, moment: datetime) -> bool:
+        return self.session_at(moment) is not None
+
+    def next_open(self, moment: datetime) -> datetime:
+        local = self._local(moment)
+        day = local.date()
+        for _ in range(60):
+            if self.is_trading_day(day):
+                for start, _end in self.sessions:
+                    opens = datetime.combine(day, start, self.tz)
+                    if opens > local:
+                        return opens
+            day += timedelta(days=1)
+        raise RuntimeError("No trading session found within 60 days")
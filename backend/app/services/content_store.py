@@ -0,0 +1,117 @@
+"""Compressed, content-addressed storage for article bodies and raw payloads.
+
+Blobs are keyed by the SHA-256 of their uncompressed bytes, so identical
+bodies (syndicated articles, re-crawls under a new URL) are stored once.
+They are compressed with zstd when the ``zstandard`` package is installed and
+zlib otherwise; the codec is recorded per blob so both can be read back.
+
+Run ``python -m app.services.content_store`` to move legacy inline
+``content``/``raw_payload`` values into the store.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import zlib
+from typing import Any, Dict
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from ..models import ContentBlob, NewsArticle
+
+logger = logging.getLogger(__name__)
+
+try:  # pragma: no cover - optional dependency
+    import zstandard  # type: ignore
+
+    _ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=9)
+    _ZSTD_DECOMPRESSOR = zstandard.ZstdDecompressor()
+    DEFAULT_CODEC = "zstd"
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+    DEFAULT_CODEC = "zlib"
+
+
+def compress(raw: bytes, codec: str = DEFAULT_CODEC) -> bytes:
+    if codec == "zstd":
+        return _ZSTD_COMPRESSOR.compress(raw)
+    if codec == "zlib":
+        return zlib.compress(raw, 9)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard package is required to read zstd blobs")
+        return _ZSTD_DECOMPRESSOR.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class ContentStore:
+    """Session-bound writer that deduplicates blobs, including within one batch."""
+
+    def __init__(self, session: Session, codec: str = DEFAULT_CODEC) -> None:
+        self.session = session
+        self.codec = codec
+        self._pending: Dict[str, ContentBlob] = {}
+
+    def put_bytes(self, raw: bytes) -> ContentBlob:
+        digest = hashlib.sha256(raw).hexdigest()
+        blob = self._pending.get(digest) or self.session.get(ContentBlob, digest)
+        if blob is None:
+            blob = ContentBlob(hash=digest, codec=self.codec, size=len(raw), data=compress(raw, self.codec))
+            self.session.add(blob)
+        self._pending[digest] = blob
+        return blob
+
+    def put_text(self, value: str | None) -> ContentBlob | None:
+        if not value:
+            return None
+        return self.put_bytes(value.encode("utf-8"))
+
+    def put_json(self, value: Any) -> ContentBlob | None:
+        if not value:
+            return None
+        return self.put_bytes(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+
+
+def compact_legacy_rows(session: Session, batch_size: int = 500) -> int:
+    """Move inline article content/payloads into the store; returns rows migrated."""
+    store = ContentStore(session)
+    stmt = (
+        select(NewsArticle)
+        .where(or_(NewsArticle._content.is_not(None), NewsArticle._raw_payload.is_not(None)))
+        .limit(batch_size)
+    )
+    migrated = 0
+    while True:
+        articles = session.execute(stmt).scalars().all()
+        if not articles:
+            return migrated
+        for article in articles:
+            article.set_content(article._content, store)
+            article.set_raw_payload(article._raw_payload, store)
+        session.flush()
+        migrated += len(articles)
+
+
+def main() -> None:  # pragma: no cover - CLI helper
+    from ..database import engine, initialize_database, session_scope
+
+    logging.basicConfig(level=logging.INFO)
+    initialize_database(engine)
+    with session_scope() as session:
+        migrated = compact_legacy_rows(session)
+    logger.info("Moved %d articles into the content store", migrated)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
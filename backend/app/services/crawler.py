@@ -2,17 +2,24 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import os
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, Iterable, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List
 
 import aiohttp
 from bs4 import BeautifulSoup
 
+from ..metrics import CRAWL_ERRORS, CRAWL_ITEMS, CRAWL_SECONDS
+
 logger = logging.getLogger(__name__)
 
 
+SourceCallback = Callable[["BaseSource", "List[NewsItem] | None"], None]
+
+
 @dataclass(slots=True)
 class NewsItem:
     source: str
@@ -31,17 +38,40 @@ class BaseSource:
         raise NotImplementedError
 
 
-class RSSSource(BaseSource):
+class PageSource(BaseSource):
+    """Source that downloads one page and parses items out of it.
+
+    Download and parse are timed separately so slow networks and slow
+    parsers show up as different series in ``/metrics``.
+    """
+
+    name: str
+    _url: str
+
+    async def fetch(self, session: aiohttp.ClientSession) -> AsyncIterator[NewsItem]:
+        with CRAWL_SECONDS.time(source=self.name, phase="fetch"):
+            async with session.get(self._url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                text = await response.text()
+        with CRAWL_SECONDS.time(source=self.name, phase="parse"):
+            items = self.parse(text)
+        CRAWL_ITEMS.inc(len(items), source=self.name)
+        for item in items:
+            yield item
+
+    def parse(self, text: str) -> List[NewsItem]:
+        raise NotImplementedError
+
+
+class RSSSource(PageSource):
     """Generic RSS source fetcher."""
 
     def __init__(self, name: str, url: str) -> None:
         self.name = name
         self._url = url
 
-    async def fetch(self, session: aiohttp.ClientSession) -> AsyncIterator[NewsItem]:
-        async with session.get(self._url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            text = await response.text()
+    def parse(self, text: str) -> List[NewsItem]:
         soup = BeautifulSoup(text, "xml")
+        items: List[NewsItem] = []
         for item in soup.find_all("item")[:20]:
             link = item.link.text if item.link else ""
             pub_date = item.pubDate.text if item.pubDate else ""
@@ -52,18 +82,21 @@ class RSSSource(BaseSource):
             )
             description = item.description.text if item.description else ""
             content = description
-            yield NewsItem(
-                source=self.name,
-                title=item.title.text if item.title else "",
-                url=link,
-                published_at=published_at,
-                summary=description[:200],
-                content=content,
-                payload={"raw": item.text},
+            items.append(
+                NewsItem(
+                    source=self.name,
+                    title=item.title.text if item.title else "",
+                    url=link,
+                    published_at=published_at,
+                    summary=description[:200],
+                    content=content,
+                    payload={"raw": item.text},
+                )
             )
+        return items
 
 
-class HtmlListSource(BaseSource):
+class HtmlListSource(PageSource):
     """Source scraping simple HTML list pages."""
 
     def __init__(self, name: str, url: str, item_selector: str) -> None:
@@ -71,53 +104,90 @@ class HtmlListSource(BaseSource):
         self._url = url
         self._selector = item_selector
 
-    async def fetch(self, session: aiohttp.ClientSession) -> AsyncIterator[NewsItem]:
-        async with session.get(self._url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            text = await response.text()
+    def parse(self, text: str) -> List[NewsItem]:
         soup = BeautifulSoup(text, "html.parser")
+        items: List[NewsItem] = []
         for element in soup.select(self._selector)[:20]:
             link = element.get("href") or self._url
             title = element.text.strip()
-            yield NewsItem(
-                source=self.name,
-                title=title,
-                url=link,
-                published_at=datetime.utcnow(),
-                summary=title,
-                content=title,
-                payload={"raw": element.attrs},
+            items.append(
+                NewsItem(
+                    source=self.name,
+                    title=title,
+                    url=link,
+                    published_at=datetime.utcnow(),
+                    summary=title,
+                    content=title,
+                    payload={"raw": element.attrs},
+                )
             )
+        return items
 
 
 class NewsCrawler:
     def __init__(self, sources: Iterable[BaseSource]) -> None:
         self.sources = list(sources)
 
-    async def crawl(self) -> List[NewsItem]:
+    async def crawl(self, on_source_done: SourceCallback | None = None) -> List[NewsItem]:
+        """Crawl all sources concurrently.
+
+        ``on_source_done`` is called once per source with its items, or with
+        ``None`` if the source failed.
+        """
         results: List[NewsItem] = []
         async with aiohttp.ClientSession(headers={"User-Agent": "BetterStockBot/1.0"}) as session:
-            tasks = [self._fetch_source(session, source) for source in self.sources]
+            tasks = [self._fetch_source(session, source, on_source_done) for source in self.sources]
             for task in asyncio.as_completed(tasks):
-                try:
-                    items = await task
-                    results.extend(items)
-                except Exception as exc:  # pragma: no cover - network errors
-                    logger.exception("Failed to crawl source: %s", exc)
+                results.extend(await task)
         return results
 
-    async def _fetch_source(self, session: aiohttp.ClientSession, source: BaseSource) -> List[NewsItem]:
+    async def _fetch_source(
+        self, session: aiohttp.ClientSession, source: BaseSource, on_source_done: SourceCallback | None
+    ) -> List[NewsItem]:
         items: List[NewsItem] = []
-        async for item in source.fetch(session):
-            items.append(item)
+        try:
+            async for item in source.fetch(session):
+                items.append(item)
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.exception("Failed to crawl source %s: %s", source.name, exc)
+            CRAWL_ERRORS.inc(source=source.name)
+            if on_source_done is not None:
+                on_source_done(source, None)
+            return []
+        if on_source_done is not None:
+            on_source_done(source, items)
         return items
 
 
-DEFAULT_SOURCES: List[BaseSource] = [
-    RSSSource("东方财富", "https://finance.eastmoney.com/rss/stock.xml"),
-    RSSSource("新浪财经", "https://rss.sina.com.cn/finance/stock/cnstocknews.xml"),
-]
+def sources_from_config(raw: str) -> List[BaseSource]:
+    """Build sources from JSON such as ``[{"name": "a", "type": "rss", "url": "..."}]``.
+
+    ``type`` is ``rss`` (default) or ``html``; HTML sources also need ``selector``.
+    """
+    sources: List[BaseSource] = []
+    for entry in json.loads(raw):
+        kind = entry.get("type", "rss")
+        if kind == "rss":
+            sources.append(RSSSource(entry["name"], entry["url"]))
+        elif kind == "html":
+            sources.append(HtmlListSource(entry["name"], entry["url"], entry["selector"]))
+        else:
+            raise ValueError(f"Unknown news source type: {kind}")
+    return sources
+
+
+_NEWS_SOURCES = os.getenv("BETTERSTOCK_NEWS_SOURCES")
+
+DEFAULT_SOURCES: List[BaseSource] = (
+    sources_from_config(_NEWS_SOURCES)
+    if _NEWS_SOURCES
+    else [
+        RSSSource("东方财富", "https://finance.eastmoney.com/rss/stock.xml"),
+        RSSSource("新浪财经", "https://rss.sina.com.cn/finance/stock/cnstocknews.xml"),
+    ]
+)
 
 
-async def fetch_latest_news() -> List[NewsItem]:
+async def fetch_latest_news(on_source_done: SourceCallback | None = None) -> List[NewsItem]:
     crawler = NewsCrawler(DEFAULT_SOURCES)
-    return await crawler.crawl()
+    return await crawler.crawl(on_source_done)
@@ -0,0 +1,135 @@
+"""In-process change events with short-window coalescing.
+
+Writers publish what changed (new quotes, new sentiment for some tickers,
+new industry factors); subscribers such as :mod:`.live_scores` react to the
+changes instead of recomputing everything. Events of the same type that
+arrive within ``BETTERSTOCK_EVENT_COALESCE_MS`` are merged and delivered as
+one, so a burst of ingested articles triggers a single recompute.
+
+Events only reach subscribers in the publishing process; consumers in other
+workers must resynchronise from the database on their own.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, FrozenSet, List, Type, TypeVar, Union
+
+from ..metrics import Counter
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = float(os.getenv("BETTERSTOCK_EVENT_COALESCE_MS", "200")) / 1000
+
+EVENTS_PUBLISHED = Counter("betterstock_events_published_total", "Change events published.", ("event",))
+EVENTS_DELIVERED = Counter(
+    "betterstock_events_delivered_total", "Coalesced change events handed to subscribers.", ("event",)
+)
+
+
+@dataclass(frozen=True, slots=True)
+class QuoteChanged:
+    """A new quote snapshot replaced the previous one; only the latest matters."""
+
+    snapshot: "QuoteSnapshot"
+
+    def merge(self, later: "QuoteChanged") -> "QuoteChanged":
+        return later
+
+
+@dataclass(frozen=True, slots=True)
+class SentimentAdded:
+    """New sentiment scores were stored for articles linked to ``tickers``."""
+
+    tickers: FrozenSet[str]
+    articles: int = 0
+
+    def merge(self, later: "SentimentAdded") -> "SentimentAdded":
+        return SentimentAdded(self.tickers | later.tickers, self.articles + later.articles)
+
+
+@dataclass(frozen=True, slots=True)
+class IndustryFactorUpdated:
+    """Industry factor rows (``industry::<name>``) were rewritten."""
+
+    industries: FrozenSet[str]
+
+    def merge(self, later: "IndustryFactorUpdated") -> "IndustryFactorUpdated":
+        return IndustryFactorUpdated(self.industries | later.industries)
+
+
+Event = Union[QuoteChanged, SentimentAdded, IndustryFactorUpdated]
+E = TypeVar("E", QuoteChanged, SentimentAdded, IndustryFactorUpdated)
+Handler = Callable[[E], Union[Awaitable[None], None]]
+
+
+class EventBus:
+    """Buffers events per type and delivers the merged event after ``window`` seconds.
+
+    Handlers may be plain functions or coroutines and run on the publishing
+    event loop; a failing handler is logged and does not affect the others.
+    Events published without a running loop wait for the next flush.
+    """
+
+    def __init__(self, window: float = COALESCE_WINDOW) -> None:
+        self.window = window
+        self._handlers: Dict[type, List[Handler]] = defaultdict(list)
+        self._pending: Dict[type, Event] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, event_type: Type[E], handler: Handler) -> None:
+        self._handlers[event_type].append(handler)
+
+    def publish(self, event: Event) -> None:
+        kind = type(event)
+        EVENTS_PUBLISHED.inc(event=kind.__name__)
+        if not self._handlers.get(kind):
+            return
+        pending = self._pending.get(kind)
+        self._pending[kind] = event if pending is None else pending.merge(event)  # type: ignore[arg-type]
+        if self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._timer = loop.call_later(self.window, self._dispatch)
+
+    async def flush(self) -> None:
+        """Deliver pending events now and wait for their handlers."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        for kind, event in pending.items():
+            EVENTS_DELIVERED.inc(event=kind.__name__)
+            for handler in list(self._handlers.get(kind, ())):
+                try:
+                    result = handler(event)
+                except Exception:
+                    logger.exception("Event handler %r failed for %s", handler, kind.__name__)
+                    continue
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Event handler failed", exc_info=task.exception())
+
+
+EVENTS = EventBus()
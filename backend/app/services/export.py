@@ -0,0 +1,257 @@
+"""Bulk export of tables as NDJSON, Arrow IPC streams or Parquet.
+
+Rows are read with Core ``select`` statements in batches of
+``BETTERSTOCK_EXPORT_BATCH`` (server-side cursors where the driver supports
+them) and every batch is encoded and handed to the client before the next one
+is fetched, so memory use depends on the batch size, not on the result size.
+No ORM objects or Pydantic models are built.
+
+Datasets with a retention policy (see :mod:`.retention`) read archived rows
+from the Parquet archive first, then the rows still in the database. Sentiment
+scores are archived inside their articles and are unpacked from there.
+
+Arrow and Parquet need ``pyarrow``; NDJSON works without it.
+"""
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Engine, Row
+
+from ..database import engine as default_engine
+from ..models import (
+    BacktestResult,
+    IndustryFactor,
+    IndustryStat,
+    NewsArticle,
+    QuoteBar,
+    SentimentScore,
+    StockQuote,
+)
+from .arrow import arrow_schema, require_pyarrow
+from .retention import archived_batches
+
+EXPORT_BATCH = int(os.getenv("BETTERSTOCK_EXPORT_BATCH", "10000"))
+
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+@dataclass(slots=True)
+class ExportFilters:
+    tickers: Sequence[str] | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+
+
+@dataclass(slots=True)
+class Dataset:
+    """A named export: the statement to run and how to filter it."""
+
+    name: str
+    build: Callable[[], Select]
+    time_column: Any
+    ticker_column: Any | None = None
+    order_by: Sequence[Any] = ()
+    archive: str | None = None
+    # Reads archived rows when they are not stored as rows of ``archive``.
+    archived: Callable[[ExportFilters, List[str], int, Engine], Iterator[List[tuple]]] | None = None
+
+    def statement(self, filters: ExportFilters) -> Select:
+        stmt = self.build()
+        if filters.tickers and self.ticker_column is not None:
+            stmt = stmt.where(self.ticker_column.in_(list(filters.tickers)))
+        if filters.since is not None:
+            stmt = stmt.where(self.time_column >= filters.since)
+        if filters.until is not None:
+            stmt = stmt.where(self.time_column < filters.until)
+        return stmt.order_by(*self.order_by)
+
+
+def _backtests() -> Select:
+    # ``trades`` is a nested JSON list; export the summaries only.
+    return select(*(column for column in BacktestResult.__table__.columns if column.name != "trades"))
+
+
+def _archived_sentiments(
+    filters: ExportFilters, names: List[str], batch_size: int, engine: Engine
+) -> Iterator[List[tuple]]:
+    """Scores of archived articles, unpacked from each article's ``sentiments`` list."""
+    columns = ("id", "source", "published_at", "sentiments")
+    for batch in archived_batches("news_articles", columns, filters.since, filters.until, None, batch_size, engine):
+        rows = []
+        for article_id, source, published_at, sentiments in batch:
+            for score in json.loads(sentiments or "[]"):
+                values = {**score, "article_id": article_id, "source": source, "published_at": published_at}
+                rows.append(tuple(values.get(name) for name in names))
+        if rows:
+            yield rows
+
+
+DATASETS: Dict[str, Dataset] = {
+    "quotes": Dataset(
+        "quotes",
+        lambda: select(*StockQuote.__table__.columns),
+        StockQuote.updated_at,
+        StockQuote.ticker,
+        (StockQuote.ticker,),
+    ),
+    "quote_bars": Dataset(
+        "quote_bars",
+        lambda: select(*QuoteBar.__table__.columns),
+        QuoteBar.trade_date,
+        QuoteBar.ticker,
+        (QuoteBar.ticker, QuoteBar.trade_date),
+        "quote_bars",
+    ),
+    "industry_factors": Dataset(
+        "industry_factors",
+        lambda: select(*IndustryFactor.__table__.columns),
+        IndustryFactor.as_of,
+        IndustryFactor.ticker,
+        (IndustryFactor.as_of, IndustryFactor.id),
+    ),
+    "industry_stats": Dataset(
+        "industry_stats",
+        lambda: select(*IndustryStat.__table__.columns),
+        IndustryStat.as_of,
+        None,
+        (IndustryStat.as_of, IndustryStat.industry),
+        "industry_stats",
+    ),
+    "sentiments": Dataset(
+        "sentiments",
+        lambda: select(
+            SentimentScore.id,
+            SentimentScore.article_id,
+            SentimentScore.provider,
+            SentimentScore.sentiment,
+            SentimentScore.confidence,
+            NewsArticle.source,
+            NewsArticle.published_at,
+        ).join(NewsArticle, NewsArticle.id == SentimentScore.article_id),
+        NewsArticle.published_at,
+        None,
+        (SentimentScore.id,),
+        archived=_archived_sentiments,
+    ),
+    "backtests": Dataset(
+        "backtests", _backtests, BacktestResult.created_at, None, (BacktestResult.id,), "backtest_results"
+    ),
+}
+
+
+def _batches(engine: Engine, stmt: Select, batch_size: int) -> Iterator[List[Row]]:
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        yield from result.partitions(batch_size)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value)!r}")
+
+
+def _ndjson(batches: Iterator[List[Row]], names: List[str]) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+    for rows in batches:
+        yield "".join(dumps(dict(zip(names, row))) + "\n" for row in rows).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing out what was written since the last :meth:`drain`.
+
+    Unlike a truncated ``BytesIO`` it keeps counting positions, which the
+    Parquet footer records as row group offsets.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _record_batch(pa: Any, schema: Any, rows: List[Row]) -> Any:
+    columns = list(zip(*rows))
+    return pa.record_batch([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+
+def _arrow(batches: Iterator[List[Row]], schema: Any) -> Iterator[bytes]:
+    pa = require_pyarrow("Arrow and Parquet exports")
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for rows in batches:
+            writer.write_batch(_record_batch(pa, schema, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet(batches: Iterator[List[Row]], schema: Any) -> Iterator[bytes]:
+    pa = require_pyarrow("Arrow and Parquet exports")
+    import pyarrow.parquet as pq  # type: ignore
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in batches:
+            # One row group per batch keeps the writer's buffer bounded.
+            writer.write_table(pa.Table.from_batches([_record_batch(pa, schema, rows)]))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export(
+    dataset: str,
+    fmt: str = "ndjson",
+    filters: ExportFilters | None = None,
+    engine: Engine = default_engine,
+    batch_size: int = EXPORT_BATCH,
+) -> Iterator[bytes]:
+    """Encoded chunks of ``dataset``; a blocking iterator meant for a worker thread."""
+    if dataset not in DATASETS:
+        raise KeyError(dataset)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    spec = DATASETS[dataset]
+    filters = filters or ExportFilters()
+    stmt = spec.statement(filters)
+    batches: Iterator[List[Any]] = _batches(engine, stmt, batch_size)
+    names = [column.name for column in stmt.selected_columns]
+    if spec.archived is not None:
+        batches = itertools.chain(spec.archived(filters, names, batch_size, engine), batches)
+    elif spec.archive is not None:
+        where = {spec.ticker_column.name: filters.tickers} if filters.tickers and spec.ticker_column is not None else None
+        archived = archived_batches(spec.archive, names, filters.since, filters.until, where, batch_size, engine)
+        batches = itertools.chain(archived, batches)
+    if fmt == "ndjson":
+        return _ndjson(batches, names)
+    schema = arrow_schema(require_pyarrow("Arrow and Parquet exports"), stmt.selected_columns)
+    return _arrow(batches, schema) if fmt == "arrow" else _parquet(batches, schema)
@@ -0,0 +1,404 @@
+"""Vectorised technical factors over a date x ticker price panel.
+
+Each factor is declared once with :func:`factor` together with the number of
+bars it looks back over, and is computed for the whole market in one NumPy
+expression over the last ``lookback`` rows of a :class:`PricePanel`.
+
+:class:`FactorEngine` keeps a panel of the most recent daily bars from
+``quote_bars`` (only as many as the longest lookback needs), loads new bars
+incrementally, appends the live quote snapshot as a provisional bar when it was
+taken during a trading day (weekend and holiday snapshots only repeat the last
+close) and caches the factor cross-section per as-of. The weighted
+composite of cross-sectionally standardised factors is what
+:class:`~.scoring.ScoreEngine` uses as its technical component.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from ..database import session_scope
+from ..metrics import COMPUTE_SECONDS
+from ..models import QuoteBar
+from .calendar import TradingCalendar
+from .snapshot import QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+FACTOR_SYNC_INTERVAL = float(os.getenv("BETTERSTOCK_FACTOR_SYNC", "300"))
+TRADING_DAYS_PER_YEAR = 252
+
+PANEL_FIELDS = ("close", "volume", "amount", "turnover_rate")
+
+
+@dataclass(slots=True)
+class PricePanel:
+    """Daily bars as ``(days, tickers)`` float arrays; missing bars are NaN."""
+
+    dates: np.ndarray  # datetime64[D], ascending
+    tickers: np.ndarray
+    fields: Dict[str, np.ndarray]
+    _index: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self._index:
+            self._index = {ticker: col for col, ticker in enumerate(self.tickers.tolist())}
+
+    @classmethod
+    def empty(cls) -> "PricePanel":
+        return cls(np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=str), {name: np.empty((0, 0)) for name in PANEL_FIELDS})
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> "PricePanel":
+        """Pivot ``(ticker, trade_date, close, volume, amount, turnover_rate)`` rows."""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        tickers, dates, *values = zip(*rows)
+        ticker_vocab, ticker_codes = np.unique(np.asarray(tickers, dtype=str), return_inverse=True)
+        date_vocab, date_codes = np.unique(np.asarray(dates, dtype="datetime64[D]"), return_inverse=True)
+        fields: Dict[str, np.ndarray] = {}
+        for name, column in zip(PANEL_FIELDS, values):
+            grid = np.full((len(date_vocab), len(ticker_vocab)), np.nan)
+            grid[date_codes, ticker_codes] = np.asarray(column, dtype=np.float64)
+            fields[name] = grid
+        return cls(date_vocab, ticker_vocab, fields)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    @property
+    def last_date(self) -> np.datetime64 | None:
+        return self.dates[-1] if len(self.dates) else None
+
+    def tail(self, days: int) -> "PricePanel":
+        if len(self) <= days:
+            return self
+        return PricePanel(self.dates[-days:], self.tickers, {k: v[-days:] for k, v in self.fields.items()}, self._index)
+
+    def extend(self, other: "PricePanel") -> "PricePanel":
+        """Append ``other``'s later dates, re-keyed onto the union of tickers."""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        newer = other.dates > self.dates[-1]
+        if np.array_equal(self.tickers, other.tickers):
+            tickers, own_cols, other_cols = self.tickers, slice(None), slice(None)
+        else:
+            tickers = np.union1d(self.tickers, other.tickers)
+            own_cols, other_cols = np.searchsorted(tickers, self.tickers), np.searchsorted(tickers, other.tickers)
+        fields = {}
+        for name in PANEL_FIELDS:
+            grid = np.full((len(self) + int(newer.sum()), len(tickers)), np.nan)
+            grid[: len(self), own_cols] = self.fields[name]
+            grid[len(self) :, other_cols] = other.fields[name][newer]
+            fields[name] = grid
+        return PricePanel(np.concatenate([self.dates, other.dates[newer]]), tickers, fields)
+
+    def with_bar(self, date: np.datetime64, snapshot: QuoteSnapshot) -> "PricePanel":
+        """This panel plus one bar built from ``snapshot`` (replacing ``date`` if present)."""
+        base = self if not len(self) or self.dates[-1] < date else self.tail(len(self) - 1)
+        rows = np.fromiter(
+            (-1 if row is None else row for row in map(snapshot.row, base.tickers.tolist())), np.intp, len(base.tickers)
+        )
+        present = rows >= 0
+        columns = {"close": snapshot["price"], "volume": snapshot["volume"], "amount": snapshot["amount"],
+                   "turnover_rate": snapshot["turnover_rate"]}
+        fields = {}
+        for name in PANEL_FIELDS:
+            bar = np.full((1, len(base.tickers)), np.nan)
+            bar[0, present] = columns[name][rows[present]]
+            fields[name] = np.vstack([base.fields[name], bar])
+        return PricePanel(np.append(base.dates, date), base.tickers, fields, base._index)
+
+
+@dataclass(frozen=True, slots=True)
+class Factor:
+    name: str
+    lookback: int
+    compute: Callable[[PricePanel], np.ndarray]
+    description: str = ""
+
+
+FACTORS: Dict[str, Factor] = {}
+
+
+def factor(name: str, lookback: int) -> Callable[[Callable[[PricePanel], np.ndarray]], Callable[[PricePanel], np.ndarray]]:
+    """Register ``func(panel) -> values per ticker``; ``panel`` holds the last ``lookback`` bars."""
+
+    def register(func: Callable[[PricePanel], np.ndarray]) -> Callable[[PricePanel], np.ndarray]:
+        FACTORS[name] = Factor(name, lookback, func, (func.__doc__ or "").strip())
+        return func
+
+    return register
+
+
+def _to_datetime(day: np.datetime64) -> datetime:
+    return day.astype("datetime64[us]").astype(datetime)
+
+
+def _returns(close: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(np.log(close), axis=0)
+
+
+@factor("momentum_20", lookback=21)
+def momentum_20(panel: PricePanel) -> np.ndarray:
+    """20-day price return."""
+    close = panel["close"]
+    return close[-1] / close[0] - 1
+
+
+@factor("momentum_60", lookback=61)
+def momentum_60(panel: PricePanel) -> np.ndarray:
+    """60-day price return."""
+    close = panel["close"]
+    return close[-1] / close[0] - 1
+
+
+@factor("reversal_5", lookback=6)
+def reversal_5(panel: PricePanel) -> np.ndarray:
+    """Negative 5-day return (short-term mean reversion)."""
+    close = panel["close"]
+    return 1 - close[-1] / close[0]
+
+
+@factor("volatility_20", lookback=21)
+def volatility_20(panel: PricePanel) -> np.ndarray:
+    """Annualised standard deviation of 20 daily log returns."""
+    return np.nanstd(_returns(panel["close"]), axis=0) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+
+@factor("rsi_14", lookback=15)
+def rsi_14(panel: PricePanel) -> np.ndarray:
+    """14-day RSI with simple averages (Cutler), in [0, 100]."""
+    delta = np.diff(panel["close"], axis=0)
+    gains = np.nansum(np.clip(delta, 0, None), axis=0)
+    losses = np.nansum(np.clip(-delta, 0, None), axis=0)
+    total = gains + losses
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, 100 * gains / total, 50.0)
+
+
+@factor("ma_cross_5_20", lookback=20)
+def ma_cross_5_20(panel: PricePanel) -> np.ndarray:
+    """5-day over 20-day moving average, minus one."""
+    close = panel["close"]
+    return np.nanmean(close[-5:], axis=0) / np.nanmean(close, axis=0) - 1
+
+
+@factor("drawdown_60", lookback=60)
+def drawdown_60(panel: PricePanel) -> np.ndarray:
+    """Distance of the last close below its 60-day high."""
+    close = panel["close"]
+    return close[-1] / np.nanmax(close, axis=0) - 1
+
+
+@factor("turnover_anomaly_20", lookback=21)
+def turnover_anomaly_20(panel: PricePanel) -> np.ndarray:
+    """Log ratio of the last turnover rate to its previous 20-day mean."""
+    turnover = panel["turnover_rate"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(turnover[-1] / np.nanmean(turnover[:-1], axis=0))
+
+
+DEFAULT_TECHNICAL_WEIGHTS: Dict[str, float] = {
+    "momentum_20": 0.25,
+    "ma_cross_5_20": 0.2,
+    "rsi_14": 0.15,
+    "reversal_5": 0.1,
+    "turnover_anomaly_20": 0.1,
+    "volatility_20": -0.1,
+    "drawdown_60": 0.1,
+}
+
+
+def standardize(values: np.ndarray, clip: float = 3.0) -> np.ndarray:
+    """Cross-sectional z-score; missing values become 0 (the market average)."""
+    finite = np.isfinite(values)
+    if finite.sum() < 2:
+        return np.zeros_like(values, dtype=np.float64)
+    mean = values[finite].mean()
+    std = values[finite].std()
+    scores = np.zeros_like(values, dtype=np.float64)
+    if std > 0:
+        scores[finite] = np.clip((values[finite] - mean) / std, -clip, clip)
+    return scores
+
+
+@dataclass(slots=True)
+class FactorFrame:
+    """One cross-section: every factor for every ticker of the panel at ``as_of``."""
+
+    as_of: datetime | None
+    tickers: np.ndarray
+    values: Dict[str, np.ndarray]
+    _index: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self._index:
+            self._index = {ticker: col for col, ticker in enumerate(self.tickers.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def align(self, tickers: Sequence[str] | np.ndarray, name: str) -> np.ndarray:
+        """``name`` for ``tickers`` in their order; NaN where a ticker has no history."""
+        values = self.values[name]
+        if len(tickers) == len(self.tickers) and np.array_equal(tickers, self.tickers):
+            return values
+        cols = np.fromiter((self._index.get(t, -1) for t in np.asarray(tickers).tolist()), np.intp, len(tickers))
+        out = np.full(len(cols), np.nan)
+        out[cols >= 0] = values[cols[cols >= 0]]
+        return out
+
+    def composite(self, weights: Mapping[str, float], tickers: Sequence[str] | np.ndarray | None = None) -> np.ndarray:
+        """Weighted sum of standardised factors, optionally aligned to ``tickers``."""
+        total = np.zeros(len(self.tickers) if tickers is None else len(tickers))
+        for name, weight in weights.items():
+            if name in self.values:
+                values = self.values[name] if tickers is None else self.align(tickers, name)
+                total += weight * standardize(values)
+        return total
+
+    def records(self, tickers: Iterable[str] | None = None) -> List[Dict[str, object]]:
+        """One dict per ticker; factors without enough history are ``None``."""
+        selected = self.tickers.tolist() if tickers is None else [t for t in tickers if t in self._index]
+        cols = np.asarray([self._index[t] for t in selected], dtype=np.intp)
+        columns = {}
+        for name, values in self.values.items():
+            picked = values[cols]
+            columns[name] = [value if finite else None for value, finite in zip(picked.tolist(), np.isfinite(picked).tolist())]
+        return [{"ticker": ticker, **{name: column[i] for name, column in columns.items()}} for i, ticker in enumerate(selected)]
+
+
+def compute_factors(panel: PricePanel, factors: Iterable[Factor] | None = None) -> Dict[str, np.ndarray]:
+    """Evaluate ``factors`` (default: all registered) on the last bar of ``panel``."""
+    values: Dict[str, np.ndarray] = {}
+    for spec in factors or FACTORS.values():
+        if len(panel) < spec.lookback:
+            values[spec.name] = np.full(len(panel.tickers), np.nan)
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values[spec.name] = np.asarray(spec.compute(panel.tail(spec.lookback)), dtype=np.float64)
+    return values
+
+
+def load_panel(days: int, after: np.datetime64 | None = None) -> PricePanel:
+    """The last ``days`` distinct trading dates of ``quote_bars`` (or only those after ``after``)."""
+    with session_scope() as session:
+        dates_stmt = select(QuoteBar.trade_date).distinct().order_by(QuoteBar.trade_date.desc()).limit(days)
+        if after is not None:
+            dates_stmt = dates_stmt.where(QuoteBar.trade_date >= _to_datetime(after + 1))
+        dates = session.execute(dates_stmt).scalars().all()
+        if not dates:
+            return PricePanel.empty()
+        stmt = select(
+            QuoteBar.ticker, QuoteBar.trade_date, QuoteBar.close, QuoteBar.volume, QuoteBar.amount,
+            QuoteBar.turnover_rate,
+        ).where(QuoteBar.trade_date >= min(dates))
+        return PricePanel.from_rows(session.execute(stmt))
+
+
+class FactorEngine:
+    """Keeps the price window current and caches factor cross-sections per as-of."""
+
+    def __init__(
+        self,
+        factors: Mapping[str, Factor] = FACTORS,
+        weights: Mapping[str, float] = DEFAULT_TECHNICAL_WEIGHTS,
+        sync_interval: float = FACTOR_SYNC_INTERVAL,
+        cache_size: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+        calendar: TradingCalendar | None = None,
+    ) -> None:
+        self.factors = factors
+        self.calendar = calendar or TradingCalendar()
+        self.weights = dict(weights)
+        self.sync_interval = sync_interval
+        self.cache_size = cache_size
+        self._clock = clock
+        self.panel = PricePanel.empty()
+        self._synced_at: float | None = None
+        # (last closed bar, provisional as-of) -> (snapshot it was built from, frame)
+        self._cache: "OrderedDict[Tuple[object, object], Tuple[QuoteSnapshot | None, FactorFrame]]" = OrderedDict()
+
+    @property
+    def window(self) -> int:
+        return max((spec.lookback for spec in self.factors.values()), default=1)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.panel) > 0
+
+    async def sync(self, force: bool = False) -> bool:
+        """Load bars newer than the panel (at most every ``sync_interval``); True if any arrived."""
+        if not force and self._synced_at is not None and self._clock() - self._synced_at < self.sync_interval:
+            return False
+        self._synced_at = self._clock()
+        last = self.panel.last_date
+        newer = await asyncio.to_thread(load_panel, self.window, last)
+        if not len(newer):
+            return False
+        self.append(newer)
+        return True
+
+    def append(self, bars: PricePanel) -> None:
+        """Add newly closed bars; only the last ``window`` dates are kept."""
+        self.panel = self.panel.extend(bars).tail(self.window)
+        self._cache.clear()
+        logger.info("Factor panel now %d days x %d tickers up to %s", *self.panel.fields["close"].shape, self.panel.last_date)
+
+    def session_date(self, as_of: datetime) -> np.datetime64 | None:
+        """Exchange date of a snapshot taken at ``as_of`` (UTC) once that day's market opened, else ``None``."""
+        local = as_of.replace(tzinfo=timezone.utc).astimezone(self.calendar.tz)
+        if not self.calendar.is_trading_day(local.date()) or local.time() < self.calendar.sessions[0][0]:
+            return None
+        return np.datetime64(local.date(), "D")
+
+    def frame(self, snapshot: QuoteSnapshot | None = None) -> FactorFrame:
+        """Factors as of the last closed bar, or of ``snapshot`` as a provisional bar on a trading day."""
+        if snapshot is not None and (not len(snapshot) or snapshot.as_of is None):
+            snapshot = None
+        bar_date = self.session_date(snapshot.as_of) if snapshot is not None else None
+        if bar_date is None:
+            snapshot = None
+        key = (self.panel.last_date, None if snapshot is None else snapshot.as_of)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] is snapshot:
+            self._cache.move_to_end(key)
+            return entry[1]
+        with COMPUTE_SECONDS.time(stage="factors"):
+            if snapshot is None:
+                panel = self.panel
+                as_of = _to_datetime(panel.last_date) if panel.last_date is not None else None
+            else:
+                panel = self.panel.with_bar(bar_date, snapshot)
+                as_of = snapshot.as_of
+            result = FactorFrame(as_of, panel.tickers, compute_factors(panel, self.factors.values()))
+        self._cache[key] = (snapshot, result)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def technical(self, snapshot: QuoteSnapshot) -> np.ndarray | None:
+        """Composite technical score aligned to ``snapshot``; ``None`` without price history."""
+        if not self.ready:
+            return None
+        return self.frame(snapshot).composite(self.weights, snapshot.tickers)
+
+
+FACTOR_ENGINE = FactorEngine()
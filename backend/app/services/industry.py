@@ -0,0 +1,228 @@
+"""Per-snapshot industry aggregation feeding the industry z-scores.
+
+Every market snapshot is reduced to one row per industry in a handful of
+``np.bincount`` calls over the snapshot's interned industry codes:
+
+* ``cap_return``: float-cap-weighted percent change. Quotes carry no market
+  cap, so the float cap is implied from ``amount / turnover_rate``; industries
+  whose members have no trading fall back to the plain mean;
+* ``breadth``: share of members that are up;
+* ``turnover``: mean turnover rate;
+* ``sentiment``: mean article sentiment over the members that have news.
+
+The rows are appended to the ``industry_stats`` table, the time series
+:class:`~.zscore.ZScoreCalculator` standardises over the last
+``BETTERSTOCK_INDUSTRY_HISTORY`` snapshots. Aggregating the full market takes
+about a millisecond.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..database import session_scope
+from ..metrics import COMPUTE_SECONDS, DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import IndustryStat
+from .events import EVENTS, EventBus, SentimentAdded
+from .live_scores import SCORE_RESYNC, load_sentiment
+from .snapshot import QuoteSnapshot
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .zscore import IndustryMetric, IndustryZScore
+
+logger = logging.getLogger(__name__)
+
+INDUSTRY_METRICS: Tuple[str, ...] = ("cap_return", "breadth", "turnover", "sentiment")
+HEAT_METRIC = "heat"  # stored as ``heat_z``, the factor live scores read
+INDUSTRY_HISTORY = int(os.getenv("BETTERSTOCK_INDUSTRY_HISTORY", "120"))
+
+
+def float_cap(snapshot: QuoteSnapshot) -> np.ndarray:
+    """Float market cap implied by traded value and turnover rate (0 where untraded)."""
+    amount = snapshot["amount"]
+    turnover = snapshot["turnover_rate"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cap = np.where((turnover > 0) & (amount > 0), amount / (turnover / 100), 0.0)
+    return cap
+
+
+@dataclass(slots=True)
+class IndustryAggregate:
+    """Industry metrics of one snapshot; ``values[metric][i]`` belongs to ``industries[i]``."""
+
+    as_of: datetime
+    industries: Tuple[str, ...]
+    members: np.ndarray
+    values: Dict[str, np.ndarray]
+
+    def records(self) -> List[dict]:
+        columns = {metric: values.tolist() for metric, values in self.values.items()}
+        return [
+            {
+                "industry": industry,
+                "as_of": self.as_of,
+                "members": members,
+                **{metric: columns[metric][position] for metric in INDUSTRY_METRICS},
+            }
+            for position, (industry, members) in enumerate(zip(self.industries, self.members.tolist()))
+        ]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, fallback: np.ndarray | float = 0.0) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, numerator / denominator, fallback)
+
+
+@COMPUTE_SECONDS.timed(stage="industry_aggregate")
+def aggregate_industries(snapshot: QuoteSnapshot, sentiment: np.ndarray | None = None) -> IndustryAggregate:
+    """Aggregate ``snapshot`` per industry; ``sentiment`` is per row, NaN for tickers without news."""
+    codes = snapshot.industry_codes
+    n_groups = len(snapshot.industries)
+    change = snapshot["percent_change"]
+    members = np.bincount(codes, minlength=n_groups)
+    counts = members.astype(np.float64)
+    mean_change = _ratio(np.bincount(codes, weights=change, minlength=n_groups), counts)
+    cap = float_cap(snapshot)
+    cap_return = _ratio(
+        np.bincount(codes, weights=cap * change, minlength=n_groups),
+        np.bincount(codes, weights=cap, minlength=n_groups),
+        mean_change,
+    )
+    breadth = _ratio(np.bincount(codes, weights=(change > 0).astype(np.float64), minlength=n_groups), counts)
+    turnover = _ratio(np.bincount(codes, weights=snapshot["turnover_rate"], minlength=n_groups), counts)
+    if sentiment is None:
+        mean_sentiment = np.zeros(n_groups)
+    else:
+        covered = ~np.isnan(sentiment)
+        mean_sentiment = _ratio(
+            np.bincount(codes[covered], weights=sentiment[covered], minlength=n_groups),
+            np.bincount(codes[covered], minlength=n_groups).astype(np.float64),
+        )
+    return IndustryAggregate(
+        as_of=snapshot.as_of or datetime.utcnow(),
+        industries=snapshot.industries,
+        members=members,
+        values={"cap_return": cap_return, "breadth": breadth, "turnover": turnover, "sentiment": mean_sentiment},
+    )
+
+
+def latest_as_of() -> datetime | None:
+    with session_scope() as session:
+        return session.scalar(select(func.max(IndustryStat.as_of)))
+
+
+def append_series(aggregate: IndustryAggregate) -> int:
+    records = aggregate.records()
+    if not records:
+        return 0
+    with DB_WRITE_SECONDS.time(table="industry_stats"), session_scope() as session:
+        session.execute(insert(IndustryStat), records)
+    DB_ROWS_WRITTEN.inc(len(records), table="industry_stats")
+    return len(records)
+
+
+def load_series(session: Session, points: int) -> List["IndustryMetric"]:
+    """The last ``points`` snapshots of every industry metric, oldest first."""
+    from .zscore import IndustryMetric  # pandas; loaded on first use
+
+    stamps = select(IndustryStat.as_of).distinct().order_by(IndustryStat.as_of.desc()).limit(points).subquery()
+    oldest = session.scalar(select(func.min(stamps.c.as_of)))
+    if oldest is None:
+        return []
+    columns = [getattr(IndustryStat, metric) for metric in INDUSTRY_METRICS]
+    stmt = (
+        select(IndustryStat.industry, IndustryStat.as_of, *columns)
+        .where(IndustryStat.as_of >= oldest)
+        .order_by(IndustryStat.as_of)
+    )
+    metrics: List["IndustryMetric"] = []
+    for industry, as_of, *values in session.execute(stmt):
+        metrics.extend(
+            IndustryMetric(industry=industry, metric_name=metric, timestamp=as_of, value=float(value or 0.0))
+            for metric, value in zip(INDUSTRY_METRICS, values)
+        )
+    return metrics
+
+
+def heat_scores(results: Sequence["IndustryZScore"]) -> List["IndustryZScore"]:
+    """Average the metric z-scores of each industry and timestamp into one heat z-score."""
+    from .zscore import IndustryZScore
+
+    totals: Dict[Tuple[str, datetime], List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for result in results:
+        total = totals[(result.industry, result.timestamp)]
+        total[0] += result.zscore
+        total[1] += 1
+    heat: List["IndustryZScore"] = []
+    for (industry, timestamp), (zsum, count) in totals.items():
+        zscore = zsum / count
+        heat.append(IndustryZScore(industry, HEAT_METRIC, timestamp, value=zscore, mean=0.0, std=1.0, zscore=zscore))
+    return heat
+
+
+class IndustryAggregator:
+    """Aggregates each refreshed snapshot and appends it to ``industry_stats``.
+
+    Ticker sentiment is loaded once (and every ``resync`` seconds) and then
+    kept current from :class:`~.events.SentimentAdded` events, so recording a
+    snapshot costs one aggregation plus one bulk insert.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus = EVENTS,
+        resync: float = SCORE_RESYNC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.resync = resync
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._sentiment: Dict[str, float] = {}
+        self._loaded_at: float | None = None
+        self._last_as_of: datetime | None = None
+        bus.subscribe(SentimentAdded, self.on_sentiment)
+
+    async def on_sentiment(self, event: SentimentAdded) -> None:
+        if not event.tickers or self._loaded_at is None:
+            return
+        loaded = await asyncio.to_thread(load_sentiment, event.tickers)
+        for ticker in event.tickers:
+            if ticker in loaded:
+                self._sentiment[ticker] = loaded[ticker]
+
+    def sentiment_for(self, snapshot: QuoteSnapshot) -> np.ndarray:
+        sentiment = self._sentiment
+        return np.fromiter(
+            (sentiment.get(ticker, np.nan) for ticker in snapshot.tickers.tolist()), dtype=np.float64, count=len(snapshot)
+        )
+
+    async def record(self, snapshot: QuoteSnapshot) -> IndustryAggregate | None:
+        """Append ``snapshot``'s industry metrics unless a newer point is already stored."""
+        if not len(snapshot):
+            return None
+        async with self._lock:
+            if self._loaded_at is None or self._clock() - self._loaded_at >= self.resync:
+                self._sentiment = await asyncio.to_thread(load_sentiment)
+                if self._loaded_at is None:
+                    self._last_as_of = await asyncio.to_thread(latest_as_of)
+                self._loaded_at = self._clock()
+            aggregate = aggregate_industries(snapshot, self.sentiment_for(snapshot))
+            if self._last_as_of is not None and aggregate.as_of <= self._last_as_of:
+                return None
+            await asyncio.to_thread(append_series, aggregate)
+            self._last_as_of = aggregate.as_of
+        logger.debug("Recorded %d industries as of %s", len(aggregate.industries), aggregate.as_of)
+        return aggregate
+
+
+INDUSTRY_AGGREGATOR = IndustryAggregator()
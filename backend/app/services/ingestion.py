@@ -0,0 +1,168 @@
+"""News ingestion pipeline shared by the API refresh job and the scheduler."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Mapping, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..database import session_scope
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import NewsArticle, SentimentScore, StockQuote
+from .content_store import ContentStore
+from .crawler import DEFAULT_SOURCES, BaseSource, NewsItem, fetch_latest_news
+from .events import EVENTS, SentimentAdded
+from .jobs import JOBS, Job
+from .llm import SentimentResult
+from .sentiment import SentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_CONCURRENCY = int(os.getenv("BETTERSTOCK_SENTIMENT_CONCURRENCY", "8"))
+REFRESH_JOB_NAME = "refresh_news"
+MIN_NAME_LENGTH = int(os.getenv("BETTERSTOCK_TICKER_NAME_MIN_LENGTH", "2"))
+
+_CODE = re.compile(r"(?<![\d.])(\d{6})(?!\d)")
+_SPACE = re.compile(r"\s+")
+
+
+class TickerMatcher:
+    """Finds the stocks an article mentions by six-digit code or by short name.
+
+    Names are looked up by slicing the text at every offset with each distinct
+    name length, so matching is a few dictionary probes per character however
+    many stocks are listed.
+    """
+
+    def __init__(self, names: Mapping[str, str]) -> None:
+        self.tickers = set(names)
+        self.by_name = {
+            key: ticker
+            for ticker, name in names.items()
+            if len(key := _SPACE.sub("", name or "")) >= MIN_NAME_LENGTH
+        }
+        self.lengths = sorted({len(name) for name in self.by_name}, reverse=True)
+
+    @classmethod
+    def load(cls, session: Session) -> "TickerMatcher":
+        return cls(dict(session.execute(select(StockQuote.ticker, StockQuote.name)).all()))
+
+    def match(self, *texts: str | None) -> Set[str]:
+        found: Set[str] = set()
+        for text in texts:
+            if not text:
+                continue
+            found.update(code for code in _CODE.findall(text) if code in self.tickers)
+            text = _SPACE.sub("", text)
+            for start in range(len(text)):
+                for length in self.lengths:
+                    ticker = self.by_name.get(text[start:start + length])
+                    if ticker is not None:
+                        found.add(ticker)
+                        break
+        return found
+
+
+class NewsIngestor:
+    """Deduplicates crawled items, scores sentiment and persists new articles linked to the stocks they mention."""
+
+    def __init__(self, analyzer: SentimentAnalyzer | None = None, concurrency: int = SENTIMENT_CONCURRENCY) -> None:
+        self.analyzer = analyzer or SentimentAnalyzer()
+        self.concurrency = concurrency
+
+    async def ingest(self, items: Iterable[NewsItem], job: Job | None = None) -> int:
+        """Store the items that are not in the database yet; returns how many were new."""
+        unique: Dict[str, NewsItem] = {}
+        seen = 0
+        for item in items:
+            seen += 1
+            if item.url and item.url not in unique:
+                unique[item.url] = item
+        with session_scope() as session:
+            known = set(
+                session.execute(select(NewsArticle.url).where(NewsArticle.url.in_(list(unique)))).scalars()
+            )
+        new_items = [item for url, item in unique.items() if url not in known]
+        if job is not None:
+            job.incr("items_duplicate", seen - len(new_items))
+        if not new_items:
+            return 0
+        results = await self._analyze(new_items, job)
+        linked: set[str] = set()
+        with DB_WRITE_SECONDS.time(table="news_articles"), session_scope() as session:
+            store = ContentStore(session)
+            matcher = TickerMatcher.load(session)
+            for item, result in zip(new_items, results):
+                article = NewsArticle(
+                    source=item.source,
+                    title=item.title,
+                    url=item.url,
+                    published_at=item.published_at,
+                    summary=item.summary,
+                )
+                article.set_content(item.content, store)
+                article.set_raw_payload(item.payload, store)
+                article.sentiments.append(
+                    SentimentScore(
+                        provider=result.raw.get("provider", self.analyzer.provider),
+                        model_version=self.analyzer.model_version,
+                        sentiment=result.sentiment,
+                        confidence=result.confidence,
+                        metadata_=result.raw,
+                    )
+                )
+                tickers = sorted(matcher.match(item.title, item.summary, item.content))
+                article.stocks.extend(session.get(StockQuote, ticker) for ticker in tickers)
+                session.add(article)
+                linked.update(tickers)
+        DB_ROWS_WRITTEN.inc(len(new_items), table="news_articles")
+        if linked:
+            # Articles that mention no listed stock change no per-ticker average.
+            EVENTS.publish(SentimentAdded(frozenset(linked), articles=len(new_items)))
+        if job is not None:
+            job.incr("items_new", len(new_items))
+        return len(new_items)
+
+    async def _analyze(self, items: List[NewsItem], job: Job | None) -> List[SentimentResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def analyze(item: NewsItem) -> SentimentResult:
+            async with semaphore:
+                result = await self.analyzer.analyze_text(item.content or item.summary)
+            if job is not None:
+                job.incr("sentiment_calls")
+            return result
+
+        return await asyncio.gather(*(analyze(item) for item in items))
+
+
+async def run_news_refresh(job: Job, ingestor: NewsIngestor | None = None) -> int:
+    """Crawl every source and ingest the results, reporting progress on ``job``."""
+    job.progress.update(
+        sources_total=len(DEFAULT_SOURCES),
+        sources_done=0,
+        sources_failed=0,
+        items_fetched=0,
+        items_new=0,
+        items_duplicate=0,
+        sentiment_calls=0,
+    )
+
+    def on_source_done(source: BaseSource, items: List[NewsItem] | None) -> None:
+        job.incr("sources_done")
+        if items is None:
+            job.incr("sources_failed")
+        else:
+            job.incr("items_fetched", len(items))
+
+    items = await fetch_latest_news(on_source_done)
+    return await (ingestor or NewsIngestor()).ingest(items, job)
+
+
+def submit_news_refresh(ingestor: NewsIngestor | None = None) -> Job:
+    """Start a refresh, or join the one that is already running."""
+    return JOBS.submit(REFRESH_JOB_NAME, lambda job: run_news_refresh(job, ingestor))
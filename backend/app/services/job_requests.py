@@ -0,0 +1,194 @@
+"""Background jobs requested through the API and run by the scheduler leader.
+
+Any API worker may receive ``POST /news/refresh`` or
+``POST /news/sentiment/backfill``, but only the process holding the scheduler
+lease (see :mod:`..tasks.leader`) may crawl or re-score, otherwise followers
+race the leader on the same unique urls. The endpoints therefore only insert a
+``job_requests`` row. The leader polls the table, claims pending rows with a
+conditional ``UPDATE`` and submits them to :data:`~.jobs.JOBS`, so a request
+still joins a crawl that is already running. Status and progress are copied
+back to the row while the job runs, which lets every worker answer status
+queries. Rows still ``running`` without a heartbeat for ``LEASE_TTL`` seconds
+belonged to a leader that died and are claimed again.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import and_, or_, select, update
+
+from ..database import session_scope
+from ..models import JobRequest, SchedulerLease
+from .jobs import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_REQUEST_POLL = float(os.getenv("BETTERSTOCK_JOB_REQUEST_POLL", "5"))
+REQUEST_PREFIX = "request-"
+ACTIVE = ("pending", "running")
+
+_PROCESS = f"{socket.gethostname()}:{os.getpid()}"
+_watchers: Set[asyncio.Task] = set()
+
+
+class JobConflict(RuntimeError):
+    """A request of the same job is still queued or running with other options."""
+
+
+def _submit_news_refresh(**options: Any) -> Job:
+    from .ingestion import submit_news_refresh  # aiohttp/bs4; loaded on first use
+
+    return submit_news_refresh(**options)
+
+
+def _submit_backfill(**options: Any) -> Job:
+    from .backfill import submit_backfill
+
+    return submit_backfill(**options)
+
+
+HANDLERS: Dict[str, Callable[..., Job]] = {
+    "news_refresh": _submit_news_refresh,
+    "sentiment_backfill": _submit_backfill,
+}
+
+
+def _as_job(request: JobRequest) -> Dict[str, Any]:
+    return {
+        "id": f"{REQUEST_PREFIX}{request.id}",
+        "name": request.name,
+        "status": request.status,
+        "created_at": request.created_at,
+        "started_at": request.started_at,
+        "finished_at": request.finished_at,
+        "progress": dict(request.progress or {}),
+        "error": request.error,
+    }
+
+
+def leader_alive(lease: str = "scheduler") -> bool:
+    """Whether some process currently holds the scheduler lease and will pick up requests."""
+    with session_scope() as session:
+        expires_at = session.scalar(select(SchedulerLease.expires_at).where(SchedulerLease.name == lease))
+    return expires_at is not None and expires_at > datetime.utcnow()
+
+
+def request_job(name: str, options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Queue ``name`` for the leader, or return the request of the same name still queued or running.
+
+    Raises :class:`JobConflict` when that request was made with other
+    options, since joining it would silently drop them.
+    """
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown job {name!r}")
+    options = options or {}
+    with session_scope() as session:
+        request = session.scalars(
+            select(JobRequest)
+            .where(JobRequest.name == name, JobRequest.status.in_(ACTIVE))
+            .order_by(JobRequest.id)
+            .limit(1)
+        ).first()
+        if request is None:
+            request = JobRequest(name=name, options=options, status="pending", progress={})
+            session.add(request)
+            session.flush()
+        elif dict(request.options or {}) != options:
+            raise JobConflict(
+                f"{REQUEST_PREFIX}{request.id} is already {request.status} with options {request.options}"
+            )
+        return _as_job(request)
+
+
+def get_request(job_id: str) -> Dict[str, Any] | None:
+    if not job_id.startswith(REQUEST_PREFIX) or not job_id[len(REQUEST_PREFIX):].isdigit():
+        return None
+    with session_scope() as session:
+        request = session.get(JobRequest, int(job_id[len(REQUEST_PREFIX):]))
+        return _as_job(request) if request is not None else None
+
+
+def claim_requests(stale_after: float) -> List[Tuple[int, str, Dict[str, Any]]]:
+    """Mark pending and orphaned requests as running in this process; returns ``(id, name, options)``."""
+    now = datetime.utcnow()
+    claimable = or_(
+        JobRequest.status == "pending",
+        and_(JobRequest.status == "running", JobRequest.updated_at < now - timedelta(seconds=stale_after)),
+    )
+    claimed = []
+    with session_scope() as session:
+        candidates = session.execute(
+            select(JobRequest.id, JobRequest.name, JobRequest.options).where(claimable).order_by(JobRequest.id)
+        ).all()
+        for request_id, name, options in candidates:
+            result = session.execute(
+                update(JobRequest)
+                .where(JobRequest.id == request_id, claimable)
+                .values(status="running", claimed_by=_PROCESS, started_at=now, updated_at=now, error=None)
+            )
+            if result.rowcount:
+                claimed.append((request_id, name, dict(options or {})))
+    return claimed
+
+
+def record(request_id: int, job: Job) -> None:
+    """Copy the status and progress of ``job`` onto its request row."""
+    with session_scope() as session:
+        session.execute(
+            update(JobRequest)
+            .where(JobRequest.id == request_id, JobRequest.claimed_by == _PROCESS)
+            .values(
+                status=job.status,
+                progress=dict(job.progress),
+                error=job.error,
+                finished_at=job.finished_at,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+
+def fail(request_id: int, error: str) -> None:
+    with session_scope() as session:
+        now = datetime.utcnow()
+        session.execute(
+            update(JobRequest)
+            .where(JobRequest.id == request_id)
+            .values(status="failed", error=error, finished_at=now, updated_at=now)
+        )
+
+
+async def _watch(request_id: int, job: Job, interval: float) -> None:
+    while not job.done:
+        try:
+            await asyncio.wait_for(job.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        except Exception:  # surfaced through job.status
+            pass
+        await asyncio.to_thread(record, request_id, job)
+
+
+async def dispatch_requests(stale_after: float, interval: float = JOB_REQUEST_POLL) -> int:
+    """Start every claimable request; returns how many were started. Called by the leader only."""
+    started = 0
+    for request_id, name, options in await asyncio.to_thread(claim_requests, stale_after):
+        handler = HANDLERS.get(name)
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job {name!r}")
+            job = handler(**options)
+        except Exception as exc:
+            logger.exception("Job request %s (%s) could not be started", request_id, name)
+            await asyncio.to_thread(fail, request_id, str(exc))
+            continue
+        logger.info("Job request %s runs as %s", request_id, job.id)
+        task = asyncio.get_running_loop().create_task(_watch(request_id, job, interval))
+        _watchers.add(task)
+        task.add_done_callback(_watchers.discard)
+        started += 1
+    return started
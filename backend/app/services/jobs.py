@@ -0,0 +1,98 @@
+"""In-process background jobs with single-flight coalescing and progress."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[["Job"], Awaitable[Any]]
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    status: str = "pending"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: str | None = None
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        self.progress[key] = self.progress.get(key, 0) + amount
+
+    async def wait(self) -> Any:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self.result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": dict(self.progress),
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """Runs named jobs in the background; a second submit joins the running one."""
+
+    def __init__(self, history: int = 50) -> None:
+        self._history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._running: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, name: str, func: JobFunc) -> Job:
+        running = self._running.get(name)
+        if running is not None and not running.done:
+            return running
+        job = Job(id=f"{name}-{next(self._ids)}", name=name)
+        job._task = asyncio.get_running_loop().create_task(self._run(job, func))
+        self._running[name] = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self, name: str | None = None) -> List[Job]:
+        return [job for job in reversed(self._jobs.values()) if name is None or job.name == name]
+
+    async def _run(self, job: Job, func: JobFunc) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = await func(job)
+            job.status = "succeeded"
+        except Exception as exc:  # pragma: no cover - surfaced through job status
+            logger.exception("Job %s failed", job.id)
+            job.status = "failed"
+            job.error = str(exc)
+        finally:
+            job.finished_at = datetime.utcnow()
+            if self._running.get(job.name) is job:
+                del self._running[job.name]
+
+
+JOBS = JobRegistry()
@@ -0,0 +1,231 @@
+"""Scores kept up to date from change events instead of recomputed per request.
+
+:class:`LiveScores` keeps one raw :class:`~.scoring.StockScore` per ticker plus
+the inputs they were built from. Events from :data:`~.events.EVENTS` mark what
+has to be redone:
+
+* :class:`~.events.QuoteChanged` rescores the rows whose technical factor
+  composite (see :mod:`.factors`), valuation, name or industry changed;
+* :class:`~.events.SentimentAdded` reloads the average sentiment of the named
+  tickers only and rescores them;
+* :class:`~.events.IndustryFactorUpdated` reloads the heat of those industries
+  and rescores their members.
+
+Normalisation still spans the universe, but it runs once per change batch and
+the result is shared by every request until the next change. A full rebuild
+happens on first use and every ``BETTERSTOCK_SCORE_RESYNC`` seconds, which
+also picks up writes made by other processes.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Collection, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+
+from ..database import session_scope
+from ..metrics import COMPUTE_SECONDS
+from ..models import IndustryFactor, SentimentScore, news_stock_association
+from .events import EVENTS, EventBus, IndustryFactorUpdated, QuoteChanged, SentimentAdded
+from .factors import FACTOR_ENGINE, FactorEngine
+from .quote_cache import QUOTE_CACHE
+from .scoring import ScoreEngine, StockScore, fundamental_score
+from .snapshot import QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+SCORE_RESYNC = float(os.getenv("BETTERSTOCK_SCORE_RESYNC", "300"))
+
+INDUSTRY_PREFIX = "industry::"
+HEAT_FACTOR = "heat_z"
+
+
+def load_sentiment(tickers: Collection[str] | None = None) -> Dict[str, float]:
+    """Average article sentiment per ticker, optionally for ``tickers`` only."""
+    stmt = (
+        select(news_stock_association.c.ticker, func.avg(SentimentScore.sentiment))
+        .join(SentimentScore, SentimentScore.article_id == news_stock_association.c.news_id)
+        .group_by(news_stock_association.c.ticker)
+    )
+    if tickers is not None:
+        stmt = stmt.where(news_stock_association.c.ticker.in_(list(tickers)))
+    with session_scope() as session:
+        return {ticker: float(value) for ticker, value in session.execute(stmt)}
+
+
+def load_industry_heat(industries: Collection[str] | None = None) -> Dict[str, float]:
+    """Latest heat z-score per industry, optionally for ``industries`` only."""
+    stmt = (
+        select(IndustryFactor.ticker, IndustryFactor.zscore)
+        .where(IndustryFactor.factor_name == HEAT_FACTOR)
+        .order_by(IndustryFactor.as_of)
+    )
+    if industries is None:
+        stmt = stmt.where(IndustryFactor.ticker.like(INDUSTRY_PREFIX + "%"))
+    else:
+        stmt = stmt.where(IndustryFactor.ticker.in_([INDUSTRY_PREFIX + industry for industry in industries]))
+    with session_scope() as session:
+        return {ticker.split("::", 1)[1]: zscore for ticker, zscore in session.execute(stmt)}
+
+
+class LiveScores:
+    def __init__(
+        self,
+        engine: ScoreEngine | None = None,
+        bus: EventBus = EVENTS,
+        factors: FactorEngine | None = FACTOR_ENGINE,
+        resync: float = SCORE_RESYNC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.engine = engine or ScoreEngine()
+        self.factors = factors
+        self.resync = resync
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._snapshot: QuoteSnapshot | None = None
+        self._sentiment: Dict[str, float] = {}
+        self._heat: Dict[str, float] = {}
+        self._technical = np.empty(0)
+        self._raw: List[StockScore] = []
+        self._normalized: List[StockScore] | None = None
+        self._matrix: Tuple[int, List[str], List[str], np.ndarray] | None = None
+        self._built_at: float | None = None
+        self.version = 0
+        bus.subscribe(QuoteChanged, self.on_quotes)
+        bus.subscribe(SentimentAdded, self.on_sentiment)
+        bus.subscribe(IndustryFactorUpdated, self.on_industry)
+
+    async def scores(self, snapshot: QuoteSnapshot | None = None) -> List[StockScore]:
+        """Normalised scores for ``snapshot`` (default: the cached quotes)."""
+        if snapshot is None:
+            snapshot = await QUOTE_CACHE.get()
+        async with self._lock:
+            if self._snapshot is None or self._built_at is None or self._clock() - self._built_at >= self.resync:
+                await self._rebuild(snapshot)
+            elif (self.factors is not None and await self.factors.sync()) or snapshot is not self._snapshot:
+                self._apply_quotes(snapshot)
+            if self._normalized is None:
+                with COMPUTE_SECONDS.time(stage="score_normalize"):
+                    self._normalized = self.engine.normalize(self._raw)
+            return self._normalized
+
+    async def components(self, snapshot: QuoteSnapshot | None = None) -> Tuple[List[str], List[str], np.ndarray]:
+        """Tickers, names and the raw ticker x component matrix, rebuilt once per change."""
+        await self.scores(snapshot)
+        async with self._lock:
+            if self._matrix is None or self._matrix[0] != self.version:
+                raw = self._raw
+                self._matrix = (
+                    self.version,
+                    [score.ticker for score in raw],
+                    [score.name for score in raw],
+                    self.engine.component_matrix(raw),
+                )
+            return self._matrix[1], self._matrix[2], self._matrix[3]
+
+    # ---------------------------------------------------------------- events
+    async def on_quotes(self, event: QuoteChanged) -> None:
+        async with self._lock:
+            if self._snapshot is not None:
+                self._apply_quotes(event.snapshot)
+
+    async def on_sentiment(self, event: SentimentAdded) -> None:
+        if not event.tickers:
+            return
+        async with self._lock:
+            if self._snapshot is None:
+                return
+            tickers = [ticker for ticker in event.tickers if ticker in self._snapshot]
+            loaded = await asyncio.to_thread(load_sentiment, tickers)
+            for ticker in tickers:
+                self._sentiment[ticker] = loaded.get(ticker, 0.0)
+            self._rescore(self._snapshot.rows(tickers))
+
+    async def on_industry(self, event: IndustryFactorUpdated) -> None:
+        async with self._lock:
+            if self._snapshot is None:
+                return
+            loaded = await asyncio.to_thread(load_industry_heat, event.industries)
+            for industry in event.industries:
+                self._heat[industry] = loaded.get(industry, 0.0)
+            snapshot = self._snapshot
+            codes = [snapshot.industries.index(name) for name in event.industries if name in snapshot.industries]
+            self._rescore(np.flatnonzero(np.isin(snapshot.industry_codes, codes)))
+
+    # ------------------------------------------------------------- internals
+    def _technical_for(self, snapshot: QuoteSnapshot) -> np.ndarray:
+        technical = self.factors.technical(snapshot) if self.factors is not None else None
+        return snapshot["percent_change"] / 100 if technical is None else technical
+
+    async def _rebuild(self, snapshot: QuoteSnapshot) -> None:
+        self._sentiment, self._heat = await asyncio.gather(
+            asyncio.to_thread(load_sentiment), asyncio.to_thread(load_industry_heat)
+        )
+        if self.factors is not None:
+            await self.factors.sync(force=True)
+        self._snapshot = snapshot
+        self._technical = self._technical_for(snapshot)
+        self._raw = self.engine.score_snapshot(snapshot, self._sentiment, self._heat, self._technical)
+        self._built_at = self._clock()
+        self._changed()
+
+    def _apply_quotes(self, snapshot: QuoteSnapshot) -> None:
+        previous = self._snapshot
+        assert previous is not None
+        if len(previous) != len(snapshot) or not np.array_equal(previous.tickers, snapshot.tickers):
+            # The universe changed shape; quote-derived columns are cheap to redo wholesale.
+            self._snapshot = snapshot
+            self._technical = self._technical_for(snapshot)
+            self._raw = self.engine.score_snapshot(snapshot, self._sentiment, self._heat, self._technical)
+            self._changed()
+            return
+        technical = self._technical_for(snapshot)
+        changed = (
+            (technical != self._technical)
+            | (snapshot["pe_ratio"] != previous["pe_ratio"])
+            | (snapshot.names != previous.names)
+            | (snapshot.industry != previous.industry)
+        )
+        self._snapshot = snapshot
+        self._technical = technical
+        self._rescore(np.flatnonzero(changed))
+
+    def _rescore(self, rows: np.ndarray) -> None:
+        if not len(rows):
+            return
+        snapshot = self._snapshot
+        assert snapshot is not None
+        with COMPUTE_SECONDS.time(stage="score_incremental"):
+            technical = self._technical[rows]
+            fundamental = fundamental_score(snapshot["pe_ratio"][rows])
+            industries = snapshot.industry[rows]
+            for row, ticker, name, industry, technical_value, fundamental_value in zip(
+                rows.tolist(),
+                snapshot.tickers[rows].tolist(),
+                snapshot.names[rows].tolist(),
+                industries.tolist(),
+                technical.tolist(),
+                fundamental.tolist(),
+            ):
+                self._raw[row] = self.engine.score(
+                    ticker=ticker,
+                    name=name,
+                    sentiment=float(self._sentiment.get(ticker, 0.0)),
+                    industry_heat=float(self._heat.get(industry, 0.0)),
+                    technical=technical_value,
+                    fundamental=fundamental_value,
+                )
+        logger.debug("Rescored %d tickers", len(rows))
+        self._changed()
+
+    def _changed(self) -> None:
+        self._normalized = None
+        self.version += 1
+
+
+LIVE_SCORES = LiveScores()
+QUOTE_CACHE.add_listener(lambda snapshot: EVENTS.publish(QuoteChanged(snapshot)))
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import abc
+import hashlib
 import logging
 import os
 from dataclasses import dataclass
@@ -21,6 +22,8 @@ class LLMClient(abc.ABC):
     """Abstract base class for LLM providers."""
 
     provider: str
+    # Tags stored scores so a provider's history can be re-scored after a model change.
+    model_version: str = ""
 
     @abc.abstractmethod
     async def analyze(self, text: str) -> SentimentResult:
@@ -34,6 +37,9 @@ class HeuristicLLMClient(LLMClient):
 
     POSITIVE_KEYWORDS = {"增长", "盈利", "创新", "突破", "上升", "盈利"}
     NEGATIVE_KEYWORDS = {"下跌", "亏损", "风险", "下滑", "裁员", "震荡"}
+    model_version = "lexicon-" + hashlib.sha1(
+        "|".join(sorted(POSITIVE_KEYWORDS) + ["/"] + sorted(NEGATIVE_KEYWORDS)).encode("utf-8")
+    ).hexdigest()[:8]
 
     async def analyze(self, text: str) -> SentimentResult:
         text_lower = text.lower()
@@ -58,6 +64,7 @@ class OpenAIChatClient(LLMClient):
             raise RuntimeError("openai package is required for OpenAIChatClient") from exc
         self._client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self._model = model
+        self.model_version = model
 
     async def analyze(self, text: str) -> SentimentResult:  # pragma: no cover - network usage
         response = await self._client.responses.create(
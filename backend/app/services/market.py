@@ -1,13 +1,29 @@
-"""Market data providers for BetterStock."""
+"""Market data providers for BetterStock.
+
+``BETTERSTOCK_MARKET_PROVIDER`` names one provider or a comma separated chain
+(e.g. ``akshare,simulator``); the chain is wrapped in a
+:class:`FailoverMarketDataProvider`, so a slow or failing upstream never
+blocks a refresh for longer than ``BETTERSTOCK_MARKET_DEADLINE`` seconds.
+"""
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import logging
-from dataclasses import dataclass
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Sequence
 
 import numpy as np
 
+from ..metrics import MARKET_HEDGES, MARKET_PROVIDER_CALLS, MARKET_PROVIDER_SECONDS, MARKET_STALE_SERVED
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import QuoteSnapshot
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +48,12 @@ class MarketDataProvider:
     async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
         raise NotImplementedError
 
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> "QuoteSnapshot":
+        """Columnar variant of :meth:`fetch_quotes`; providers should override it."""
+        from .snapshot import QuoteSnapshot
+
+        return QuoteSnapshot.from_quotes(await self.fetch_quotes(tickers))
+
 
 class MockMarketDataProvider(MarketDataProvider):
     """Offline provider generating deterministic synthetic data."""
@@ -93,39 +115,276 @@ class MockMarketDataProvider(MarketDataProvider):
         return list(self._quotes)
 
 
-try:  # pragma: no cover - optional dependency
-    import akshare as ak  # type: ignore
+MARKET_PROVIDER = os.getenv("BETTERSTOCK_MARKET_PROVIDER", "auto")
+MARKET_DEADLINE = float(os.getenv("BETTERSTOCK_MARKET_DEADLINE", "20"))
+HEDGE_QUANTILE = float(os.getenv("BETTERSTOCK_MARKET_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class AkshareMarketDataProvider(MarketDataProvider):
+    """Live A-share spot quotes via Akshare (optional dependency, imported on first fetch)."""
+
+    COLUMNS = {
+        "price": "最新价",
+        "change": "涨跌额",
+        "percent_change": "涨跌幅",
+        "turnover_rate": "换手率",
+        "volume": "成交量",
+        "amount": "成交额",
+        "pe_ratio": "市盈率",
+        "pb_ratio": "市净率",
+        "roe": "ROE",
+    }
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("akshare") is not None
+
+    async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
+        return (await self.fetch_snapshot(tickers)).to_quotes()
+
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> "QuoteSnapshot":
+        import akshare as ak  # type: ignore
+        import pandas as pd
+
+        from .snapshot import QuoteSnapshot
+
+        df = await asyncio.to_thread(ak.stock_zh_a_spot_em)
+        if tickers:
+            df = df[df["代码"].isin(set(tickers))]
+        columns = {
+            field: pd.to_numeric(df[column], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+            if column in df
+            else np.zeros(len(df))
+            for field, column in self.COLUMNS.items()
+        }
+        industries = df["所属行业"].astype(str) if "所属行业" in df else ["未知"] * len(df)
+        return QuoteSnapshot.from_columns(
+            tickers=df["代码"].astype(str).tolist(),
+            names=df["名称"].astype(str).tolist(),
+            industries=list(industries),
+            updated_at=datetime.utcnow(),
+            columns=columns,
+        )
+
+
+@dataclass(slots=True)
+class ProviderStats:
+    """Latency and outcome counts of one provider in a failover chain."""
+
+    name: str
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    recent: Deque[bool] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    successes: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    last_error: str | None = None
+
+    def succeeded(self, seconds: float) -> None:
+        self.successes += 1
+        self.latencies.append(seconds)
+        self.recent.append(True)
+
+    def failed(self, error: str, timeout: bool = False) -> None:
+        if timeout:
+            self.timeouts += 1
+        else:
+            self.errors += 1
+        self.last_error = error
+        self.recent.append(False)
+
+    def quantile(self, q: float) -> float | None:
+        """Latency quantile over the recent successes, ``None`` until enough samples."""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return float(np.quantile(np.fromiter(self.latencies, dtype=np.float64), q))
 
-    class AkshareMarketDataProvider(MarketDataProvider):
-        async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
-            import asyncio
+    @property
+    def error_rate(self) -> float:
+        """Share of failed or timed out calls among the recent ones."""
+        if not self.recent:
+            return 0.0
+        return 1.0 - sum(self.recent) / len(self.recent)
 
-            loop = asyncio.get_event_loop()
-            df = await loop.run_in_executor(None, ak.stock_zh_a_spot_em)
-            quotes: List[MarketQuote] = []
-            for _, row in df.iterrows():
-                if tickers and row["代码"] not in tickers:
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "provider": self.name,
+            "successes": self.successes,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "error_rate": self.error_rate,
+            "p50_seconds": p50,
+            "p95_seconds": p95,
+            "last_error": self.last_error,
+        }
+
+
+class FailoverMarketDataProvider(MarketDataProvider):
+    """Asks ``providers`` in order and returns the first snapshot that arrives in time.
+
+    * the whole fetch is bounded by ``deadline`` seconds; providers still
+      running then are cancelled;
+    * a provider that errors (or returns an empty market) hands over to the
+      next one immediately;
+    * a provider still running after its ``hedge_quantile`` latency (half the
+      deadline until it has ``HEDGE_MIN_SAMPLES`` successes) gets a hedged
+      request to the next provider alongside it; the first success wins;
+    * when nothing succeeds, the last good full-market snapshot is returned
+      with ``stale_since`` set to when it was fetched. Only a chain that never
+      succeeded raises.
+
+    Cancelling a provider that runs blocking code in a thread stops the wait,
+    not the thread.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[MarketDataProvider],
+        deadline: float = MARKET_DEADLINE,
+        hedge_quantile: float = HEDGE_QUANTILE,
+    ) -> None:
+        if not providers:
+            raise ValueError("FailoverMarketDataProvider needs at least one provider")
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.stats = [ProviderStats(type(provider).__name__) for provider in self.providers]
+        self._last_good: QuoteSnapshot | None = None
+        self._last_good_at: datetime | None = None
+
+    async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
+        return (await self.fetch_snapshot(tickers)).to_quotes()
+
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> "QuoteSnapshot":
+        selected = list(tickers) if tickers else None
+        try:
+            snapshot = await self._first_success(selected)
+        except Exception as exc:
+            if self._last_good is None:
+                raise
+            MARKET_STALE_SERVED.inc()
+            logger.warning("All market data providers failed (%s); serving quotes from %s", exc, self._last_good_at)
+            return replace(self._last_good, stale_since=self._last_good_at).select(selected)
+        if selected is None:
+            self._last_good, self._last_good_at = snapshot, datetime.utcnow()
+        return snapshot
+
+    def provider_stats(self) -> List[Dict[str, Any]]:
+        return [stats.to_dict() for stats in self.stats]
+
+    def _hedge_delay(self, stats: ProviderStats) -> float:
+        quantile = stats.quantile(self.hedge_quantile)
+        return self.deadline / 2 if quantile is None else quantile
+
+    async def _first_success(self, tickers: List[str] | None) -> "QuoteSnapshot":
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        pending: Dict[asyncio.Task, ProviderStats] = {}
+        errors: List[str] = []
+        position = 0
+        hedge_at = deadline
+
+        def launch() -> None:
+            nonlocal position, hedge_at
+            provider, stats = self.providers[position], self.stats[position]
+            position += 1
+            pending[loop.create_task(self._call(provider, stats, tickers))] = stats
+            hedge_at = loop.time() + self._hedge_delay(stats)
+
+        launch()
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                has_next = position < len(self.providers)
+                timeout = (min(deadline, hedge_at) if has_next else deadline) - now
+                done, _ = await asyncio.wait(pending, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stats = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{stats.name}: {task.exception()}")
+                if not has_next or loop.time() >= deadline:
                     continue
-                quotes.append(
-                    MarketQuote(
-                        ticker=row["代码"],
-                        name=row["名称"],
-                        price=float(row["最新价"]),
-                        change=float(row["涨跌额"]),
-                        percent_change=float(row["涨跌幅"]),
-                        turnover_rate=float(row.get("换手率", 0) or 0),
-                        volume=float(row.get("成交量", 0) or 0),
-                        amount=float(row.get("成交额", 0) or 0),
-                        industry=str(row.get("所属行业", "未知")),
-                        pe_ratio=float(row.get("市盈率", 0) or 0),
-                        pb_ratio=float(row.get("市净率", 0) or 0),
-                        roe=float(row.get("ROE", 0) or 0),
-                        updated_at=datetime.utcnow(),
-                    )
-                )
-            return quotes
-
-    DEFAULT_PROVIDER: MarketDataProvider = AkshareMarketDataProvider()
-except Exception:  # pragma: no cover - optional dependency
-    logger.warning("Falling back to mock market data provider.")
-    DEFAULT_PROVIDER = MockMarketDataProvider()
+                if not done:
+                    self.stats[position].hedges += 1
+                    MARKET_HEDGES.inc(provider=self.stats[position].name)
+                    launch()
+                elif not pending:
+                    launch()
+        finally:
+            timed_out = loop.time() >= deadline
+            for task, stats in pending.items():
+                task.cancel()
+                if timed_out:
+                    stats.failed(f"no answer within {self.deadline:g}s", timeout=True)
+                    errors.append(f"{stats.name}: timed out")
+                MARKET_PROVIDER_CALLS.inc(provider=stats.name, outcome="timeout" if timed_out else "abandoned")
+        raise RuntimeError("No market data provider succeeded: " + "; ".join(errors))
+
+    @staticmethod
+    async def _call(
+        provider: MarketDataProvider, stats: ProviderStats, tickers: List[str] | None
+    ) -> "QuoteSnapshot":
+        started = time.perf_counter()
+        try:
+            snapshot = await provider.fetch_snapshot(tickers)
+            if tickers is None and not len(snapshot):
+                raise RuntimeError("empty snapshot")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            stats.failed(str(exc) or type(exc).__name__)
+            MARKET_PROVIDER_CALLS.inc(provider=stats.name, outcome="error")
+            raise
+        elapsed = time.perf_counter() - started
+        stats.succeeded(elapsed)
+        MARKET_PROVIDER_SECONDS.observe(elapsed, provider=stats.name)
+        MARKET_PROVIDER_CALLS.inc(provider=stats.name, outcome="ok")
+        return snapshot
+
+
+def _build_provider(name: str) -> MarketDataProvider | None:
+    if name == "simulator":
+        from .simulator import SimulatedMarketDataProvider, SimulatorConfig
+
+        config = SimulatorConfig()
+        config.n_tickers = int(os.getenv("BETTERSTOCK_SIM_TICKERS", config.n_tickers))
+        config.seed = int(os.getenv("BETTERSTOCK_SIM_SEED", config.seed))
+        return SimulatedMarketDataProvider(config)
+    if name in ("auto", "akshare"):
+        return AkshareMarketDataProvider() if AkshareMarketDataProvider.available() else None
+    if name == "mock":
+        return MockMarketDataProvider()
+    return None  # unknown names are skipped like unavailable providers
+
+
+def _build_default_provider() -> MarketDataProvider:
+    names = [name.strip() for name in MARKET_PROVIDER.split(",") if name.strip()] or ["auto"]
+    providers: List[MarketDataProvider] = []
+    for name in names:
+        provider = _build_provider(name)
+        if provider is None:
+            logger.warning("Market data provider %s is unavailable.", name)
+            continue
+        providers.append(provider)
+    if not providers:
+        logger.warning("Falling back to mock market data provider.")
+        providers.append(MockMarketDataProvider())
+    return FailoverMarketDataProvider(providers)
+
+
+_default_provider: MarketDataProvider | None = None
+
+
+def get_default_provider() -> MarketDataProvider:
+    """The configured provider, built on first use so importing this module stays cheap."""
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = _build_default_provider()
+    return _default_provider
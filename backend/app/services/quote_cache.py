@@ -0,0 +1,155 @@
+"""Shared in-process quote snapshot cache.
+
+Both the scheduler and the ``/market`` routes read quotes through this cache so
+that upstream providers (Akshare in production) are scraped at most once per
+TTL, no matter how many dashboards are polling.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List
+
+from sqlalchemy import select
+
+from ..database import session_scope
+from ..metrics import MARKET_REFRESH_ERRORS, MARKET_REFRESH_SECONDS
+from ..models import StockQuote
+from .market import MarketDataProvider, get_default_provider
+from .snapshot import QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+QUOTE_TTL = float(os.getenv("BETTERSTOCK_QUOTE_TTL", "60"))
+QUOTE_STALE_TTL = float(os.getenv("BETTERSTOCK_QUOTE_STALE_TTL", "240"))
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    snapshot: QuoteSnapshot
+    fetched_at: float
+
+
+class QuoteCache:
+    """TTL cache with stale-while-revalidate and single-flight refresh.
+
+    * fresher than ``ttl``: served straight from memory;
+    * older than ``ttl`` but within ``ttl + stale_ttl``: served stale while one
+      background refresh runs;
+    * older than that (or empty): callers wait on a single shared refresh.
+
+    ``provider`` defaults to the configured upstream, resolved on first fetch.
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider | None = None,
+        ttl: float = QUOTE_TTL,
+        stale_ttl: float = QUOTE_STALE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entry: _CacheEntry | None = None
+        self._inflight: asyncio.Task | None = None
+        self._listeners: List[Callable[[QuoteSnapshot], object]] = []
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        if self._provider is None:
+            self._provider = get_default_provider()
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider: MarketDataProvider) -> None:
+        self._provider = provider
+
+    @property
+    def age(self) -> float | None:
+        if self._entry is None:
+            return None
+        return self._clock() - self._entry.fetched_at
+
+    async def get(self, tickers: Iterable[str] | None = None) -> QuoteSnapshot:
+        entry = self._entry
+        age = self.age
+        if entry is None or age is None or age >= self.ttl + self.stale_ttl:
+            entry = await self._refresh_entry()
+        elif age >= self.ttl:
+            self._start_refresh()
+        return entry.snapshot.select(tickers)
+
+    async def refresh(self) -> QuoteSnapshot:
+        """Force a refresh, joining any refresh that is already running."""
+        entry = await self._refresh_entry()
+        return entry.snapshot
+
+    def put(self, snapshot: QuoteSnapshot) -> None:
+        self._entry = _CacheEntry(snapshot=snapshot, fetched_at=self._clock())
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:  # pragma: no cover - listeners must not break refreshes
+                logger.exception("Quote cache listener failed")
+
+    def add_listener(self, listener: Callable[[QuoteSnapshot], object]) -> None:
+        """Register a callback invoked with the new snapshot after every refresh."""
+        self._listeners.append(listener)
+
+    def invalidate(self) -> None:
+        self._entry = None
+
+    async def _refresh_entry(self) -> _CacheEntry:
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        task = self._inflight
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            return task
+        task = asyncio.get_running_loop().create_task(self._fetch())
+        task.add_done_callback(self._log_failure)
+        self._inflight = task
+        return task
+
+    async def _fetch(self) -> _CacheEntry:
+        provider = type(self.provider).__name__
+        try:
+            with MARKET_REFRESH_SECONDS.time(provider=provider):
+                snapshot = await self.provider.fetch_snapshot()
+        except Exception:
+            MARKET_REFRESH_ERRORS.inc(provider=provider)
+            raise
+        self.put(snapshot)
+        assert self._entry is not None
+        return self._entry
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Quote refresh failed: %s", task.exception())
+
+
+class DatabaseQuoteProvider(MarketDataProvider):
+    """Reads the quotes the scheduler leader last persisted to ``stock_quotes``.
+
+    Follower workers use it so that only one process scrapes upstream.
+    """
+
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> QuoteSnapshot:
+        return await asyncio.to_thread(self._load, list(tickers) if tickers else None)
+
+    @staticmethod
+    def _load(tickers: List[str] | None) -> QuoteSnapshot:
+        stmt = select(*StockQuote.__table__.columns)
+        if tickers:
+            stmt = stmt.where(StockQuote.ticker.in_(tickers))
+        with session_scope() as session:
+            return QuoteSnapshot.from_records(session.execute(stmt).mappings())
+
+
+QUOTE_CACHE = QuoteCache()
@@ -0,0 +1,514 @@
+"""Tiered retention: cold rows move from the database into Parquet archives.
+
+Each :class:`RetentionPolicy` names a table, its time column and how many days
+of rows stay in the database (``BETTERSTOCK_RETAIN_<NAME>_DAYS``; ``0`` keeps
+everything). :func:`apply_retention` copies older rows, in batches of
+``BETTERSTOCK_RETENTION_BATCH``, into zstd-compressed Parquet files under
+``BETTERSTOCK_ARCHIVE_DIR/<table>/month=YYYY-MM/`` and then deletes them, together
+with what hangs off them (sentiment scores, ticker links, search index entries,
+orphaned content blobs). The ``archive_watermarks`` table records up to where
+each table was archived.
+
+Reads over history use :func:`archived_rows` / :func:`read_archive`: ranges
+older than the watermark are served from the archive files (pruned by month
+partition and filtered on read) and merged with what is still in the database.
+Archived news is no longer full-text searchable.
+
+Archiving needs ``pyarrow``. Files are written before rows are deleted, so an
+interrupted run can leave duplicates in the archive; readers drop them by key.
+Run ``python -m app.services.retention`` to apply the policies by hand.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from sqlalchemy import JSON, Table, delete, select
+from sqlalchemy.engine import Connection, Engine
+
+from ..database import engine as default_engine
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS, Counter
+from ..models import (
+    ArchiveWatermark,
+    BacktestResult,
+    BacktestSeries,
+    ContentBlob,
+    IndustryStat,
+    NewsArticle,
+    QuoteBar,
+    SentimentScore,
+    news_stock_association,
+)
+from .arrow import arrow_schema, require_pyarrow
+from .content_store import decompress
+from .search import remove_articles
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.getenv("BETTERSTOCK_ARCHIVE_DIR", "./archive"))
+RETENTION_BATCH = int(os.getenv("BETTERSTOCK_RETENTION_BATCH", "5000"))
+RETENTION_VACUUM = os.getenv("BETTERSTOCK_RETENTION_VACUUM", "1").lower() not in ("0", "false", "no")
+
+ROWS_ARCHIVED = Counter("betterstock_rows_archived_total", "Rows moved from the database to the archive.", ("table",))
+
+
+def _days(name: str, default: int) -> int:
+    return int(os.getenv(f"BETTERSTOCK_RETAIN_{name}_DAYS", str(default)))
+
+
+# ---------------------------------------------------------------- policies
+@dataclass(slots=True)
+class RetentionPolicy:
+    """Archive rows of ``table`` whose ``time_column`` is older than ``days``."""
+
+    name: str
+    table: Table
+    time_column: str
+    days: int
+    key: str = "id"
+    exclude: Sequence[str] = ()
+    # Extra string columns filled by ``enrich`` (e.g. denormalised children).
+    extra: Sequence[str] = ()
+    # Extra binary columns filled by ``enrich`` (e.g. compressed child payloads).
+    binary: Sequence[str] = ()
+    # Child table columns copied by ``enrich``, archived with their own types.
+    child_columns: Sequence[Any] = ()
+    enrich: Callable[[Connection, List[Dict[str, Any]]], None] | None = None
+    purge: Callable[[Connection, List[Any]], None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.days > 0
+
+    @property
+    def columns(self) -> List[Any]:
+        return [column for column in self.table.columns if column.name not in self.exclude]
+
+    def cutoff(self, now: datetime) -> datetime:
+        return now - timedelta(days=self.days)
+
+    def schema(self, pa: Any) -> Any:
+        return arrow_schema(pa, [*self.columns, *self.child_columns], self.extra, self.binary)
+
+
+def _enrich_news(conn: Connection, rows: List[Dict[str, Any]]) -> None:
+    """Inline bodies, payloads, sentiment scores and linked tickers into archived articles."""
+    ids = [row["id"] for row in rows]
+    hashes = {row[name] for row in rows for name in ("content_hash", "payload_hash")} - {None}
+    blobs = {
+        blob_hash: decompress(data, codec).decode("utf-8")
+        for blob_hash, codec, data in conn.execute(
+            select(ContentBlob.hash, ContentBlob.codec, ContentBlob.data).where(ContentBlob.hash.in_(list(hashes)))
+        )
+    } if hashes else {}
+    sentiments: Dict[int, List[Dict[str, Any]]] = {article_id: [] for article_id in ids}
+    for score_id, article_id, provider, model_version, sentiment, confidence in conn.execute(
+        select(
+            SentimentScore.id,
+            SentimentScore.article_id,
+            SentimentScore.provider,
+            SentimentScore.model_version,
+            SentimentScore.sentiment,
+            SentimentScore.confidence,
+        ).where(SentimentScore.article_id.in_(ids))
+    ):
+        sentiments[article_id].append(
+            {
+                "id": score_id,
+                "provider": provider,
+                "model_version": model_version,
+                "sentiment": sentiment,
+                "confidence": confidence,
+            }
+        )
+    tickers: Dict[int, List[str]] = {article_id: [] for article_id in ids}
+    for article_id, ticker in conn.execute(
+        select(news_stock_association.c.news_id, news_stock_association.c.ticker)
+        .where(news_stock_association.c.news_id.in_(ids))
+    ):
+        tickers[article_id].append(ticker)
+    for row in rows:
+        if row["content_hash"] is not None:
+            row["content"] = blobs.get(row["content_hash"])
+        if row["payload_hash"] is not None:
+            row["raw_payload"] = blobs.get(row["payload_hash"])
+        row["sentiments"] = json.dumps(sentiments[row["id"]], ensure_ascii=False)
+        row["tickers"] = json.dumps(tickers[row["id"]])
+
+
+def _purge_news(conn: Connection, ids: List[Any]) -> None:
+    remove_articles(conn, ids)
+    conn.execute(delete(SentimentScore).where(SentimentScore.article_id.in_(ids)))
+    conn.execute(delete(news_stock_association).where(news_stock_association.c.news_id.in_(ids)))
+
+
+def _enrich_backtests(conn: Connection, rows: List[Dict[str, Any]]) -> None:
+    """Attach each run's compressed equity curve and trade log (see :mod:`.backtest_store`).
+
+    Point and trade counts are copied as plain columns, so listing archived
+    runs never decompresses the series.
+    """
+    series = {
+        run_id: values
+        for run_id, *values in conn.execute(
+            select(
+                BacktestSeries.run_id,
+                BacktestSeries.codec,
+                BacktestSeries.equity,
+                BacktestSeries.trades,
+                BacktestSeries.points,
+                BacktestSeries.trade_count,
+            ).where(BacktestSeries.run_id.in_([row["id"] for row in rows]))
+        )
+    }
+    for row in rows:
+        (
+            row["series_codec"],
+            row["series_equity"],
+            row["series_trades"],
+            row["points"],
+            row["trade_count"],
+        ) = series.get(row["id"], (None, None, None, 0, 0))
+
+
+def _purge_backtests(conn: Connection, ids: List[Any]) -> None:
+    conn.execute(delete(BacktestSeries).where(BacktestSeries.run_id.in_(ids)))
+
+
+POLICIES: Dict[str, RetentionPolicy] = {
+    "news_articles": RetentionPolicy(
+        "news_articles",
+        NewsArticle.__table__,
+        "published_at",
+        _days("NEWS", 180),
+        exclude=("content_hash", "payload_hash"),
+        extra=("sentiments", "tickers"),
+        enrich=_enrich_news,
+        purge=_purge_news,
+    ),
+    "quote_bars": RetentionPolicy("quote_bars", QuoteBar.__table__, "trade_date", _days("BARS", 0)),
+    "industry_stats": RetentionPolicy("industry_stats", IndustryStat.__table__, "as_of", _days("INDUSTRY", 30)),
+    "backtest_results": RetentionPolicy(
+        "backtest_results",
+        BacktestResult.__table__,
+        "created_at",
+        _days("BACKTEST", 365),
+        extra=("series_codec",),
+        binary=("series_equity", "series_trades"),
+        child_columns=(BacktestSeries.points, BacktestSeries.trade_count),
+        enrich=_enrich_backtests,
+        purge=_purge_backtests,
+    ),
+}
+
+
+# ----------------------------------------------------------------- archive
+def _month(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+
+def _partitions(name: str, since: datetime | None, until: datetime | None, root: Path) -> List[Path]:
+    base = root / name
+    if not base.is_dir():
+        return []
+    low = _month(since) if since is not None else None
+    high = _month(until) if until is not None else None
+    partitions = []
+    for directory in sorted(base.glob("month=*")):
+        month = directory.name.split("=", 1)[1]
+        if (low is None or month >= low) and (high is None or month <= high):
+            partitions.append(directory)
+    return partitions
+
+
+def _write_partition(pa: Any, policy: RetentionPolicy, rows: List[Dict[str, Any]], root: Path) -> None:
+    import pyarrow.parquet as pq  # type: ignore
+
+    schema = policy.schema(pa)
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_month.setdefault(_month(row[policy.time_column]), []).append(row)
+    for month, chunk in by_month.items():
+        directory = root / policy.name / f"month={month}"
+        directory.mkdir(parents=True, exist_ok=True)
+        keys = [row[policy.key] for row in chunk]
+        target = directory / f"part-{min(keys)}-{max(keys)}.parquet"
+        table = pa.Table.from_pylist(chunk, schema=schema)
+        partial = target.with_suffix(".tmp")
+        pq.write_table(table, partial, compression="zstd")
+        partial.replace(target)
+
+
+def _plain(row: Mapping[str, Any], policy: RetentionPolicy) -> Dict[str, Any]:
+    values = dict(row)
+    for column in policy.columns:
+        if isinstance(column.type, JSON) and values.get(column.name) is not None:
+            values[column.name] = json.dumps(values[column.name], ensure_ascii=False, default=str)
+    return values
+
+
+def archive_policy(
+    policy: RetentionPolicy,
+    now: datetime | None = None,
+    engine: Engine = default_engine,
+    root: Path = ARCHIVE_DIR,
+    batch_size: int = RETENTION_BATCH,
+) -> int:
+    """Move rows older than the policy cutoff into the archive; returns rows moved."""
+    if not policy.enabled:
+        return 0
+    pa = require_pyarrow("the data archive")
+    cutoff = policy.cutoff(now or datetime.utcnow())
+    time_column = policy.table.c[policy.time_column]
+    key_column = policy.table.c[policy.key]
+    stmt = (
+        select(*policy.table.columns)
+        .where(time_column < cutoff)
+        .order_by(time_column, key_column)
+        .limit(batch_size)
+    )
+    moved = 0
+    while True:
+        with DB_WRITE_SECONDS.time(table=policy.name), engine.begin() as conn:
+            rows = [_plain(row, policy) for row in conn.execute(stmt).mappings()]
+            if not rows:
+                break
+            if policy.enrich is not None:
+                policy.enrich(conn, rows)
+            for row in rows:
+                for name in policy.exclude:
+                    row.pop(name, None)
+            _write_partition(pa, policy, rows, root)
+            keys = [row[policy.key] for row in rows]
+            if policy.purge is not None:
+                policy.purge(conn, keys)
+            conn.execute(delete(policy.table).where(key_column.in_(keys)))
+        moved += len(rows)
+        ROWS_ARCHIVED.inc(len(rows), table=policy.name)
+        DB_ROWS_WRITTEN.inc(len(rows), table=policy.name)
+    with engine.begin() as conn:
+        _advance_watermark(conn, policy.name, cutoff, moved)
+    if moved:
+        logger.info("Archived %d %s rows older than %s", moved, policy.name, cutoff)
+    return moved
+
+
+def _advance_watermark(conn: Connection, name: str, cutoff: datetime, moved: int) -> None:
+    current = conn.execute(
+        select(ArchiveWatermark.archived_before, ArchiveWatermark.rows).where(ArchiveWatermark.name == name)
+    ).first()
+    if current is None:
+        conn.execute(
+            ArchiveWatermark.__table__.insert().values(
+                name=name, archived_before=cutoff, rows=moved, updated_at=datetime.utcnow()
+            )
+        )
+        return
+    conn.execute(
+        ArchiveWatermark.__table__.update()
+        .where(ArchiveWatermark.name == name)
+        .values(
+            archived_before=max(current.archived_before, cutoff),
+            rows=(current.rows or 0) + moved,
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def delete_orphan_blobs(engine: Engine = default_engine) -> int:
+    """Drop content blobs no article refers to any more."""
+    referenced = select(NewsArticle.content_hash).where(NewsArticle.content_hash.is_not(None)).union(
+        select(NewsArticle.payload_hash).where(NewsArticle.payload_hash.is_not(None))
+    )
+    with engine.begin() as conn:
+        result = conn.execute(delete(ContentBlob).where(ContentBlob.hash.not_in(referenced)))
+    return result.rowcount or 0
+
+
+def apply_retention(
+    names: Sequence[str] | None = None,
+    now: datetime | None = None,
+    engine: Engine = default_engine,
+    root: Path = ARCHIVE_DIR,
+    vacuum: bool = RETENTION_VACUUM,
+) -> Dict[str, int]:
+    """Apply the enabled policies (or just ``names``); returns rows archived per table."""
+    moved = {
+        policy.name: archive_policy(policy, now, engine, root)
+        for policy in POLICIES.values()
+        if policy.enabled and (names is None or policy.name in names)
+    }
+    if moved.get("news_articles"):
+        blobs = delete_orphan_blobs(engine)
+        logger.info("Deleted %d orphaned content blobs", blobs)
+    if vacuum and any(moved.values()) and engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+    return moved
+
+
+# -------------------------------------------------------------------- read
+def archived_before(name: str, engine: Engine = default_engine) -> datetime | None:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(ArchiveWatermark.archived_before).where(ArchiveWatermark.name == name)
+        ).scalar_one_or_none()
+
+
+def _filters(
+    policy: RetentionPolicy,
+    since: datetime | None,
+    until: datetime | None,
+    where: Mapping[str, Sequence[Any]] | None,
+    before: Tuple[datetime, Any] | None = None,
+    key_below: Any | None = None,
+) -> List[Any] | None:
+    """Parquet filters; ``before`` adds the keyset condition ``(time, key) < before``."""
+    filters: List[tuple] = []
+    if since is not None:
+        filters.append((policy.time_column, ">=", since))
+    if until is not None:
+        filters.append((policy.time_column, "<", until))
+    for column, values in (where or {}).items():
+        filters.append((column, "in", list(values)))
+    if key_below is not None:
+        filters.append((policy.key, "<", key_below))
+    if before is None:
+        return filters or None
+    # Disjunctive normal form: earlier time, or the same time and a smaller key.
+    return [
+        [*filters, (policy.time_column, "<", before[0])],
+        [*filters, (policy.time_column, "==", before[0]), (policy.key, "<", before[1])],
+    ]
+
+
+def _read_partition(directory: Path, columns: List[str], filters: List[tuple] | None, schema: Any) -> List[Any]:
+    import pyarrow.parquet as pq  # type: ignore
+
+    return [
+        pq.read_table(path, columns=columns, filters=filters, schema=schema)
+        for path in sorted(directory.glob("*.parquet"))
+    ]
+
+
+def read_archive(
+    name: str,
+    columns: Sequence[str] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    where: Mapping[str, Sequence[Any]] | None = None,
+    before: Tuple[datetime, Any] | None = None,
+    limit: int | None = None,
+    newest_first: bool = False,
+    key_below: Any | None = None,
+    root: Path = ARCHIVE_DIR,
+) -> Any:
+    """Archived rows of ``name`` with ``since <= time < until`` as a ``pyarrow.Table``.
+
+    ``before`` restricts to rows preceding a ``(time, key)`` keyset cursor,
+    ``key_below`` to rows whose key is smaller.
+    Month partitions outside the range are skipped. With ``limit``, partitions
+    are read in time order (newest first if asked) until at least ``limit``
+    rows were found; the caller sorts and trims.
+    """
+    policy = POLICIES[name]
+    pa = require_pyarrow("the data archive")
+    schema = policy.schema(pa)
+    selected = list(columns) if columns is not None else list(schema.names)
+    if policy.key not in selected:
+        selected.append(policy.key)
+    filters = _filters(policy, since, until, where, before, key_below)
+    partitions = _partitions(name, since, until if before is None else min(until or before[0], before[0]), root)
+    if newest_first:
+        partitions.reverse()
+    tables: List[Any] = []
+    for directory in partitions:
+        tables.extend(_read_partition(directory, selected, filters, schema))
+        if limit is not None and sum(table.num_rows for table in tables) >= limit:
+            break
+    if not tables:
+        return schema.empty_table().select(selected)
+    return _drop_duplicates(pa.concat_tables(tables), policy.key)
+
+
+def _drop_duplicates(table: Any, key: str) -> Any:
+    import numpy as np
+
+    keys = table.column(key).to_numpy()
+    _, first = np.unique(keys, return_index=True)
+    if len(first) == table.num_rows:
+        return table
+    return table.take(np.sort(first))
+
+
+def archived_rows(
+    name: str,
+    columns: Sequence[str],
+    since: datetime | None = None,
+    until: datetime | None = None,
+    where: Mapping[str, Sequence[Any]] | None = None,
+    engine: Engine = default_engine,
+    root: Path = ARCHIVE_DIR,
+) -> List[tuple]:
+    """Archived rows overlapping ``[since, until)`` as tuples of ``columns``.
+
+    Returns an empty list without touching the archive when the range starts
+    after the watermark, so hot-only queries stay cheap.
+    """
+    watermark = archived_before(name, engine)
+    if watermark is None or (since is not None and since >= watermark):
+        return []
+    table = read_archive(name, columns, since, until, where, root=root).select(list(columns))
+    return list(zip(*(column.to_pylist() for column in table.columns)))
+
+
+def archived_batches(
+    name: str,
+    columns: Sequence[str],
+    since: datetime | None = None,
+    until: datetime | None = None,
+    where: Mapping[str, Sequence[Any]] | None = None,
+    batch_size: int = RETENTION_BATCH,
+    engine: Engine = default_engine,
+    root: Path = ARCHIVE_DIR,
+) -> Iterator[List[tuple]]:
+    """Like :func:`archived_rows`, reading one month partition at a time."""
+    watermark = archived_before(name, engine)
+    if watermark is None or (since is not None and since >= watermark):
+        return
+    policy = POLICIES[name]
+    pa = require_pyarrow("the data archive")
+    schema = policy.schema(pa)
+    selected = list(dict.fromkeys([*columns, policy.key]))
+    filters = _filters(policy, since, until, where)
+    for directory in _partitions(name, since, until, root):
+        tables = _read_partition(directory, selected, filters, schema)
+        if not tables:
+            continue
+        table = _drop_duplicates(pa.concat_tables(tables), policy.key).select(list(columns))
+        for batch in table.to_batches(batch_size):
+            yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+
+def main(argv: Sequence[str] | None = None) -> None:  # pragma: no cover - CLI helper
+    from ..database import initialize_database
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", help="comma separated subset of " + ",".join(POLICIES))
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM on SQLite")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    initialize_database(default_engine)
+    names = [name.strip() for name in args.tables.split(",")] if args.tables else None
+    moved = apply_retention(names, vacuum=not args.no_vacuum)
+    logger.info("Archived rows: %s", moved or "retention disabled for every table")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
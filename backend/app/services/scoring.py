@@ -2,10 +2,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Sequence, Tuple
 
 import numpy as np
 
+from ..metrics import COMPUTE_SECONDS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .snapshot import QuoteSnapshot
+
 
 @dataclass(slots=True)
 class ScoreComponent:
@@ -32,6 +37,61 @@ class StockScore:
         return {component.name: component.contribution for component in self.components}
 
 
+COMPONENTS: Tuple[str, ...] = ("sentiment", "industry", "technical", "fundamental")
+
+
+@dataclass(slots=True)
+class WhatIfResult:
+    """Scores of ``n`` tickers under ``k`` weightings.
+
+    ``scores[:, j]`` are the min-max normalised totals under weighting ``j``,
+    ``top[j]`` the row positions of its ``top_k`` best tickers (best first)
+    and ``spearman[i, j]`` the rank correlation of weightings ``i`` and ``j``.
+    """
+
+    scores: np.ndarray
+    top: np.ndarray
+    spearman: np.ndarray
+
+
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """Column-wise ranks starting at 1, ties sharing their average rank."""
+    rows = np.ascontiguousarray(values.T)
+    k, n = rows.shape
+    order = np.argsort(rows, axis=1)
+    ordered = np.take_along_axis(rows, order, axis=1)
+    positions = np.broadcast_to(np.arange(n), (k, n))
+    starts = np.ones((k, n), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends = np.ones((k, n), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    # First and last sorted position of each value's tie group.
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    last = n - 1 - np.maximum.accumulate(np.where(ends[:, ::-1], positions, 0), axis=1)[:, ::-1]
+    ranks = np.empty((k, n))
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=1)
+    return ranks.T
+
+
+def spearman(values: np.ndarray) -> np.ndarray:
+    """Spearman rank correlation between the columns of ``values`` (1 on the diagonal)."""
+    ranks = average_ranks(values)
+    ranks -= ranks.mean(axis=0)
+    norms = np.sqrt((ranks * ranks).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = (ranks.T @ ranks) / np.outer(norms, norms)
+    # A constant column (e.g. an all-zero weighting) has no ranking to correlate.
+    corr = np.nan_to_num(corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def fundamental_score(pe_ratio: np.ndarray) -> np.ndarray:
+    """Earnings yield capped at 2; 0.5 when the P/E is unknown."""
+    with np.errstate(divide="ignore"):
+        return np.where(pe_ratio != 0, np.minimum(2.0, 1.0 / pe_ratio), 0.5)
+
+
 class ScoreEngine:
     def __init__(self, weights: Dict[str, float] | None = None) -> None:
         self.weights = weights or {
@@ -58,6 +118,72 @@ class ScoreEngine:
         ]
         return StockScore(ticker=ticker, name=name, components=components)
 
+    @COMPUTE_SECONDS.timed(stage="score")
+    def score_snapshot(
+        self,
+        snapshot: "QuoteSnapshot",
+        sentiment: Mapping[str, float],
+        industry_heat: Mapping[str, float],
+        technical: np.ndarray | None = None,
+    ) -> List[StockScore]:
+        """Score every ticker of ``snapshot``; technical/fundamental are computed column-wise.
+
+        ``technical`` (one value per row, e.g. a factor composite from
+        :mod:`.factors`) replaces the default of today's percent change.
+        """
+        if technical is None:
+            technical = snapshot["percent_change"] / 100
+        fundamental = fundamental_score(snapshot["pe_ratio"])
+        heat_by_code = np.array([industry_heat.get(industry, 0.0) for industry in snapshot.industries])
+        industry = heat_by_code[snapshot.industry_codes] if len(heat_by_code) else np.zeros(len(snapshot))
+        tickers = snapshot.tickers.tolist()
+        return [
+            self.score(
+                ticker=ticker,
+                name=name,
+                sentiment=float(sentiment.get(ticker, 0.0)),
+                industry_heat=industry_value,
+                technical=technical_value,
+                fundamental=fundamental_value,
+            )
+            for ticker, name, industry_value, technical_value, fundamental_value in zip(
+                tickers, snapshot.names.tolist(), industry.tolist(), technical.tolist(), fundamental.tolist()
+            )
+        ]
+
+    @staticmethod
+    def component_matrix(scores: Sequence[StockScore]) -> np.ndarray:
+        """Component values of ``scores`` as a ``len(scores) x len(COMPONENTS)`` matrix."""
+        if not scores:
+            return np.empty((0, len(COMPONENTS)))
+        return np.array([[component.value for component in score.components[: len(COMPONENTS)]] for score in scores])
+
+    def weight_matrix(self, weightings: Sequence[Mapping[str, float]]) -> np.ndarray:
+        """``len(weightings) x len(COMPONENTS)`` weights; omitted components weigh 0."""
+        unknown = {name for weights in weightings for name in weights} - set(COMPONENTS)
+        if unknown:
+            raise ValueError(f"Unknown score components: {', '.join(sorted(unknown))}")
+        return np.array([[float(weights.get(name, 0.0)) for name in COMPONENTS] for weights in weightings])
+
+    @COMPUTE_SECONDS.timed(stage="score_whatif")
+    def what_if(self, values: np.ndarray, weights: np.ndarray, top_k: int = 20) -> WhatIfResult:
+        """Score every ticker under every weighting at once.
+
+        ``values`` is the ticker x component matrix from :meth:`component_matrix`
+        and ``weights`` the weighting x component matrix; the totals are one
+        matrix product, normalised per weighting like :meth:`normalize`.
+        """
+        totals = values @ weights.T
+        n, k = totals.shape
+        if not n:
+            return WhatIfResult(totals, np.empty((k, 0), dtype=np.intp), np.eye(k))
+        low = totals.min(axis=0)
+        scores = (totals - low) / np.maximum(totals.max(axis=0) - low, 1e-6)
+        top_k = min(top_k, n)
+        top = np.argpartition(-scores, top_k - 1, axis=0)[:top_k].T
+        order = np.argsort(-np.take_along_axis(scores.T, top, axis=1), axis=1, kind="stable")
+        return WhatIfResult(scores, np.take_along_axis(top, order, axis=1), spearman(scores))
+
     def normalize(self, scores: Iterable[StockScore]) -> List[StockScore]:
         scores_list = list(scores)
         if not scores_list:
@@ -0,0 +1,254 @@
+"""Full-text search over news articles.
+
+Chinese text has no word boundaries, so titles and bodies are indexed as
+overlapping character bigrams plus single characters (``盈利增长`` ->
+``盈利 利增 增长 盈 利 增 长``) while latin words are kept whole and
+lower-cased. Queries use bigrams only, so a one-character query matches the
+unigrams and longer queries match the bigrams. The pre-tokenized text is stored
+in an SQLite FTS5 table (ranked with BM25) or, on PostgreSQL, in a ``tsvector``
+column with a GIN index (ranked with ``ts_rank_cd``). The index is kept in sync
+by an ``after_insert`` hook on :class:`~app.models.NewsArticle`, and rebuilt
+once at startup when :data:`INDEX_VERSION` (the tokenization) changes.
+
+Without an index (other dialects, or SQLite built without FTS5) queries fall
+back to ``LIKE`` scans of titles and summaries only: bodies are stored
+compressed in ``content_blobs`` and cannot be matched in SQL.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..models import NewsArticle
+from .content_store import decompress
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "news_fts"
+PG_TABLE = "news_search"
+META_TABLE = "search_index_meta"
+# Bump whenever tokenize() changes what is indexed; existing indexes are rebuilt.
+INDEX_VERSION = 2
+
+_CJK = r"㐀-䶿一-鿿豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[0-9A-Za-z]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(value: str | None, unigrams: bool = False) -> List[str]:
+    """Split ``value`` into search tokens: CJK bigrams plus latin words/numbers.
+
+    With ``unigrams`` (used for indexed documents) every CJK character of a
+    longer run is also emitted on its own.
+    """
+    tokens: List[str] = []
+    for run in _TOKEN_RE.findall(value or ""):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+                if unigrams:
+                    tokens.extend(run)
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def _document(title: str | None, body: str | None) -> tuple[str, str]:
+    return " ".join(tokenize(title, unigrams=True)), " ".join(tokenize(body, unigrams=True))
+
+
+@dataclass(slots=True)
+class SearchHit:
+    article_id: int
+    score: float
+
+
+def _dialect(bind: Connection | Engine) -> str:
+    return bind.dialect.name
+
+
+def fts5_available(conn: Connection) -> bool:
+    if _dialect(conn) != "sqlite":
+        return False
+    options = {row[0] for row in conn.execute(text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in options
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the search tables and index any articles that are missing."""
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            if not fts5_available(conn):
+                logger.warning("SQLite was built without FTS5; /news/search falls back to LIKE scans.")
+                return
+            conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, body)"))
+            _check_version(conn, FTS_TABLE)
+            missing = _unindexed(conn, f"a.id NOT IN (SELECT rowid FROM {FTS_TABLE})")
+        elif dialect == "postgresql":
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                    "article_id INTEGER PRIMARY KEY REFERENCES news_articles(id) ON DELETE CASCADE, "
+                    "tsv tsvector NOT NULL)"
+                )
+            )
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{PG_TABLE}_tsv ON {PG_TABLE} USING GIN (tsv)"))
+            _check_version(conn, PG_TABLE)
+            missing = _unindexed(
+                conn, f"NOT EXISTS (SELECT 1 FROM {PG_TABLE} s WHERE s.article_id = a.id)"
+            )
+        else:
+            return
+        for article_id, title, body in missing:
+            index_article(conn, article_id, title, body)
+        if missing:
+            logger.info("Indexed %d articles for full-text search", len(missing))
+
+
+def _check_version(conn: Connection, table: str) -> None:
+    """Empty ``table`` when it was built by another tokenization so that it is reindexed."""
+    conn.execute(
+        text(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (name VARCHAR(64) PRIMARY KEY, version INTEGER NOT NULL)")
+    )
+    version = conn.execute(text(f"SELECT version FROM {META_TABLE} WHERE name = :name"), {"name": table}).scalar()
+    if version == INDEX_VERSION:
+        return
+    conn.execute(text(f"DELETE FROM {table}"))
+    conn.execute(text(f"DELETE FROM {META_TABLE} WHERE name = :name"), {"name": table})
+    conn.execute(
+        text(f"INSERT INTO {META_TABLE} (name, version) VALUES (:name, :version)"),
+        {"name": table, "version": INDEX_VERSION},
+    )
+    if version is not None:
+        logger.info("Search index %s is at version %s; rebuilding for version %s", table, version, INDEX_VERSION)
+
+
+def _unindexed(conn: Connection, condition: str) -> List[tuple]:
+    rows = conn.execute(
+        text(
+            "SELECT a.id, a.title, a.content, b.codec, b.data FROM news_articles a "
+            f"LEFT JOIN content_blobs b ON b.hash = a.content_hash WHERE {condition}"
+        )
+    )
+    return [
+        (article_id, title, decompress(data, codec).decode("utf-8") if data is not None else body)
+        for article_id, title, body, codec, data in rows
+    ]
+
+
+def index_article(conn: Connection, article_id: int, title: str | None, body: str | None) -> None:
+    title_tokens, body_tokens = _document(title, body)
+    dialect = _dialect(conn)
+    if dialect == "sqlite":
+        conn.execute(
+            text(f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, body) VALUES (:id, :title, :body)"),
+            {"id": article_id, "title": title_tokens, "body": body_tokens},
+        )
+    elif dialect == "postgresql":
+        conn.execute(
+            text(
+                f"INSERT INTO {PG_TABLE}(article_id, tsv) VALUES (:id, "
+                "setweight(to_tsvector('simple', :title), 'A') || to_tsvector('simple', :body)) "
+                "ON CONFLICT (article_id) DO UPDATE SET tsv = EXCLUDED.tsv"
+            ),
+            {"id": article_id, "title": title_tokens, "body": body_tokens},
+        )
+
+
+def remove_articles(conn: Connection, article_ids: List[int]) -> None:
+    """Drop ``article_ids`` from the search index (before their rows are deleted)."""
+    if not article_ids:
+        return
+    dialect = _dialect(conn)
+    if dialect == "sqlite" and _has_fts_table(conn):
+        table, column = FTS_TABLE, "rowid"
+    elif dialect == "postgresql":
+        table, column = PG_TABLE, "article_id"
+    else:
+        return
+    conn.execute(
+        text(f"DELETE FROM {table} WHERE {column} IN ({', '.join(str(int(i)) for i in article_ids)})")
+    )
+
+
+_FTS_READY: set[str] = set()
+
+
+def _has_fts_table(conn: Connection) -> bool:
+    key = str(conn.engine.url)
+    if key not in _FTS_READY:
+        found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}).first()
+        if not found:
+            return False
+        _FTS_READY.add(key)
+    return True
+
+
+@event.listens_for(NewsArticle, "after_insert")
+def _index_on_insert(mapper, connection: Connection, target: NewsArticle) -> None:
+    dialect = _dialect(connection)
+    if dialect == "sqlite" and not _has_fts_table(connection):
+        return
+    if dialect in ("sqlite", "postgresql"):
+        index_article(connection, target.id, target.title, target.content)
+
+
+def search(
+    session: Session,
+    query: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[SearchHit]:
+    """Return article ids matching every token of ``query``, best first.
+
+    The ``LIKE`` fallback matches titles and summaries, not bodies, and does not rank.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    bind = session.get_bind()
+    dialect = _dialect(bind)
+    params = {"since": since, "until": until, "limit": limit, "offset": offset}
+    time_filter = (
+        ("AND a.published_at >= :since " if since else "") + ("AND a.published_at <= :until " if until else "")
+    )
+    if dialect == "sqlite" and _has_fts_table(session.connection()):
+        params["match"] = " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+        # bm25() is lower-is-better; titles are weighted 4x the body.
+        sql = (
+            f"SELECT a.id, -bm25({FTS_TABLE}, 4.0, 1.0) AS score FROM {FTS_TABLE} "
+            f"JOIN news_articles a ON a.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match {time_filter}"
+            f"ORDER BY bm25({FTS_TABLE}, 4.0, 1.0) LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "postgresql":
+        params["query"] = " & ".join(tokens)
+        sql = (
+            f"SELECT a.id, ts_rank_cd(s.tsv, q) AS score FROM {PG_TABLE} s "
+            "JOIN news_articles a ON a.id = s.article_id, to_tsquery('simple', :query) q "
+            f"WHERE s.tsv @@ q {time_filter}"
+            "ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        conditions = []
+        for i, token in enumerate(tokens):
+            params[f"t{i}"] = f"%{token}%"
+            conditions.append(f"(a.title LIKE :t{i} OR a.summary LIKE :t{i})")
+        sql = (
+            "SELECT a.id, 0.0 AS score FROM news_articles a WHERE "
+            + " AND ".join(conditions)
+            + f" {time_filter}ORDER BY a.published_at DESC LIMIT :limit OFFSET :offset"
+        )
+    return [SearchHit(article_id=row[0], score=float(row[1])) for row in session.execute(text(sql), params)]
@@ -2,27 +2,38 @@
 from __future__ import annotations
 
 import asyncio
+import os
 from typing import Iterable, List
 
+from ..metrics import SENTIMENT_ERRORS, SENTIMENT_SECONDS
 from .llm import LLMClient, SentimentResult, get_llm_client
 
+# Overrides the client's own version tag, e.g. after editing a prompt.
+MODEL_VERSION = os.getenv("BETTERSTOCK_SENTIMENT_MODEL_VERSION", "")
+
 
 class SentimentAnalyzer:
     def __init__(self, client: LLMClient | None = None) -> None:
         self._client = client or get_llm_client()
 
     async def analyze_batch(self, texts: Iterable[str]) -> List[SentimentResult]:
-        tasks = [self._client.analyze(text) for text in texts]
-        results = await asyncio.gather(*tasks)
-        for result in results:
-            result.raw.setdefault("provider", self.provider)
-        return results
+        return list(await asyncio.gather(*(self.analyze_text(text) for text in texts)))
 
     async def analyze_text(self, text: str) -> SentimentResult:
-        result = await self._client.analyze(text)
-        result.raw.setdefault("provider", self.provider)
+        provider = self.provider
+        try:
+            with SENTIMENT_SECONDS.time(provider=provider):
+                result = await self._client.analyze(text)
+        except Exception:
+            SENTIMENT_ERRORS.inc(provider=provider)
+            raise
+        result.raw.setdefault("provider", provider)
         return result
 
     @property
     def provider(self) -> str:
         return getattr(self._client, "provider", "unknown")
+
+    @property
+    def model_version(self) -> str:
+        return MODEL_VERSION or getattr(self._client, "model_version", "")
@@ -0,0 +1,277 @@
+"""Deterministic synthetic market simulator.
+
+Generates a full-market universe (thousands of tickers across industries) with
+correlated random-walk prices: every ticker's return is a beta-weighted market
+shock plus its industry shock plus idiosyncratic noise. All generation is
+vectorized so that e.g. 5000 tickers x 2500 days of history take seconds.
+
+Run ``python -m app.services.simulator --days 250`` to backfill ``quote_bars``.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .backtest import PriceBar
+from .calendar import EXCHANGE_TZ
+from .market import MarketDataProvider, MarketQuote
+from .snapshot import QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDUSTRIES: Tuple[str, ...] = (
+    "白酒", "家电", "新能源", "银行", "证券", "医药", "半导体", "汽车",
+    "房地产", "有色金属", "煤炭", "电力", "食品饮料", "通信", "计算机", "军工",
+)
+
+TICKS_PER_DAY = 48  # one tick per five minutes of a four hour session
+
+
+@dataclass(slots=True)
+class SimulatorConfig:
+    n_tickers: int = 500
+    industries: Sequence[str] = DEFAULT_INDUSTRIES
+    seed: int = 42
+    market_vol: float = 0.010
+    industry_vol: float = 0.008
+    idio_vol: float = 0.015
+    drift: float = 0.0002
+
+
+@dataclass(slots=True)
+class SimulatedHistory:
+    """Date x ticker panels of daily bars."""
+
+    dates: pd.DatetimeIndex
+    tickers: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    amount: np.ndarray
+    turnover_rate: np.ndarray
+
+    def to_frame(self, field_name: str = "close") -> pd.DataFrame:
+        return pd.DataFrame(getattr(self, field_name), index=self.dates, columns=self.tickers)
+
+    def iter_bars(self) -> Iterator[PriceBar]:
+        """Yield :class:`PriceBar` objects for the existing ``Backtester`` API."""
+        dates = self.dates.to_pydatetime()
+        for row, date in enumerate(dates):
+            closes = self.close[row]
+            for col, ticker in enumerate(self.tickers):
+                yield PriceBar(date=date, ticker=str(ticker), close=float(closes[col]))
+
+
+@dataclass(slots=True)
+class _Universe:
+    tickers: np.ndarray
+    names: np.ndarray
+    industry_codes: np.ndarray
+    beta: np.ndarray
+    float_shares: np.ndarray
+    base_turnover: np.ndarray
+    earnings_per_share: np.ndarray
+    book_per_share: np.ndarray
+    price: np.ndarray
+    prev_close: np.ndarray
+
+
+def _ticker_codes(n: int) -> np.ndarray:
+    """Spread tickers over the Shanghai main board, Shenzhen main board and ChiNext."""
+    idx = np.arange(n)
+    board = idx % 3
+    offset = idx // 3
+    base = np.choose(board, [600000, 1, 300001])
+    return np.char.zfill((base + offset).astype(str), 6)
+
+
+class MarketSimulator:
+    def __init__(self, config: SimulatorConfig | None = None) -> None:
+        self.config = config or SimulatorConfig()
+        self.industries = np.asarray(self.config.industries)
+        self._rng = np.random.default_rng(self.config.seed)
+        self.universe = self._build_universe()
+        self.industry_vocabulary = tuple(self.industries.tolist())
+        self._index = {ticker: row for row, ticker in enumerate(self.universe.tickers.tolist())}
+
+    def _build_universe(self) -> _Universe:
+        n = self.config.n_tickers
+        rng = self._rng
+        tickers = _ticker_codes(n)
+        industry_codes = rng.integers(0, len(self.industries), size=n).astype(np.int16)
+        names = np.char.add(np.char.add("模拟", self.industries[industry_codes]), np.arange(n).astype(str))
+        price = np.exp(rng.normal(3.0, 0.8, size=n)).round(2)
+        pe = np.clip(rng.lognormal(3.0, 0.5, size=n), 3.0, 300.0)
+        pb = np.clip(rng.lognormal(1.0, 0.5, size=n), 0.3, 50.0)
+        return _Universe(
+            tickers=tickers,
+            names=names,
+            industry_codes=industry_codes,
+            beta=np.clip(rng.normal(1.0, 0.25, size=n), 0.2, 2.0),
+            float_shares=np.exp(rng.normal(20.0, 1.0, size=n)),
+            base_turnover=np.clip(rng.lognormal(0.0, 0.6, size=n), 0.05, 20.0),
+            earnings_per_share=price / pe,
+            book_per_share=price / pb,
+            price=price.copy(),
+            prev_close=price.copy(),
+        )
+
+    def _returns(self, steps: int, scale: float = 1.0, dtype=np.float64) -> np.ndarray:
+        """Correlated (steps x tickers) simple returns."""
+        cfg = self.config
+        rng = self._rng
+        u = self.universe
+        n = len(u.tickers)
+        market = rng.standard_normal((steps, 1), dtype=dtype) * (cfg.market_vol * scale)
+        industry = rng.standard_normal((steps, len(self.industries)), dtype=dtype) * (cfg.industry_vol * scale)
+        returns = rng.standard_normal((steps, n), dtype=dtype)
+        returns *= cfg.idio_vol * scale
+        returns += market * u.beta.astype(dtype)
+        returns += industry[:, u.industry_codes]
+        returns += cfg.drift * scale * scale
+        return returns
+
+    def _turnover(self, returns: np.ndarray) -> np.ndarray:
+        rng = self._rng
+        noise = rng.standard_normal(returns.shape, dtype=returns.dtype) * 0.3
+        return self.universe.base_turnover.astype(returns.dtype) * np.exp(noise + 20.0 * np.abs(returns))
+
+    def history(self, days: int, end: datetime | None = None, dtype=np.float32) -> SimulatedHistory:
+        """Generate ``days`` business days of bars ending at ``end`` (default today).
+
+        The walk ends at the universe's current prices so that the backfill
+        joins seamlessly with the live tick stream.
+        """
+        end = end or datetime.utcnow()
+        dates = pd.bdate_range(end=end.date(), periods=days)
+        returns = self._returns(days, dtype=dtype)
+        log_growth = np.log1p(returns, out=returns)
+        np.cumsum(log_growth, axis=0, out=log_growth)
+        log_growth -= log_growth[-1]
+        close = np.exp(log_growth, out=log_growth)
+        close *= self.universe.price.astype(dtype)
+        previous = np.concatenate((close[:1], close[:-1]))
+        daily_returns = (close - previous) / previous
+        turnover = self._turnover(daily_returns)
+        volume = turnover / 100.0 * self.universe.float_shares.astype(dtype)
+        return SimulatedHistory(
+            dates=dates,
+            tickers=self.universe.tickers,
+            close=close,
+            volume=volume,
+            amount=volume * close,
+            turnover_rate=turnover,
+        )
+
+    def tick(self, timestamp: datetime | None = None) -> QuoteSnapshot:
+        """Advance the live market by one intraday step and return the snapshot."""
+        u = self.universe
+        returns = self._returns(1, scale=1.0 / np.sqrt(TICKS_PER_DAY))[0]
+        u.price = np.maximum(u.price * (1.0 + returns), 0.01).round(2)
+        change = (u.price - u.prev_close).round(2)
+        percent_change = change / u.prev_close * 100.0
+        turnover = self._turnover(percent_change / 100.0)
+        volume = turnover / 100.0 * u.float_shares
+        timestamp = timestamp or datetime.utcnow()
+        return QuoteSnapshot(
+            tickers=u.tickers,
+            names=u.names,
+            industry_codes=u.industry_codes,
+            industries=self.industry_vocabulary,
+            columns={
+                "price": u.price.copy(),
+                "change": change,
+                "percent_change": percent_change,
+                "turnover_rate": turnover,
+                "volume": volume,
+                "amount": volume * u.price,
+                "pe_ratio": np.where(u.earnings_per_share > 0, u.price / u.earnings_per_share, 0.0),
+                "pb_ratio": u.price / u.book_per_share,
+                "roe": u.earnings_per_share / u.book_per_share,
+            },
+            updated_at=np.full(len(u.tickers), np.datetime64(timestamp, "us")),
+            _index=self._index,
+        )
+
+    def close_day(self) -> None:
+        """Roll the session: today's last price becomes the reference close."""
+        self.universe.prev_close = self.universe.price.copy()
+
+
+class SimulatedMarketDataProvider(MarketDataProvider):
+    """Drop-in provider that ticks a :class:`MarketSimulator` on every fetch.
+
+    The first fetch of each exchange-local day closes the previous one, so
+    ``change`` and ``percent_change`` are measured against the last close.
+    """
+
+    def __init__(self, config: SimulatorConfig | None = None) -> None:
+        self.simulator = MarketSimulator(config)
+        self.session_date: date | None = None
+
+    async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
+        return (await self.fetch_snapshot(tickers)).to_quotes()
+
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> QuoteSnapshot:
+        today = datetime.now(EXCHANGE_TZ).date()
+        if self.session_date is not None and today != self.session_date:
+            self.simulator.close_day()
+        self.session_date = today
+        return self.simulator.tick().select(tickers)
+
+
+def backfill_history(session, history: SimulatedHistory, chunk_size: int = 50_000) -> int:
+    """Write ``history`` into ``quote_bars``, overwriting bars already stored; returns the number of rows."""
+    from .bars import write_bars
+
+    n_days, n_tickers = history.close.shape
+    dates = np.repeat(history.dates.to_pydatetime(), n_tickers)
+    tickers = np.tile(history.tickers, n_days)
+    columns = {
+        "close": history.close.ravel(),
+        "volume": history.volume.ravel(),
+        "amount": history.amount.ravel(),
+        "turnover_rate": history.turnover_rate.ravel(),
+    }
+    total = n_days * n_tickers
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        rows = [
+            {"ticker": ticker, "trade_date": date, "close": close, "volume": volume, "amount": amount,
+             "turnover_rate": turnover}
+            for ticker, date, close, volume, amount, turnover in zip(
+                tickers[start:stop].tolist(), dates[start:stop].tolist(),
+                columns["close"][start:stop].tolist(), columns["volume"][start:stop].tolist(),
+                columns["amount"][start:stop].tolist(), columns["turnover_rate"][start:stop].tolist(),
+            )
+        ]
+        write_bars(session, rows)
+    return total
+
+
+def main() -> None:  # pragma: no cover - CLI helper
+    defaults = SimulatorConfig()
+    parser = argparse.ArgumentParser(description="Backfill quote_bars with simulated history")
+    parser.add_argument("--tickers", type=int, default=defaults.n_tickers)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    from ..database import engine, initialize_database, session_scope
+
+    logging.basicConfig(level=logging.INFO)
+    initialize_database(engine)
+    simulator = MarketSimulator(SimulatorConfig(n_tickers=args.tickers, seed=args.seed))
+    history = simulator.history(args.days)
+    with session_scope() as session:
+        rows = backfill_history(session, history)
+    logger.info("Backfilled %d bars for %d tickers", rows, args.tickers)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
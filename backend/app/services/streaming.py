@@ -0,0 +1,171 @@
+"""Server-push quote streaming with per-ticker delta encoding.
+
+Each market refresh is diffed against the previous snapshot once, column by
+column with NumPy. Only the changed fields of each ticker are JSON encoded, and every fragment is encoded
+a single time no matter how many clients are subscribed to it. Subscribers sit
+behind bounded queues: a consumer that falls behind has its backlog dropped
+and receives a fresh snapshot of its tickers instead.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+import numpy as np
+
+from .quote_cache import QUOTE_CACHE
+from .snapshot import NUMERIC_FIELDS, QuoteSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Unsupported type {type(value)!r}")
+
+
+def diff_snapshots(previous: QuoteSnapshot | None, current: QuoteSnapshot) -> Dict[str, Dict[str, Any]]:
+    """Return ``{ticker: {field: value}}`` for every field that changed.
+
+    ``updated_at`` is not compared: providers stamp every quote on every
+    fetch, so it would mark the whole universe as changed. The snapshot time
+    travels once per message instead (see :meth:`QuoteStreamHub.publish`).
+    """
+    n = len(current)
+    if previous is None or not len(previous):
+        return {record.pop("ticker"): record for record in current.records()}
+    if len(previous) == n and np.array_equal(previous.tickers, current.tickers):
+        prev_rows = np.arange(n)
+        is_new = np.zeros(n, dtype=bool)
+    else:
+        prev_rows = np.fromiter(
+            (-1 if row is None else row for row in map(previous.row, current.tickers.tolist())),
+            dtype=np.intp,
+            count=n,
+        )
+        is_new = prev_rows < 0
+        prev_rows = np.where(is_new, 0, prev_rows)
+    changed: Dict[str, np.ndarray] = {
+        name: (current.columns[name] != previous.columns[name][prev_rows]) | is_new for name in NUMERIC_FIELDS
+    }
+    changed["name"] = (current.names != previous.names[prev_rows]) | is_new
+    changed["industry"] = (current.industry != previous.industry[prev_rows]) | is_new
+    any_changed = np.logical_or.reduce(list(changed.values()))
+    rows = np.flatnonzero(any_changed)
+    if not len(rows):
+        return {}
+    values = {"name": current.names, "industry": current.industry, **current.columns}
+    deltas: Dict[str, Dict[str, Any]] = {}
+    for row in rows.tolist():
+        deltas[str(current.tickers[row])] = {
+            name: values[name][row].item() if hasattr(values[name][row], "item") else values[name][row]
+            for name, mask in changed.items()
+            if mask[row]
+        }
+    return deltas
+
+
+class Subscriber:
+    """A single streaming client with a bounded outbound queue."""
+
+    def __init__(self, hub: "QuoteStreamHub", tickers: Iterable[str] | None, max_queue: int) -> None:
+        self._hub = hub
+        self.tickers: FrozenSet[str] | None = frozenset(tickers) if tickers else None
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: throw the backlog away and resync from a snapshot.
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self._hub.snapshot_message(self.tickers))
+
+    def resubscribe(self, tickers: Iterable[str] | None) -> None:
+        self.tickers = frozenset(tickers) if tickers else None
+        self.offer(self._hub.snapshot_message(self.tickers))
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._hub.unsubscribe(self)
+
+
+class QuoteStreamHub:
+    def __init__(self, max_queue: int = 32) -> None:
+        self.max_queue = max_queue
+        self._state: QuoteSnapshot | None = None
+        self._subscribers: List[Subscriber] = []
+        self._seq = itertools.count(1)
+        self.last_seq = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, tickers: Iterable[str] | None = None) -> Subscriber:
+        subscriber = Subscriber(self, tickers, self.max_queue)
+        self._subscribers.append(subscriber)
+        subscriber.offer(self.snapshot_message(subscriber.tickers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def snapshot_message(self, tickers: FrozenSet[str] | None = None) -> str:
+        selected: Dict[str, Dict[str, Any]] = {}
+        if self._state is not None:
+            for record in self._state.select(tickers).records():
+                selected[record["ticker"]] = record
+        as_of = self._state.as_of if self._state is not None else None
+        return _encode({"type": "snapshot", "seq": self.last_seq, "as_of": as_of, "quotes": selected})
+
+    def publish(self, snapshot: QuoteSnapshot) -> int:
+        """Diff ``snapshot`` against the last state and push deltas; returns tickers changed."""
+        deltas = diff_snapshots(self._state, snapshot)
+        self._state = snapshot
+        fragments = {ticker: _encode(delta) for ticker, delta in deltas.items()}
+        if not fragments:
+            return 0
+        self.last_seq = seq = next(self._seq)
+        as_of = _encode(snapshot.as_of)
+        payloads: Dict[FrozenSet[str] | None, str | None] = {}
+        for subscriber in list(self._subscribers):
+            key = subscriber.tickers
+            if key not in payloads:
+                payloads[key] = self._delta_message(seq, as_of, fragments, key)
+            message = payloads[key]
+            if message is not None:
+                subscriber.offer(message)
+        return len(fragments)
+
+    @staticmethod
+    def _delta_message(
+        seq: int, as_of: str, fragments: Dict[str, str], tickers: FrozenSet[str] | None
+    ) -> str | None:
+        body = ",".join(
+            f"{_encode(ticker)}:{fragment}"
+            for ticker, fragment in fragments.items()
+            if tickers is None or ticker in tickers
+        )
+        if not body:
+            return None
+        return f'{{"type":"delta","seq":{seq},"as_of":{as_of},"quotes":{{{body}}}}}'
+
+
+QUOTE_STREAM = QuoteStreamHub()
+QUOTE_CACHE.add_listener(QUOTE_STREAM.publish)
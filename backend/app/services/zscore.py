@@ -3,11 +3,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Iterable, List
+from typing import Iterable, List
 
 import numpy as np
 import pandas as pd
 
+from ..metrics import COMPUTE_SECONDS
+
 
 @dataclass(slots=True)
 class IndustryMetric:
@@ -33,6 +35,7 @@ class ZScoreCalculator:
         self.window = window
         self.min_periods = min_periods or max(5, window // 2)
 
+    @COMPUTE_SECONDS.timed(stage="zscore")
     def compute(self, metrics: Iterable[IndustryMetric]) -> List[IndustryZScore]:
         if not metrics:
             return []
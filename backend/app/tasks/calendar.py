@@ -0,0 +1,76 @@
+"""Session-aware APScheduler triggers over the A-share trading calendar."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from apscheduler.triggers.base import BaseTrigger
+
+from ..services.calendar import TradingCalendar
+
+
+class MarketHoursTrigger(BaseTrigger):
+    """Fire every ``session_interval`` during sessions and rarely (or never) otherwise.
+
+    A run is always scheduled at the close of each session so the closing
+    prices are captured; outside sessions the trigger waits for the next open,
+    firing every ``off_hours_interval`` meanwhile when one is configured.
+    """
+
+    def __init__(
+        self,
+        session_interval: timedelta,
+        off_hours_interval: timedelta | None = None,
+        calendar: TradingCalendar | None = None,
+        jitter: int | None = None,
+    ) -> None:
+        self.session_interval = session_interval
+        self.off_hours_interval = off_hours_interval
+        self.calendar = calendar or TradingCalendar()
+        self.jitter = jitter
+
+    def get_next_fire_time(self, previous_fire_time: datetime | None, now: datetime) -> datetime:
+        session = self.calendar.session_at(now)
+        if session is not None:
+            _opens, closes = session
+            next_fire = min(now + self.session_interval, closes + timedelta(seconds=30))
+            return self._apply_jitter(next_fire, self.jitter, now)
+        next_fire = self.calendar.next_open(now)
+        if self.off_hours_interval is not None:
+            next_fire = min(next_fire, now + self.off_hours_interval)
+        return self._apply_jitter(next_fire, self.jitter, now)
+
+    def __str__(self) -> str:
+        return f"market_hours[session={self.session_interval}, off_hours={self.off_hours_interval}]"
+
+
+class AdaptiveIntervalTrigger(BaseTrigger):
+    """Interval trigger that speeds up while a feed produces new items and backs off otherwise."""
+
+    def __init__(
+        self,
+        initial: timedelta,
+        minimum: timedelta,
+        maximum: timedelta,
+        jitter: int | None = None,
+        speedup: float = 0.5,
+        backoff: float = 1.5,
+    ) -> None:
+        self.interval = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.jitter = jitter
+        self.speedup = speedup
+        self.backoff = backoff
+
+    def observe(self, new_items: int) -> timedelta:
+        """Adapt to the last run's yield and return the new interval."""
+        factor = self.speedup if new_items > 0 else self.backoff
+        self.interval = max(self.minimum, min(self.maximum, self.interval * factor))
+        return self.interval
+
+    def get_next_fire_time(self, previous_fire_time: datetime | None, now: datetime) -> datetime:
+        base = previous_fire_time if previous_fire_time is not None else now
+        return self._apply_jitter(max(base + self.interval, now), self.jitter, now)
+
+    def __str__(self) -> str:
+        return f"adaptive[interval={self.interval}]"
@@ -0,0 +1,107 @@
+"""Leader election over a database row lease.
+
+Every API worker runs a :class:`LeaderElector`; the one holding the
+``scheduler`` lease runs the background jobs while the others only serve
+requests. The lease is renewed every ``ttl / 3`` seconds; if the leader dies,
+another worker takes over once the lease expires. Acquisition is a single
+conditional ``UPDATE`` so it is atomic on SQLite and PostgreSQL alike and needs
+no external coordination service.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from ..database import session_scope
+from ..models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = float(os.getenv("BETTERSTOCK_LEADER_LEASE_TTL", "30"))
+
+
+class LeaderElector:
+    def __init__(
+        self,
+        name: str = "scheduler",
+        ttl: float = LEASE_TTL,
+        on_elected: Callable[[], None] | None = None,
+        on_demoted: Callable[[], None] | None = None,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._task: asyncio.Task | None = None
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; returns whether this process holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        with session_scope() as session:
+            result = session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name)
+                .where(or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now))
+                .values(holder=self.holder, acquired_at=now, expires_at=expires_at)
+            )
+            if result.rowcount:
+                return True
+        try:
+            with session_scope() as session:
+                session.add(
+                    SchedulerLease(name=self.name, holder=self.holder, acquired_at=now, expires_at=expires_at)
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def release(self) -> None:
+        with session_scope() as session:
+            session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.is_leader:
+            self._set_leader(False)
+            await asyncio.to_thread(self.release)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self.try_acquire)
+            except Exception:  # pragma: no cover - database unavailable
+                logger.exception("Leader lease renewal failed")
+                acquired = False
+            if acquired != self.is_leader:
+                self._set_leader(acquired)
+            await asyncio.sleep(self.ttl / 3)
+
+    def _set_leader(self, leader: bool) -> None:
+        self.is_leader = leader
+        logger.info("%s %s leadership of %r", self.holder, "acquired" if leader else "lost", self.name)
+        callback = self._on_elected if leader else self._on_demoted
+        if callback is not None:
+            callback()
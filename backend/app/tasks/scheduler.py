@@ -2,100 +2,183 @@
 from __future__ import annotations
 
 import asyncio
+import importlib.util
 import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Deque
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy.orm import Session
+from apscheduler.triggers.cron import CronTrigger
 
 from ..database import session_scope
-from ..models import Base, NewsArticle, SentimentScore, StockQuote
-from ..services.crawler import fetch_latest_news
-from ..services.market import DEFAULT_PROVIDER
-from ..services.sentiment import SentimentAnalyzer
+from ..metrics import DB_ROWS_WRITTEN, DB_WRITE_SECONDS
+from ..models import StockQuote
+from ..profiling import PROFILER
+from ..services.bars import closing_bars, write_bars
+from ..services.calendar import EXCHANGE_TZ, TradingCalendar
+from ..services.industry import INDUSTRY_AGGREGATOR
+from ..services.ingestion import NewsIngestor, submit_news_refresh
+from ..services.job_requests import JOB_REQUEST_POLL, dispatch_requests
+from ..services.quote_cache import QUOTE_CACHE
+from ..services.retention import POLICIES, apply_retention
+from .calendar import AdaptiveIntervalTrigger, MarketHoursTrigger
+from .leader import LEASE_TTL
 
 logger = logging.getLogger(__name__)
 
+QUOTE_SESSION_INTERVAL = timedelta(seconds=float(os.getenv("BETTERSTOCK_QUOTE_SESSION_INTERVAL", "60")))
+_off_hours = float(os.getenv("BETTERSTOCK_QUOTE_OFF_HOURS_INTERVAL", "0"))
+QUOTE_OFF_HOURS_INTERVAL = timedelta(seconds=_off_hours) if _off_hours > 0 else None
+NEWS_MIN_INTERVAL = timedelta(minutes=float(os.getenv("BETTERSTOCK_NEWS_MIN_INTERVAL", "5")))
+NEWS_MAX_INTERVAL = timedelta(minutes=float(os.getenv("BETTERSTOCK_NEWS_MAX_INTERVAL", "120")))
+JOB_JITTER_SECONDS = int(os.getenv("BETTERSTOCK_JOB_JITTER", "10"))
+RETENTION_HOUR = int(os.getenv("BETTERSTOCK_RETENTION_HOUR", "3"))
+
+
+@dataclass(slots=True)
+class JobRun:
+    job_id: str
+    started_at: datetime
+    duration: float
+    outcome: str
+    error: str | None = None
+
 
 class TaskScheduler:
-    def __init__(self) -> None:
+    def __init__(self, calendar: TradingCalendar | None = None, history: int = 200) -> None:
         self._scheduler = AsyncIOScheduler(timezone="Asia/Shanghai")
-        self._sentiment = SentimentAnalyzer()
+        self._ingestor = NewsIngestor()
+        self.calendar = calendar or TradingCalendar()
+        self.news_trigger = AdaptiveIntervalTrigger(
+            initial=timedelta(minutes=30),
+            minimum=NEWS_MIN_INTERVAL,
+            maximum=NEWS_MAX_INTERVAL,
+            jitter=JOB_JITTER_SECONDS,
+        )
+        self.market_trigger = MarketHoursTrigger(
+            session_interval=QUOTE_SESSION_INTERVAL,
+            off_hours_interval=QUOTE_OFF_HOURS_INTERVAL,
+            calendar=self.calendar,
+            jitter=JOB_JITTER_SECONDS,
+        )
+        self.runs: Deque[JobRun] = deque(maxlen=history)
 
     def start(self) -> None:
-        self._scheduler.add_job(self.refresh_news, "interval", minutes=60, id="refresh_news")
-        self._scheduler.add_job(self.refresh_market, "interval", minutes=5, id="refresh_market")
+        guards = {"coalesce": True, "max_instances": 1, "misfire_grace_time": 60, "replace_existing": True}
+        self._scheduler.add_job(
+            self._tracked("refresh_news", self.refresh_news),
+            self.news_trigger,
+            id="refresh_news",
+            name="refresh_news",
+            next_run_time=datetime.now(EXCHANGE_TZ),
+            **guards,
+        )
+        self._scheduler.add_job(
+            self._tracked("refresh_market", self.refresh_market),
+            self.market_trigger,
+            id="refresh_market",
+            name="refresh_market",
+            next_run_time=datetime.now(EXCHANGE_TZ),
+            **guards,
+        )
+        # Not tracked: it polls every few seconds and would flood the run history.
+        self._scheduler.add_job(
+            self.dispatch_requests,
+            "interval",
+            seconds=JOB_REQUEST_POLL,
+            id="dispatch_requests",
+            name="dispatch_requests",
+            next_run_time=datetime.now(EXCHANGE_TZ),
+            **guards,
+        )
+        if any(policy.enabled for policy in POLICIES.values()):
+            if importlib.util.find_spec("pyarrow") is None:
+                logger.warning("pyarrow is not installed; data retention will not run.")
+            else:
+                self._scheduler.add_job(
+                    self._tracked("apply_retention", self.apply_retention),
+                    CronTrigger(hour=RETENTION_HOUR, minute=30, timezone=EXCHANGE_TZ, jitter=JOB_JITTER_SECONDS),
+                    id="apply_retention",
+                    name="apply_retention",
+                    **guards,
+                )
         self._scheduler.start()
 
-    async def refresh_news(self) -> None:
+    @property
+    def running(self) -> bool:
+        return self._scheduler.running
+
+    def shutdown(self) -> None:
+        if self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+
+    def _tracked(self, job_id: str, func: Callable[[], Awaitable[object]]) -> Callable[[], Awaitable[None]]:
+        async def run() -> None:
+            started_at = datetime.utcnow()
+            began = time.perf_counter()
+            mode = PROFILER.take_armed(job_id)
+            try:
+                if mode is None:
+                    await func()
+                else:
+                    with PROFILER.session(job_id, mode):
+                        await func()
+            except Exception as exc:
+                self.runs.append(JobRun(job_id, started_at, time.perf_counter() - began, "failed", str(exc)))
+                logger.exception("Scheduled job %s failed", job_id)
+                return
+            self.runs.append(JobRun(job_id, started_at, time.perf_counter() - began, "succeeded"))
+
+        return run
+
+    async def refresh_news(self) -> int:
         logger.info("Refreshing news feed...")
-        items = await fetch_latest_news()
-        if not items:
-            return
-        async def process_item(item):
-            result = await self._sentiment.analyze_text(item.content or item.summary)
-            with session_scope() as session:
-                existing = session.query(NewsArticle).filter_by(url=item.url).one_or_none()
-                if existing:
-                    return
-                article = NewsArticle(
-                    source=item.source,
-                    title=item.title,
-                    url=item.url,
-                    published_at=item.published_at,
-                    summary=item.summary,
-                    content=item.content,
-                    raw_payload=item.payload,
-                )
-                session.add(article)
-                session.flush()
-                session.add(
-                    SentimentScore(
-                        article_id=article.id,
-                        provider=result.raw.get("provider", "heuristic"),
-                        sentiment=result.sentiment,
-                        confidence=result.confidence,
-                        metadata=result.raw,
-                    )
-                )
-        await asyncio.gather(*(process_item(item) for item in items))
+        job = submit_news_refresh(self._ingestor)
+        await job.wait()
+        if job.status == "failed":
+            # Recorded as a failed run by _tracked; a failure says nothing about news volume.
+            raise RuntimeError(job.error or f"News refresh {job.id} failed")
+        new_items = int(job.progress.get("items_new", 0))
+        interval = self.news_trigger.observe(new_items)
+        if self._scheduler.running:
+            self._scheduler.modify_job("refresh_news", next_run_time=datetime.now(EXCHANGE_TZ) + interval)
+        logger.info("News refresh %s finished: %s; next in %s", job.id, job.progress, interval)
+        return new_items
+
+    async def dispatch_requests(self) -> None:
+        """Run the jobs requested through the API on any worker."""
+        try:
+            await dispatch_requests(stale_after=max(LEASE_TTL, 3 * JOB_REQUEST_POLL))
+        except Exception:  # pragma: no cover - database unavailable
+            logger.exception("Dispatching job requests failed")
+
+    async def apply_retention(self) -> None:
+        moved = await asyncio.to_thread(apply_retention)
+        logger.info("Retention finished: %s", moved)
 
     async def refresh_market(self) -> None:
         logger.info("Refreshing market data...")
-        quotes = await DEFAULT_PROVIDER.fetch_quotes()
-        with session_scope() as session:
-            for quote in quotes:
-                existing = session.get(StockQuote, quote.ticker)
-                if existing:
-                    existing.price = quote.price
-                    existing.change = quote.change
-                    existing.percent_change = quote.percent_change
-                    existing.turnover_rate = quote.turnover_rate
-                    existing.volume = quote.volume
-                    existing.amount = quote.amount
-                    existing.industry = quote.industry
-                    existing.pe_ratio = quote.pe_ratio
-                    existing.pb_ratio = quote.pb_ratio
-                    existing.roe = quote.roe
-                    existing.updated_at = quote.updated_at
-                else:
-                    session.add(
-                        StockQuote(
-                            ticker=quote.ticker,
-                            name=quote.name,
-                            price=quote.price,
-                            change=quote.change,
-                            percent_change=quote.percent_change,
-                            turnover_rate=quote.turnover_rate,
-                            volume=quote.volume,
-                            amount=quote.amount,
-                            industry=quote.industry,
-                            pe_ratio=quote.pe_ratio,
-                            pb_ratio=quote.pb_ratio,
-                            roe=quote.roe,
-                            updated_at=quote.updated_at,
-                        )
-                    )
-
-
-def initialize_database(engine) -> None:
-    Base.metadata.create_all(bind=engine)
+        snapshot = await QUOTE_CACHE.refresh()
+        with DB_WRITE_SECONDS.time(table="stock_quotes"), session_scope() as session:
+            existing = {
+                quote.ticker: quote
+                for quote in session.query(StockQuote).filter(StockQuote.ticker.in_(snapshot.tickers.tolist()))
+            }
+            for record in snapshot.records():
+                stock = existing.get(record["ticker"])
+                if stock is None:
+                    session.add(StockQuote(**record))
+                    continue
+                for field_name, value in record.items():
+                    setattr(stock, field_name, value)
+        DB_ROWS_WRITTEN.inc(len(snapshot), table="stock_quotes")
+        # The run scheduled at each close stores the day's bar for the factor engine.
+        bars = closing_bars(snapshot, self.calendar)
+        if bars:
+            with session_scope() as session:
+                write_bars(session, bars)
+        await INDUSTRY_AGGREGATOR.record(snapshot)
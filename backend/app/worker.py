@@ -0,0 +1,70 @@
+"""Standalone scheduler and ingestion process.
+
+Run ``python -m app.worker`` next to API processes started with
+``BETTERSTOCK_EMBEDDED_SCHEDULER=0``. The API workers then only serve reads:
+quotes come from the ``stock_quotes`` rows this process keeps up to date, so
+they never import the crawler, APScheduler or Akshare. Several worker
+processes may run; the scheduler lease makes sure only one is active.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+
+from .database import engine, initialize_database
+from .metrics import METRICS_ENABLED, serve_metrics
+from .profiling import LOOP_LAG_THRESHOLD, LoopLagMonitor
+from .tasks.leader import LeaderElector
+from .tasks.scheduler import TaskScheduler
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("BETTERSTOCK_WORKER_METRICS_PORT", "0"))
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    scheduler = TaskScheduler()
+
+    def on_elected() -> None:
+        if not scheduler.running:
+            scheduler.start()
+
+    elector = LeaderElector(on_elected=on_elected, on_demoted=scheduler.shutdown)
+    elector.start()
+    lag_monitor = LoopLagMonitor() if LOOP_LAG_THRESHOLD > 0 else None
+    if lag_monitor is not None:
+        lag_monitor.start()
+    server = await serve_metrics("0.0.0.0", METRICS_PORT) if METRICS_ENABLED and METRICS_PORT else None
+    logger.info("Worker %s started", elector.holder)
+    try:
+        await stop.wait()
+    finally:
+        if server is not None:
+            server.close()
+        if lag_monitor is not None:
+            lag_monitor.stop()
+        await elector.stop()
+        scheduler.shutdown()
+
+
+async def _main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # pragma: no cover - Windows
+            pass
+    await run_worker(stop)
+
+
+def main() -> None:  # pragma: no cover - CLI helper
+    logging.basicConfig(level=logging.INFO)
+    initialize_database(engine)
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1 @@
+"""Performance benchmarks for the BetterStock backend (run from ``backend/``)."""
@@ -0,0 +1,116 @@
+"""Seeded synthetic inputs for the analytics benchmarks.
+
+Prices come from :class:`~app.services.simulator.MarketSimulator`, so every
+scale reproduces the same universe for a given seed.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from app.services.backtest import PriceBar
+from app.services.factors import PANEL_FIELDS, PricePanel
+from app.services.simulator import MarketSimulator, SimulatedHistory, SimulatorConfig
+from app.services.snapshot import QuoteSnapshot
+from app.services.zscore import IndustryMetric
+
+TRADING_DAYS_PER_YEAR = 252
+
+_POSITIVE = ("增长", "盈利", "创新", "突破", "上升")
+_NEGATIVE = ("下跌", "亏损", "风险", "下滑", "裁员", "震荡")
+_FILLER = ("公司", "公告", "市场", "板块", "资金", "机构", "季度", "业绩", "行业", "政策", "投资者", "产品")
+
+
+def simulator(tickers: int, seed: int = 42) -> MarketSimulator:
+    return MarketSimulator(SimulatorConfig(n_tickers=tickers, seed=seed))
+
+
+def quote_snapshot(tickers: int, seed: int = 42) -> QuoteSnapshot:
+    return simulator(tickers, seed).tick()
+
+
+def sentiment_map(snapshot: QuoteSnapshot, seed: int = 42) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Per-ticker news sentiment and per-industry heat as the scores endpoint reads them."""
+    rng = np.random.default_rng(seed)
+    tickers = snapshot.tickers.tolist()
+    covered = rng.random(len(tickers)) < 0.6
+    values = rng.uniform(-1, 1, len(tickers))
+    sentiment = {ticker: float(value) for ticker, value, hit in zip(tickers, values, covered) if hit}
+    heat = {industry: float(rng.normal()) for industry in snapshot.industries}
+    return sentiment, heat
+
+
+def market_history(tickers: int, years: int, seed: int = 42) -> Tuple[MarketSimulator, SimulatedHistory]:
+    market = simulator(tickers, seed)
+    return market, market.history(years * TRADING_DAYS_PER_YEAR)
+
+
+def price_bars(history: SimulatedHistory) -> List[PriceBar]:
+    return list(history.iter_bars())
+
+
+def price_panel(tickers: int, days: int = 61, seed: int = 42) -> PricePanel:
+    """The trailing window :class:`~app.services.factors.FactorEngine` keeps for the factor library."""
+    _market, history = market_history(tickers, 1, seed)
+    return PricePanel(
+        history.dates[-days:].to_numpy().astype("datetime64[D]"),
+        history.tickers,
+        {name: getattr(history, name)[-days:].astype(np.float64) for name in PANEL_FIELDS},
+    )
+
+
+def industry_metrics(market: MarketSimulator, history: SimulatedHistory) -> List[IndustryMetric]:
+    """Daily industry-average turnover and return, the inputs of the z-score endpoint."""
+    industries = market.industry_vocabulary
+    codes = market.universe.industry_codes
+    counts = np.maximum(np.bincount(codes, minlength=len(industries)), 1)
+    returns = np.vstack([np.zeros((1, history.close.shape[1])), np.diff(history.close, axis=0) / history.close[:-1]])
+    metrics: List[IndustryMetric] = []
+    for name, panel in (("turnover", history.turnover_rate), ("sentiment", returns * 100)):
+        for date, row in zip(history.dates.to_pydatetime(), panel):
+            means = np.bincount(codes, weights=row, minlength=len(industries)) / counts
+            metrics.extend(
+                IndustryMetric(industry=industry, metric_name=name, timestamp=date, value=float(value))
+                for industry, value in zip(industries, means.tolist())
+            )
+    return metrics
+
+
+def article_texts(count: int, seed: int = 42) -> List[str]:
+    """Chinese headline/summary-like texts with a realistic share of sentiment keywords."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(_FILLER * 6 + _POSITIVE + _NEGATIVE)
+    lengths = rng.integers(20, 120, size=count)
+    words = rng.choice(vocabulary, size=int(lengths.sum()))
+    texts: List[str] = []
+    start = 0
+    for length in lengths.tolist():
+        texts.append("".join(words[start : start + length].tolist()))
+        start += length
+    return texts
+
+
+def rss_feed(items: int, seed: int = 42) -> str:
+    """An RSS 2.0 document shaped like the feeds in ``DEFAULT_SOURCES``."""
+    texts = article_texts(items * 2, seed)
+    published = datetime(2024, 1, 2, 9, 30, tzinfo=timezone(timedelta(hours=8)))
+    entries = []
+    for i in range(items):
+        entries.append(
+            "<item>"
+            f"<title>{escape(texts[2 * i][:30])}</title>"
+            f"<link>https://finance.example.com/a/{seed}/{i}.html</link>"
+            f"<description>{escape(texts[2 * i + 1])}</description>"
+            f"<pubDate>{format_datetime(published - timedelta(minutes=7 * i))}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel>'
+        "<title>BetterStock fixture</title><link>https://finance.example.com/</link>"
+        + "".join(entries)
+        + "</channel></rss>\n"
+    )
@@ -0,0 +1,345 @@
+"""Benchmark runner for the analytics core.
+
+Measures wall time per call (best of ``--repeat`` runs, each repeating the
+call until it lasts ``--min-time``), throughput and peak Python heap
+(``tracemalloc``, one extra run) of each case over a grid of input sizes,
+writes the results as JSON and compares them with a stored baseline::
+
+    cd backend
+    python -m benchmarks.run --scale small                      # writes benchmarks/results/latest.json
+    python -m benchmarks.run --scale small --save-baseline      # refresh benchmarks/baseline.json
+    python -m benchmarks.run --cases backtest --tickers 1000 --years 5 --fail-on-regression
+
+Input generation is excluded from the timings. Baselines are only comparable
+on the same machine and interpreter; the JSON records both.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.backtest import Backtester
+from app.services.crawler import RSSSource
+from app.services.factors import compute_factors
+from app.services.industry import aggregate_industries
+from app.services.llm import HeuristicLLMClient
+from app.services.scoring import ScoreEngine
+from app.services.zscore import ZScoreCalculator
+
+from . import generators
+
+BENCH_DIR = Path(__file__).resolve().parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+WHATIF_WEIGHTINGS = 100
+
+
+@dataclass(slots=True)
+class Scale:
+    tickers: Sequence[int]
+    years: Sequence[int]
+    articles: Sequence[int]
+    feeds: Sequence[int]
+
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(tickers=(100,), years=(1,), articles=(10_000,), feeds=(50,)),
+    "medium": Scale(tickers=(100, 1_000), years=(1, 5), articles=(10_000, 100_000), feeds=(200,)),
+    # The 5k x 10y backtest materialises 12.6M PriceBar objects; expect several GB of RAM.
+    "large": Scale(
+        tickers=(100, 1_000, 5_000), years=(1, 5, 10), articles=(10_000, 100_000, 1_000_000), feeds=(1_000,)
+    ),
+}
+
+
+@dataclass(slots=True)
+class Result:
+    case: str
+    params: Dict[str, Any]
+    items: int
+    seconds: float
+    items_per_second: float
+    peak_mb: float | None
+    runs: List[float] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return self.case + "[" + ",".join(f"{name}={value}" for name, value in sorted(self.params.items())) + "]"
+
+
+# A case yields (params, item count, zero-argument callable) for every grid point.
+Case = Callable[[Scale], Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]]
+
+
+def case_score(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    engine = ScoreEngine()
+    for tickers in scale.tickers:
+        snapshot = generators.quote_snapshot(tickers)
+        sentiment, heat = generators.sentiment_map(snapshot)
+        yield {"stage": "score", "tickers": tickers}, tickers, lambda: engine.score_snapshot(snapshot, sentiment, heat)
+        scores = engine.score_snapshot(snapshot, sentiment, heat)
+        yield {"stage": "normalize", "tickers": tickers}, tickers, lambda: engine.normalize(scores)
+        values = engine.component_matrix(scores)
+        weights = np.random.default_rng(tickers).dirichlet(np.ones(values.shape[1]), WHATIF_WEIGHTINGS)
+        yield (
+            {"stage": "whatif", "tickers": tickers, "weightings": WHATIF_WEIGHTINGS},
+            tickers * WHATIF_WEIGHTINGS,
+            lambda: engine.what_if(values, weights),
+        )
+
+
+def case_zscore(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    calculator = ZScoreCalculator(window=20)
+    for tickers in scale.tickers:
+        for years in scale.years:
+            market, history = generators.market_history(tickers, years)
+            metrics = generators.industry_metrics(market, history)
+            yield {"tickers": tickers, "years": years}, len(metrics), lambda: calculator.compute(metrics)
+
+
+def case_industry(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    for tickers in scale.tickers:
+        snapshot = generators.quote_snapshot(tickers)
+        sentiment, _heat = generators.sentiment_map(snapshot)
+        values = np.array([sentiment.get(ticker, np.nan) for ticker in snapshot.tickers.tolist()])
+        yield {"tickers": tickers}, tickers, lambda: aggregate_industries(snapshot, values)
+
+
+def case_backtest(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    backtester = Backtester()
+    for tickers in scale.tickers:
+        for years in scale.years:
+            _market, history = generators.market_history(tickers, years)
+            bars = generators.price_bars(history)
+            last = history.close[-1]
+            scores = {str(ticker): float(value) for ticker, value in zip(history.tickers, last / history.close[0])}
+            del history
+            yield {"tickers": tickers, "years": years}, len(bars), lambda: backtester.run(bars, scores)
+
+
+def case_factors(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    for tickers in scale.tickers:
+        panel = generators.price_panel(tickers)
+        yield {"tickers": tickers}, tickers, lambda: compute_factors(panel)
+
+
+def case_sentiment(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    client = HeuristicLLMClient()
+
+    async def analyze_all(texts: List[str]) -> None:
+        for text in texts:
+            await client.analyze(text)
+
+    for articles in scale.articles:
+        texts = generators.article_texts(articles)
+        yield {"articles": articles}, articles, lambda: asyncio.run(analyze_all(texts))
+
+
+class _FixtureResponse:
+    def __init__(self, text: str) -> None:
+        self._text = text
+
+    async def __aenter__(self) -> "_FixtureResponse":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        return None
+
+    async def text(self) -> str:
+        return self._text
+
+
+class FixtureSession:
+    """Stands in for ``aiohttp.ClientSession``, serving files from ``fixtures/``."""
+
+    def __init__(self, directory: Path = FIXTURES_DIR) -> None:
+        self._feeds = {path.name: path.read_text(encoding="utf-8") for path in directory.glob("*.xml")}
+
+    def get(self, url: str, **_kwargs: Any) -> _FixtureResponse:
+        return _FixtureResponse(self._feeds[url.rsplit("/", 1)[-1]])
+
+
+def case_rss(scale: Scale) -> Iterator[Tuple[Dict[str, Any], int, Callable[[], Any]]]:
+    session = FixtureSession()
+
+    async def crawl(source: RSSSource, feeds: int) -> int:
+        count = 0
+        for _ in range(feeds):
+            async for _item in source.fetch(session):  # type: ignore[arg-type]
+                count += 1
+        return count
+
+    for fixture in sorted(path.name for path in FIXTURES_DIR.glob("*.xml")):
+        source = RSSSource(fixture, f"fixture://{fixture}")
+        per_feed = asyncio.run(crawl(source, 1))
+        for feeds in scale.feeds:
+            yield {"fixture": fixture, "feeds": feeds}, feeds * per_feed, lambda: asyncio.run(crawl(source, feeds))
+
+
+CASES: Dict[str, Case] = {
+    "score": case_score,
+    "zscore": case_zscore,
+    "industry": case_industry,
+    "backtest": case_backtest,
+    "factors": case_factors,
+    "sentiment": case_sentiment,
+    "rss": case_rss,
+}
+
+
+def _calls_per_run(func: Callable[[], Any], min_time: float) -> int:
+    """Like ``timeit.Timer.autorange``: how many calls make one timed run last ``min_time``."""
+    number = 1
+    while True:
+        began = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - began >= min_time:
+            return number
+        number *= 2
+
+
+def measure(
+    case: str,
+    params: Dict[str, Any],
+    items: int,
+    func: Callable[[], Any],
+    repeat: int,
+    memory: bool,
+    min_time: float = 0.2,
+) -> Result:
+    number = _calls_per_run(func, min_time)
+    runs: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        began = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - began) / number)
+    peak_mb = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    best = min(runs)
+    return Result(case, params, items, best, items / best if best else float("inf"), peak_mb, runs)
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results: Sequence[Result], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print a comparison table and return the keys that regressed beyond ``tolerance``."""
+    previous = {entry["key"]: entry for entry in baseline.get("results", [])}
+    regressions: List[str] = []
+    print(f"\n{'case':<58} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in results:
+        entry = previous.get(result.key)
+        if entry is None:
+            print(f"{result.key:<58} {'-':>10} {result.seconds:>10.4f} {'new':>7}")
+            continue
+        ratio = result.seconds / entry["seconds"] if entry["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result.key)
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"{result.key:<58} {entry['seconds']:>10.4f} {result.seconds:>10.4f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _ints(value: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in value.split(",") if part)
+
+
+def main(argv: Sequence[str] | None = None) -> int:  # pragma: no cover - CLI helper
+    parser = argparse.ArgumentParser(description="BetterStock analytics benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma separated subset of " + ",".join(CASES))
+    parser.add_argument("--tickers", type=_ints, help="override the scale, e.g. 100,1000")
+    parser.add_argument("--years", type=_ints)
+    parser.add_argument("--articles", type=_ints)
+    parser.add_argument("--feeds", type=_ints)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    base = SCALES[args.scale]
+    scale = Scale(
+        tickers=args.tickers or base.tickers,
+        years=args.years or base.years,
+        articles=args.articles or base.articles,
+        feeds=args.feeds or base.feeds,
+    )
+    results: List[Result] = []
+    for name in args.cases.split(","):
+        for params, items, func in CASES[name](scale):
+            result = measure(name, params, items, func, args.repeat, not args.no_memory, args.min_time)
+            results.append(result)
+            peak = f"{result.peak_mb:8.1f} MB" if result.peak_mb is not None else ""
+            print(f"{result.key:<58} {result.seconds:>9.4f}s {result.items_per_second:>14,.0f} items/s {peak}")
+            del func
+            gc.collect()
+
+    document = {
+        "environment": environment(),
+        "scale": {"name": args.scale, **asdict(scale)},
+        "results": [{"key": result.key, **asdict(result)} for result in results],
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(document, indent=2, ensure_ascii=False))
+    print(f"\nWrote {args.output}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(document, indent=2, ensure_ascii=False))
+        print(f"Saved baseline {args.baseline}")
+        return 0
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions and args.fail_on_regression:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Cold-start benchmark for the API and worker entry points.
+
+Each sample runs in a fresh interpreter against a throwaway SQLite database and
+reports the time to import the entry point, the time until the API startup
+hook has finished, and the peak resident memory::
+
+    cd backend && python -m benchmarks.startup --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+_PROBES = {
+    "api": """
+import asyncio, json, resource, time
+began = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+asyncio.run(app.router.startup())
+ready = time.perf_counter()
+asyncio.run(app.router.shutdown())
+""",
+    "worker": """
+import json, resource, time
+began = time.perf_counter()
+import app.worker
+imported = ready = time.perf_counter()
+""",
+}
+
+_REPORT = """
+print(json.dumps({
+    "import_s": imported - began,
+    "ready_s": ready - began,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def sample(target: str, database_url: str) -> dict:
+    env = dict(
+        os.environ,
+        BETTERSTOCK_DATABASE_URL=database_url,
+        BETTERSTOCK_EMBEDDED_SCHEDULER="0",
+        PYTHONWARNINGS="ignore",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBES[target] + _REPORT],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:  # pragma: no cover - CLI helper
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", choices=sorted(_PROBES), action="append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/startup.db"
+        sample("api", database_url)  # create the schema outside the measured runs
+        for target in args.target or sorted(_PROBES):
+            runs = [sample(target, database_url) for _ in range(args.runs)]
+            summary = {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+            print(f"{target:<8} " + "  ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
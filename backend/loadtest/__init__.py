@@ -0,0 +1 @@
+"""Self-contained load-test harness (run from ``backend/``)."""
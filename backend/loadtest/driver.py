@@ -0,0 +1,293 @@
+"""End-to-end HTTP load test against a real uvicorn process.
+
+Starts the mock feeds and OpenAI stub from :mod:`loadtest.servers`, launches
+the API (optionally with several uvicorn workers, or with the scheduler in a
+separate ``app.worker`` process) on a throwaway SQLite database with the
+simulated market provider, then drives a weighted mix of endpoints at a
+fixed concurrency and reports per-endpoint RPS and p50/p99 latency together
+with database contention signals::
+
+    cd backend
+    python -m loadtest.driver --concurrency 32 --duration 30
+    python -m loadtest.driver --workers 4 --split-worker --tickers 5000 --output loadtest.json
+
+The scheduler runs with short intervals so crawl, sentiment and quote
+upserts compete with API reads for the database during the run.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import aiohttp
+import numpy as np
+
+from .servers import FeedConfig, LLMConfig, feed_app, llm_app, news_sources, start
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_MIX: Dict[str, int] = {
+    "GET /market/quotes": 6,
+    "GET /news/latest?limit=50": 4,
+    "GET /news/latest?limit=20&fields=summary,sentiments": 2,
+    "GET /news/search?q=盈利增长": 2,
+    "GET /analytics/scores": 2,
+    "POST /news/refresh": 1,
+    "GET /health": 1,
+}
+
+_LOCKED = re.compile(r"database is locked|deadlock detected|could not serialize", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        values = np.asarray(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": len(self.latencies) / duration,
+            "p50_ms": float(np.percentile(values, 50)),
+            "p99_ms": float(np.percentile(values, 99)),
+            "max_ms": float(values.max()),
+            "statuses": dict(self.statuses),
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(values: Sequence[str] | None) -> Dict[str, int]:
+    if not values:
+        return dict(DEFAULT_MIX)
+    mix: Dict[str, int] = {}
+    for value in values:
+        endpoint, _, weight = value.rpartition("=")
+        mix[endpoint if " " in endpoint else f"GET {endpoint}"] = int(weight)
+    return mix
+
+
+def _metric_totals(text: str, name: str) -> Tuple[float, float]:
+    """Sum of ``name``'s ``_sum`` and ``_count`` series across labels."""
+    total = count = 0.0
+    for line in text.splitlines():
+        if line.startswith(name + "_sum"):
+            total += float(line.rsplit(" ", 1)[1])
+        elif line.startswith(name + "_count"):
+            count += float(line.rsplit(" ", 1)[1])
+    return total, count
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.processes: List[subprocess.Popen] = []
+        self.logs: List[Path] = []
+        self.tmp = tempfile.TemporaryDirectory(prefix="betterstock-load-")
+        self.api_port = args.port or _free_port()
+        self.base_url = f"http://127.0.0.1:{self.api_port}"
+
+    def environment(self, feed_url: str, llm_url: str) -> Dict[str, str]:
+        args = self.args
+        env = dict(
+            os.environ,
+            BETTERSTOCK_DATABASE_URL=args.database_url or f"sqlite:///{self.tmp.name}/load.db",
+            BETTERSTOCK_MARKET_PROVIDER="simulator",
+            BETTERSTOCK_SIM_TICKERS=str(args.tickers),
+            BETTERSTOCK_NEWS_SOURCES=news_sources(feed_url, args.rss_sources, args.html_sources),
+            BETTERSTOCK_NEWS_MIN_INTERVAL=str(args.news_interval / 60),
+            BETTERSTOCK_NEWS_MAX_INTERVAL=str(args.news_interval / 60),
+            BETTERSTOCK_QUOTE_SESSION_INTERVAL=str(args.quote_interval),
+            BETTERSTOCK_QUOTE_OFF_HOURS_INTERVAL=str(args.quote_interval),
+            BETTERSTOCK_QUOTE_TTL=str(args.quote_interval),
+            BETTERSTOCK_JOB_JITTER="0",
+            PYTHONWARNINGS="ignore",
+        )
+        if importlib.util.find_spec("openai") is not None:
+            env.update(BETTERSTOCK_LLM_PROVIDER="openai", OPENAI_BASE_URL=llm_url, OPENAI_API_KEY="stub")
+        else:
+            print("openai package not installed; sentiment uses the heuristic client instead of the stub server")
+            env["BETTERSTOCK_LLM_PROVIDER"] = "heuristic"
+        return env
+
+    def spawn(self, name: str, command: List[str], env: Dict[str, str]) -> None:
+        log_path = Path(self.tmp.name) / f"{name}.log"
+        log = log_path.open("w")
+        self.logs.append(log_path)
+        self.processes.append(
+            subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        )
+
+    async def wait_ready(self, session: aiohttp.ClientSession, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process in self.processes):
+                raise RuntimeError("Backend exited during startup; see " + ", ".join(map(str, self.logs)))
+            try:
+                async with session.get(self.base_url + "/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+        raise TimeoutError("Backend did not become healthy")
+
+    async def scrape_metrics(self, session: aiohttp.ClientSession) -> str:
+        try:
+            async with session.get(self.base_url + "/metrics") as response:
+                return await response.text() if response.status == 200 else ""
+        except aiohttp.ClientError:
+            return ""
+
+    async def client(self, session: aiohttp.ClientSession, deadline: float, seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        endpoints = list(self.mix)
+        weights = np.asarray([self.mix[endpoint] for endpoint in endpoints], dtype=float)
+        weights /= weights.sum()
+        while time.monotonic() < deadline:
+            endpoint = endpoints[int(rng.choice(len(endpoints), p=weights))]
+            method, path = endpoint.split(" ", 1)
+            stats = self.stats[endpoint]
+            began = time.perf_counter()
+            try:
+                async with session.request(method, self.base_url + path) as response:
+                    await response.read()
+                    stats.statuses[response.status] += 1
+                    if response.status >= 500:
+                        stats.errors += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.errors += 1
+            stats.latencies.append(time.perf_counter() - began)
+
+    async def run(self) -> Dict[str, object]:
+        args = self.args
+        feed_runner = await start(
+            feed_app(FeedConfig(items=args.feed_items, new_per_poll=args.new_per_poll, latency_ms=args.feed_latency_ms)),
+            "127.0.0.1",
+            feed_port := _free_port(),
+        )
+        llm_runner = await start(llm_app(LLMConfig(latency_ms=args.llm_latency_ms)), "127.0.0.1", llm_port := _free_port())
+        env = self.environment(f"http://127.0.0.1:{feed_port}", f"http://127.0.0.1:{llm_port}/v1")
+        api_env = dict(env, BETTERSTOCK_EMBEDDED_SCHEDULER="0" if args.split_worker else "1")
+        self.spawn(
+            "api",
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.api_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            api_env,
+        )
+        if args.split_worker:
+            self.spawn("worker", [sys.executable, "-m", "app.worker"], env)
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                await self.wait_ready(session)
+                await asyncio.sleep(args.warmup)
+                before = await self.scrape_metrics(session)
+                began = time.monotonic()
+                deadline = began + args.duration
+                await asyncio.gather(*(self.client(session, deadline, seed) for seed in range(args.concurrency)))
+                elapsed = time.monotonic() - began
+                after = await self.scrape_metrics(session)
+        finally:
+            for process in self.processes:
+                process.terminate()
+            for process in self.processes:
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            await feed_runner.cleanup()
+            await llm_runner.cleanup()
+        return self.report(elapsed, before, after, feed_runner.app["state"].requests, llm_runner.app["requests"])
+
+    def report(self, elapsed: float, before: str, after: str, feed_requests: int, llm_requests: int) -> Dict[str, object]:
+        endpoints = {endpoint: stats.summary(elapsed) for endpoint, stats in sorted(self.stats.items())}
+        write_sum, write_count = (a - b for a, b in zip(_metric_totals(after, "betterstock_db_write_seconds"),
+                                                         _metric_totals(before, "betterstock_db_write_seconds")))
+        lag_sum, lag_count = (a - b for a, b in zip(_metric_totals(after, "betterstock_event_loop_lag_seconds"),
+                                                     _metric_totals(before, "betterstock_event_loop_lag_seconds")))
+        locked = sum(len(_LOCKED.findall(path.read_text(errors="replace"))) for path in self.logs)
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        return {
+            "config": {key: value for key, value in vars(self.args).items() if key != "mix"} | {"mix": self.mix},
+            "duration_s": elapsed,
+            "total_rps": total / elapsed,
+            "endpoints": endpoints,
+            "database": {
+                "lock_errors_logged": locked,
+                # Only the worker process answering /metrics is visible here when --workers > 1.
+                "write_batches": write_count,
+                "avg_write_batch_ms": 1000 * write_sum / write_count if write_count else None,
+            },
+            "avg_event_loop_lag_ms": 1000 * lag_sum / lag_count if lag_count else None,
+            "upstream": {"feed_requests": feed_requests, "llm_requests": llm_requests},
+        }
+
+
+def print_report(report: Dict[str, object]) -> None:
+    print(f"\n{'endpoint':<56} {'req':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in report["endpoints"].items():  # type: ignore[union-attr]
+        print(
+            f"{endpoint:<56} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f}"
+            f" {stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+    print(f"\ntotal: {report['total_rps']:.1f} req/s over {report['duration_s']:.1f}s")
+    print(f"database: {report['database']}")
+    print(f"event loop lag (avg): {report['avg_event_loop_lag_ms']}")
+    print(f"upstream: {report['upstream']}")
+
+
+def main(argv: Sequence[str] | None = None) -> None:  # pragma: no cover - CLI helper
+    parser = argparse.ArgumentParser(description="BetterStock end-to-end load test")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load after warm-up")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--split-worker", action="store_true", help="run the scheduler in python -m app.worker")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--tickers", type=int, default=1000, help="simulated market size")
+    parser.add_argument("--rss-sources", type=int, default=4)
+    parser.add_argument("--html-sources", type=int, default=2)
+    parser.add_argument("--feed-items", type=int, default=50)
+    parser.add_argument("--new-per-poll", type=int, default=5)
+    parser.add_argument("--feed-latency-ms", type=float, default=100.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--news-interval", type=float, default=10.0, help="seconds between scheduled crawls")
+    parser.add_argument("--quote-interval", type=float, default=5.0, help="seconds between market refreshes")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--mix", nargs="*", help='weighted endpoints, e.g. "GET /market/quotes=5" "/health=1"')
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
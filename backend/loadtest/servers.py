@@ -0,0 +1,217 @@
+"""Local stand-ins for the external services the backend talks to.
+
+* :func:`feed_app` serves RSS (``/rss/{name}``) and HTML list pages
+  (``/html/{name}``). Every poll shifts the window by ``new_per_poll`` items so
+  ingestion keeps inserting, with configurable latency and item counts.
+* :func:`llm_app` is an OpenAI-compatible stub answering ``/v1/responses`` and
+  ``/v1/chat/completions`` with a sentiment JSON payload.
+
+Run ``python -m loadtest.servers`` to start both standalone.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+from benchmarks.generators import article_texts
+
+CST = timezone(timedelta(hours=8))
+
+
+@dataclass(slots=True)
+class FeedConfig:
+    items: int = 50
+    new_per_poll: int = 5
+    latency_ms: float = 100.0
+    jitter_ms: float = 50.0
+    error_rate: float = 0.0
+
+
+@dataclass(slots=True)
+class FeedState:
+    config: FeedConfig
+    texts: List[str] = field(default_factory=lambda: article_texts(4096, seed=7))
+    polls: Dict[str, int] = field(default_factory=dict)
+    requests: int = 0
+
+    def window(self, name: str) -> range:
+        poll = self.polls.get(name, 0)
+        self.polls[name] = poll + 1
+        newest = poll * self.config.new_per_poll + self.config.items
+        return range(newest - 1, newest - self.config.items - 1, -1)
+
+    def title(self, seq: int) -> str:
+        return self.texts[seq % len(self.texts)][:30]
+
+    def body(self, seq: int) -> str:
+        return self.texts[(seq * 7 + 3) % len(self.texts)]
+
+
+async def _delay(config: FeedConfig) -> None:
+    await asyncio.sleep(max(0.0, config.latency_ms + random.uniform(-1, 1) * config.jitter_ms) / 1000)
+    if config.error_rate and random.random() < config.error_rate:
+        raise web.HTTPServiceUnavailable()
+
+
+def feed_app(config: FeedConfig) -> web.Application:
+    state = FeedState(config)
+    app = web.Application()
+    app["state"] = state
+    now = datetime.now(CST)
+
+    async def rss(request: web.Request) -> web.Response:
+        state.requests += 1
+        await _delay(config)
+        name = request.match_info["name"]
+        entries = []
+        for seq in state.window(name):
+            published = format_datetime(now + timedelta(seconds=seq))
+            entries.append(
+                f"<item><title>{escape(state.title(seq))}</title>"
+                f"<link>http://{request.host}/a/{name}/{seq}.html</link>"
+                f"<description>{escape(state.body(seq))}</description>"
+                f"<pubDate>{published}</pubDate></item>"
+            )
+        body = f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>{"".join(entries)}</channel></rss>'
+        return web.Response(text=body, content_type="application/rss+xml")
+
+    async def html(request: web.Request) -> web.Response:
+        state.requests += 1
+        await _delay(config)
+        name = request.match_info["name"]
+        links = "".join(
+            f'<li><a class="news" href="http://{request.host}/a/{name}/{seq}.html">{escape(state.title(seq))}</a></li>'
+            for seq in state.window(name)
+        )
+        return web.Response(text=f"<html><body><ul>{links}</ul></body></html>", content_type="text/html")
+
+    app.router.add_get("/rss/{name}", rss)
+    app.router.add_get("/html/{name}", html)
+    return app
+
+
+@dataclass(slots=True)
+class LLMConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    error_rate: float = 0.0
+
+
+def _sentiment_for(text: str) -> Dict[str, float]:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest()
+    value = int.from_bytes(digest, "big") / 2**32
+    return {"sentiment": round(value * 2 - 1, 3), "confidence": round(0.5 + value / 2, 3)}
+
+
+def llm_app(config: LLMConfig) -> web.Application:
+    app = web.Application()
+    app["requests"] = 0
+
+    async def respond(request: web.Request, payload: dict) -> str:
+        app["requests"] += 1
+        await asyncio.sleep(max(0.0, config.latency_ms + random.uniform(-1, 1) * config.jitter_ms) / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            raise web.HTTPTooManyRequests()
+        messages = payload.get("input") or payload.get("messages") or []
+        text = str(messages[-1].get("content", "")) if messages else ""
+        return json.dumps(_sentiment_for(text))
+
+    async def responses(request: web.Request) -> web.Response:
+        payload = await request.json()
+        answer = await respond(request, payload)
+        return web.json_response(
+            {
+                "id": f"resp_{app['requests']}",
+                "object": "response",
+                "created_at": int(time.time()),
+                "status": "completed",
+                "model": payload.get("model", "stub"),
+                "output": [
+                    {
+                        "type": "message",
+                        "id": f"msg_{app['requests']}",
+                        "status": "completed",
+                        "role": "assistant",
+                        "content": [{"type": "output_text", "text": answer, "annotations": []}],
+                    }
+                ],
+            }
+        )
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        payload = await request.json()
+        answer = await respond(request, payload)
+        return web.json_response(
+            {
+                "id": f"chatcmpl_{app['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": answer}}
+                ],
+            }
+        )
+
+    app.router.add_post("/v1/responses", responses)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def start(app: web.Application, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def news_sources(base_url: str, rss: int, html: int) -> str:
+    """``BETTERSTOCK_NEWS_SOURCES`` value pointing at a running :func:`feed_app`."""
+    sources = [{"name": f"mock-rss-{i}", "type": "rss", "url": f"{base_url}/rss/feed{i}"} for i in range(rss)]
+    sources += [
+        {"name": f"mock-html-{i}", "type": "html", "url": f"{base_url}/html/page{i}", "selector": "a.news"}
+        for i in range(html)
+    ]
+    return json.dumps(sources)
+
+
+async def _serve_forever(args: argparse.Namespace) -> None:
+    feeds = FeedConfig(items=args.feed_items, new_per_poll=args.new_per_poll, latency_ms=args.feed_latency_ms)
+    await start(feed_app(feeds), args.host, args.feed_port)
+    await start(llm_app(LLMConfig(latency_ms=args.llm_latency_ms)), args.host, args.llm_port)
+    base = f"http://{args.host}:{args.feed_port}"
+    print(f"BETTERSTOCK_NEWS_SOURCES='{news_sources(base, args.rss_sources, args.html_sources)}'")
+    print(f"OPENAI_BASE_URL=http://{args.host}:{args.llm_port}/v1 OPENAI_API_KEY=stub BETTERSTOCK_LLM_PROVIDER=openai")
+    await asyncio.Event().wait()
+
+
+def main() -> None:  # pragma: no cover - CLI helper
+    parser = argparse.ArgumentParser(description="Mock news feeds and OpenAI-compatible stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--feed-port", type=int, default=8801)
+    parser.add_argument("--llm-port", type=int, default=8802)
+    parser.add_argument("--feed-items", type=int, default=50)
+    parser.add_argument("--new-per-poll", type=int, default=5)
+    parser.add_argument("--feed-latency-ms", type=float, default=100.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--rss-sources", type=int, default=4)
+    parser.add_argument("--html-sources", type=int, default=2)
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
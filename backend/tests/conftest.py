@@ -0,0 +1,36 @@
+"""Test setup: a throwaway SQLite database and archive directory per test run.
+
+The settings are read when :mod:`app.database` and :mod:`app.services.retention`
+are imported, so they are set here before any test module imports ``app``.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_ROOT = Path(tempfile.mkdtemp(prefix="betterstock-tests-"))
+os.environ["BETTERSTOCK_DATABASE_URL"] = f"sqlite:///{_ROOT / 'betterstock.db'}"
+os.environ["BETTERSTOCK_ARCHIVE_DIR"] = str(_ROOT / "archive")
+os.environ["BETTERSTOCK_EMBEDDED_SCHEDULER"] = "0"
+os.environ.setdefault("BETTERSTOCK_METRICS", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def database():
+    """A freshly initialised database and an empty archive directory."""
+    from app.database import DATABASE_URL, engine, initialize_database
+    from app.services.retention import ARCHIVE_DIR
+
+    engine.dispose()
+    Path(DATABASE_URL.removeprefix("sqlite:///")).unlink(missing_ok=True)
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+    initialize_database(engine)
+    yield engine
+    engine.dispose()
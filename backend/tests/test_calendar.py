@@ -0,0 +1,34 @@
+"""Trading calendar holidays and the warning for years it does not cover."""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime
+
+from app.services import calendar
+from app.services.calendar import EXCHANGE_TZ, TradingCalendar, load_holidays
+
+
+def test_holidays_file_lists_ranges_and_single_days(tmp_path) -> None:
+    path = tmp_path / "holidays.txt"
+    path.write_text("# closures\n2030-01-01\n\n2030-02-04,2030-02-06  # spring festival\n", encoding="utf-8")
+    assert load_holidays(path) == {date(2030, 1, 1), date(2030, 2, 4), date(2030, 2, 5), date(2030, 2, 6)}
+
+
+def test_shipped_calendar_closes_on_listed_holidays() -> None:
+    trading = TradingCalendar()
+    assert not trading.is_trading_day(date(2026, 10, 5))
+    assert trading.is_trading_day(date(2026, 10, 9))
+    assert trading.next_open(datetime(2026, 9, 30, 16, 0, tzinfo=EXCHANGE_TZ)) == datetime(
+        2026, 10, 8, 9, 30, tzinfo=EXCHANGE_TZ
+    )
+
+
+def test_warns_once_for_years_past_the_listed_holidays(caplog, monkeypatch) -> None:
+    monkeypatch.setattr(calendar, "_warned_years", set())
+    trading = TradingCalendar(holidays=frozenset({date(2030, 1, 1)}))
+    with caplog.at_level(logging.WARNING, logger="app.services.calendar"):
+        assert not trading.is_trading_day(date(2030, 1, 1))
+        assert not caplog.records
+        assert trading.is_trading_day(date(2031, 1, 1))
+        assert trading.is_trading_day(date(2031, 1, 2))
+    assert len(caplog.records) == 1 and "2031" in caplog.records[0].getMessage()
@@ -0,0 +1,32 @@
+"""Job requests queued through the API for the scheduler leader."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.models import SchedulerLease
+
+
+def hold_lease() -> None:
+    now = datetime.utcnow()
+    with session_scope() as session:
+        session.add(
+            SchedulerLease(name="scheduler", holder="leader", acquired_at=now, expires_at=now + timedelta(minutes=5))
+        )
+
+
+def test_backfill_requests_join_only_with_the_same_options(database) -> None:
+    with TestClient(app) as client:
+        assert client.post("/news/sentiment/backfill").status_code == 503
+        hold_lease()
+        first = client.post("/news/sentiment/backfill")
+        assert first.status_code == 202 and first.json()["status"] == "pending"
+        again = client.post("/news/sentiment/backfill")
+        assert again.json()["id"] == first.json()["id"]
+        conflict = client.post("/news/sentiment/backfill", params={"replace": "true"})
+        assert conflict.status_code == 409
+        assert first.json()["id"] in conflict.json()["detail"]
+        assert client.get(f"/news/sentiment/backfill/{first.json()['id']}").json()["status"] == "pending"
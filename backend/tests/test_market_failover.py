@@ -0,0 +1,101 @@
+"""FailoverMarketDataProvider: deadline, hedging and stale fallback with fake providers."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Iterable, List
+
+import pytest
+
+from app.services.market import (
+    HEDGE_MIN_SAMPLES,
+    FailoverMarketDataProvider,
+    MarketDataProvider,
+    MarketQuote,
+    MockMarketDataProvider,
+)
+from app.services.snapshot import QuoteSnapshot
+
+SNAPSHOT = asyncio.run(MockMarketDataProvider().fetch_snapshot())
+
+
+class FakeProvider(MarketDataProvider):
+    def __init__(self, delay: float = 0.0, error: Exception | None = None) -> None:
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def fetch_quotes(self, tickers: Iterable[str] | None = None) -> List[MarketQuote]:
+        return (await self.fetch_snapshot(tickers)).to_quotes()
+
+    async def fetch_snapshot(self, tickers: Iterable[str] | None = None) -> QuoteSnapshot:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return SNAPSHOT.select(tickers)
+
+
+def fetch(chain: FailoverMarketDataProvider) -> QuoteSnapshot:
+    return asyncio.run(chain.fetch_snapshot())
+
+
+def test_error_hands_over_to_next_provider_without_hedging() -> None:
+    broken, backup = FakeProvider(error=RuntimeError("down")), FakeProvider()
+    chain = FailoverMarketDataProvider([broken, backup], deadline=5)
+    assert fetch(chain).tickers.tolist() == SNAPSHOT.tickers.tolist()
+    assert (broken.calls, backup.calls) == (1, 1)
+    assert chain.stats[0].errors == 1 and chain.stats[0].last_error == "down"
+    assert chain.stats[1].hedges == 0
+
+
+def test_deadline_bounds_the_whole_fetch() -> None:
+    slow, slower = FakeProvider(delay=5), FakeProvider(delay=5)
+    chain = FailoverMarketDataProvider([slow, slower], deadline=0.3)
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="timed out"):
+        fetch(chain)
+    assert time.perf_counter() - started < 1
+    # Without latency samples the hedge fires at half the deadline.
+    assert slower.calls == 1 and chain.stats[1].hedges == 1
+    assert [stats.timeouts for stats in chain.stats] == [1, 1]
+
+
+def test_hedge_fires_after_the_primary_p95_latency() -> None:
+    primary, backup = FakeProvider(delay=2), FakeProvider()
+    chain = FailoverMarketDataProvider([primary, backup], deadline=5)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        chain.stats[0].succeeded(0.05)
+    started = time.perf_counter()
+    fetch(chain)
+    assert time.perf_counter() - started < 1
+    assert backup.calls == 1 and chain.stats[1].hedges == 1
+    assert chain.stats[1].successes == 1
+
+
+def test_no_hedge_when_the_primary_answers_within_p95() -> None:
+    primary, backup = FakeProvider(delay=0.05), FakeProvider()
+    chain = FailoverMarketDataProvider([primary, backup], deadline=5)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        chain.stats[0].succeeded(1.0)
+    fetch(chain)
+    assert backup.calls == 0 and chain.stats[1].hedges == 0
+
+
+def test_stale_snapshot_is_served_when_every_provider_fails() -> None:
+    provider = FakeProvider()
+    chain = FailoverMarketDataProvider([provider], deadline=5)
+    fresh = fetch(chain)
+    assert fresh.stale_since is None
+    provider.error = RuntimeError("down")
+    stale = fetch(chain)
+    assert stale.stale_since is not None
+    assert stale.tickers.tolist() == fresh.tickers.tolist()
+    subset = asyncio.run(chain.fetch_snapshot([fresh.tickers[0]]))
+    assert subset.tickers.tolist() == [fresh.tickers[0]] and subset.stale_since == stale.stale_since
+
+
+def test_chain_that_never_succeeded_raises() -> None:
+    chain = FailoverMarketDataProvider([FakeProvider(error=RuntimeError("down"))], deadline=5)
+    with pytest.raises(RuntimeError, match="No market data provider succeeded"):
+        fetch(chain)
@@ -0,0 +1,41 @@
+"""Quote stream subscriptions over WebSocket."""
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.routers.market import UNSUPPORTED_DATA
+
+
+def close_code(websocket) -> int:
+    with pytest.raises(WebSocketDisconnect) as closed:
+        while True:
+            websocket.receive_text()
+    return closed.value.code
+
+
+def test_resubscribes_until_a_malformed_frame(database) -> None:
+    with TestClient(app) as client, client.websocket_connect("/market/stream") as websocket:
+        assert json.loads(websocket.receive_text())["type"] == "snapshot"
+        websocket.send_text(json.dumps({"tickers": ["600519"]}))
+        message = json.loads(websocket.receive_text())
+        while message["type"] != "snapshot":
+            message = json.loads(websocket.receive_text())
+        assert set(message["quotes"]) <= {"600519"}
+        websocket.send_text("not json")
+        assert close_code(websocket) == UNSUPPORTED_DATA
+
+
+@pytest.mark.parametrize("frame", ["[1, 2]", '{"tickers": "600519"}', '{"tickers": [600519]}', b"\x00"])
+def test_malformed_frames_close_the_stream(database, frame) -> None:
+    with TestClient(app) as client, client.websocket_connect("/market/stream") as websocket:
+        websocket.receive_text()
+        if isinstance(frame, bytes):
+            websocket.send_bytes(frame)
+        else:
+            websocket.send_text(frame)
+        assert close_code(websocket) == UNSUPPORTED_DATA
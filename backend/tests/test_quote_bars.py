@@ -0,0 +1,69 @@
+"""The market refresh stores each trading day's closing bar for the factor engine."""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+import numpy as np
+
+from app.database import session_scope
+from app.models import QuoteBar
+from app.services.factors import FactorEngine
+from app.services.quote_cache import QUOTE_CACHE
+from app.services.snapshot import QuoteSnapshot
+from app.tasks import scheduler as scheduler_module
+from app.tasks.scheduler import TaskScheduler
+
+# UTC; 2026-10-16 is a Friday, the exchange closes at 15:00 (07:00 UTC).
+AFTER_CLOSE = datetime(2026, 10, 16, 7, 5)
+INTRADAY = datetime(2026, 10, 16, 2, 0)
+
+
+def make_snapshot(as_of: datetime, price: float) -> QuoteSnapshot:
+    return QuoteSnapshot.from_columns(
+        tickers=["600000", "600519", "000001"],
+        names=["浦发银行", "贵州茅台", "平安银行"],
+        industries=["银行", "白酒", "银行"],
+        updated_at=as_of,
+        columns={
+            "price": [price, 10 * price, 0.0],
+            "volume": [1e6, 2e5, 3e6],
+            "amount": [1e7, 2e8, 3e7],
+            "turnover_rate": [0.5, 0.2, 0.8],
+        },
+    )
+
+
+def refresh(monkeypatch, snapshot: QuoteSnapshot) -> None:
+    async def fetched() -> QuoteSnapshot:
+        return snapshot
+
+    async def recorded(snapshot: QuoteSnapshot) -> None:
+        return None
+
+    monkeypatch.setattr(QUOTE_CACHE, "refresh", fetched)
+    monkeypatch.setattr(scheduler_module.INDUSTRY_AGGREGATOR, "record", recorded)
+    asyncio.run(TaskScheduler().refresh_market())
+
+
+def test_refresh_after_the_close_makes_the_factor_engine_ready(database, monkeypatch) -> None:
+    engine = FactorEngine()
+    assert not engine.ready
+    refresh(monkeypatch, make_snapshot(AFTER_CLOSE, 8.0))
+    # A later refresh of the same day replaces the bar instead of adding one.
+    refresh(monkeypatch, make_snapshot(AFTER_CLOSE, 9.0))
+    assert asyncio.run(engine.sync(force=True))
+    assert engine.ready
+    assert engine.panel.dates.tolist() == [np.datetime64("2026-10-16", "D")]
+    # Tickers without a price get no bar.
+    assert engine.panel.tickers.tolist() == ["600000", "600519"]
+    np.testing.assert_allclose(engine.panel["close"][-1], [9.0, 90.0])
+    np.testing.assert_allclose(engine.panel["turnover_rate"][-1], [0.5, 0.2])
+
+
+def test_intraday_and_holiday_refreshes_write_no_bar(database, monkeypatch) -> None:
+    refresh(monkeypatch, make_snapshot(INTRADAY, 8.0))
+    refresh(monkeypatch, make_snapshot(datetime(2026, 10, 5, 8, 0), 8.0))
+    refresh(monkeypatch, make_snapshot(datetime(2026, 10, 17, 8, 0), 8.0))
+    with session_scope() as session:
+        assert session.query(QuoteBar).count() == 0
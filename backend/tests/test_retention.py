@@ -0,0 +1,202 @@
+"""Tiered retention: archiving, watermarks and reads that continue into the archive."""
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+pa = pytest.importorskip("pyarrow")
+
+from app.database import session_scope  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402
+    ArchiveWatermark,
+    BacktestResult,
+    BacktestSeries,
+    ContentBlob,
+    IndustryStat,
+    NewsArticle,
+    SentimentScore,
+    StockQuote,
+    news_stock_association,
+)
+from app.services.backtest import BacktestSummary, Trade  # noqa: E402
+from app.services.backtest_store import series_values  # noqa: E402
+from app.services.content_store import ContentStore  # noqa: E402
+from app.services.export import ExportFilters, export  # noqa: E402
+from app.services.retention import POLICIES, apply_retention, archived_before, read_archive  # noqa: E402
+from app.services.search import search  # noqa: E402
+
+NOW = datetime(2026, 10, 19, 8, 0)
+NEWS_DAYS = POLICIES["news_articles"].days
+BACKTEST_DAYS = POLICIES["backtest_results"].days
+
+
+def add_articles(ages: list[int]) -> None:
+    """One article per age in days, each linked to 600519 and scored once."""
+    with session_scope() as session:
+        stock = session.get(StockQuote, "600519") or StockQuote(ticker="600519", name="贵州茅台")
+        store = ContentStore(session)
+        for number, age in enumerate(ages):
+            article = NewsArticle(
+                source="test",
+                title=f"茅台公告{number}",
+                url=f"https://example.com/{age}/{number}",
+                published_at=NOW - timedelta(days=age, minutes=number),
+                summary="摘要",
+            )
+            article.set_content(f"正文{number} 利润增长", store)
+            article.sentiments.append(SentimentScore(provider="heuristic", sentiment=0.5, confidence=0.8))
+            article.stocks.append(stock)
+            session.add(article)
+
+
+def add_runs(ages: list[int]) -> None:
+    """One backtest run per age in days; run ``n`` has ``n + 2`` daily points and ``n`` trades."""
+    with session_scope() as session:
+        for number, age in enumerate(ages):
+            created_at = NOW - timedelta(days=age)
+            summary = BacktestSummary(
+                strategy_name=f"run{number}",
+                started_at=created_at - timedelta(days=number + 1),
+                ended_at=created_at,
+                total_return=0.1,
+                annualized_return=0.2,
+                max_drawdown=0.05,
+                sharpe_ratio=1.5,
+                trades=[Trade(created_at, "600519", "buy", 0.5) for _ in range(number)],
+                dates=[created_at - timedelta(days=day) for day in range(number + 2)],
+                returns=[0.0] * (number + 2),
+                equity=[1.0] * (number + 2),
+            )
+            session.add(
+                BacktestResult(
+                    strategy_name=summary.strategy_name,
+                    started_at=summary.started_at,
+                    ended_at=summary.ended_at,
+                    total_return=summary.total_return,
+                    annualized_return=summary.annualized_return,
+                    max_drawdown=summary.max_drawdown,
+                    sharpe_ratio=summary.sharpe_ratio,
+                    trades=[],
+                    created_at=created_at,
+                    series=BacktestSeries(**series_values(summary)),
+                )
+            )
+
+
+def test_archive_moves_articles_with_their_children(database) -> None:
+    add_articles([NEWS_DAYS + 10, NEWS_DAYS + 20, 1])
+    moved = apply_retention(["news_articles"], now=NOW, vacuum=False)
+    assert moved == {"news_articles": 2}
+    with session_scope() as session:
+        (kept,) = session.scalars(select(NewsArticle.id)).all()
+        assert session.scalars(select(SentimentScore.article_id)).all() == [kept]
+        assert session.scalars(select(news_stock_association.c.news_id)).all() == [kept]
+        assert [hit.article_id for hit in search(session, "利润")] == [kept]
+        assert session.scalar(select(func.count()).select_from(ContentBlob)) == 1
+    archived = read_archive("news_articles").to_pylist()
+    assert sorted(row["title"] for row in archived) == ["茅台公告0", "茅台公告1"]
+    for row in archived:
+        assert row["content"].endswith("利润增长")
+        assert json.loads(row["tickers"]) == ["600519"]
+        (score,) = json.loads(row["sentiments"])
+        assert score["id"] is not None and score["sentiment"] == 0.5
+
+
+def test_archived_runs_keep_their_counts_as_columns(database) -> None:
+    add_runs([BACKTEST_DAYS + 2, BACKTEST_DAYS + 1, 1])
+    assert apply_retention(["backtest_results"], now=NOW, vacuum=False) == {"backtest_results": 2}
+    with session_scope() as session:
+        assert session.scalar(select(func.count()).select_from(BacktestSeries)) == 1
+    archived = read_archive("backtest_results", ["id", "points", "trade_count", "series_codec"]).to_pylist()
+    assert sorted((row["points"], row["trade_count"]) for row in archived) == [(2, 0), (3, 1)]
+    assert all(row["series_codec"] for row in archived)
+
+
+def test_backtest_runs_page_from_the_database_into_the_archive(database) -> None:
+    add_runs([BACKTEST_DAYS + 3, BACKTEST_DAYS + 2, BACKTEST_DAYS + 1, 1])
+    apply_retention(["backtest_results"], now=NOW, vacuum=False)
+    pages, before = [], None
+    with TestClient(app) as client:
+        while True:
+            response = client.get("/backtest/runs", params={"limit": 3, **({"before": before} if before else {})})
+            assert response.status_code == 200
+            if not response.json():
+                break
+            pages.append(response.json())
+            before = pages[-1][-1]["id"]
+        equity = client.get(f"/backtest/runs/{pages[-1][-1]['id']}/equity").json()
+    runs = [run for page in pages for run in page]
+    assert [len(page) for page in pages] == [3, 1]
+    assert [run["strategy_name"] for run in runs] == ["run3", "run2", "run1", "run0"]
+    assert [(run["points"], run["trade_count"]) for run in runs] == [(5, 3), (4, 2), (3, 1), (2, 0)]
+    assert equity["total"] == 2 and len(equity["equity"]) == 2
+
+
+def test_watermark_only_moves_forward(database) -> None:
+    add_articles([NEWS_DAYS + 30, NEWS_DAYS + 5])
+    apply_retention(["news_articles"], now=NOW - timedelta(days=10), vacuum=False)
+    first = archived_before("news_articles")
+    assert first == NOW - timedelta(days=10 + NEWS_DAYS)
+    apply_retention(["news_articles"], now=NOW - timedelta(days=20), vacuum=False)
+    assert archived_before("news_articles") == first
+    apply_retention(["news_articles"], now=NOW, vacuum=False)
+    assert archived_before("news_articles") == NOW - timedelta(days=NEWS_DAYS)
+    with session_scope() as session:
+        assert session.get(ArchiveWatermark, "news_articles").rows == 2
+        assert session.scalar(select(func.count()).select_from(NewsArticle)) == 0
+
+
+def test_latest_news_pages_from_the_database_into_the_archive(database) -> None:
+    add_articles([NEWS_DAYS + 3, NEWS_DAYS + 2, NEWS_DAYS + 1, 2, 1])
+    apply_retention(["news_articles"], now=NOW, vacuum=False)
+    pages, cursor = [], None
+    with TestClient(app) as client:
+        while True:
+            params = {"limit": 2, "fields": "id,title,sentiments,stocks"}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/news/latest", params=params)
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+    rows = [row for page in pages for row in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row["published_at"] for row in rows] == sorted((row["published_at"] for row in rows), reverse=True)
+    assert len({row["id"] for row in rows}) == 5
+    for row in rows:
+        assert [stock["ticker"] for stock in row["stocks"]] == ["600519"]
+        assert [score["sentiment"] for score in row["sentiments"]] == [0.5]
+
+
+def test_export_reads_archived_rows_first(database) -> None:
+    days = POLICIES["industry_stats"].days
+    with session_scope() as session:
+        for age in (days + 2, days + 1, 1):
+            session.add(IndustryStat(industry=f"age-{age}", as_of=NOW - timedelta(days=age), members=1))
+    add_articles([NEWS_DAYS + 1, 1])
+    apply_retention(["industry_stats", "news_articles"], now=NOW, vacuum=False)
+    with session_scope() as session:
+        assert session.scalar(select(func.count()).select_from(IndustryStat)) == 1
+
+    rows = [json.loads(line) for line in b"".join(export("industry_stats")).decode().splitlines()]
+    assert [row["industry"] for row in rows] == [f"age-{days + 2}", f"age-{days + 1}", "age-1"]
+    table = pa.ipc.open_stream(io.BytesIO(b"".join(export("industry_stats", "arrow")))).read_all()
+    assert table.column("industry").to_pylist() == [row["industry"] for row in rows]
+
+    since = NOW - timedelta(days=days + 1, hours=12)
+    chunks = export("industry_stats", filters=ExportFilters(since=since))
+    recent = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [row["industry"] for row in recent] == [f"age-{days + 1}", "age-1"]
+
+    scores = [json.loads(line) for line in b"".join(export("sentiments")).decode().splitlines()]
+    assert len(scores) == 2 and all(score["id"] is not None for score in scores)
+    assert scores[0]["published_at"] < scores[1]["published_at"]
+
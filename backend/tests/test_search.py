@@ -0,0 +1,50 @@
+"""News search through the index and through the LIKE fallback."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from app.database import session_scope
+from app.models import NewsArticle
+from app.services import search as search_module
+from app.services.content_store import ContentStore
+from app.services.search import search
+
+NOW = datetime(2026, 10, 19, 8, 0)
+
+
+def add_article(title: str, summary: str, body: str, age: int = 0, inline: bool = False) -> int:
+    with session_scope() as session:
+        article = NewsArticle(
+            source="test",
+            title=title,
+            url=f"https://example.com/{title}",
+            published_at=NOW - timedelta(hours=age),
+            summary=summary,
+        )
+        if inline:  # stored before bodies moved to content_blobs
+            article.content = body
+        else:
+            article.set_content(body, ContentStore(session))
+        session.add(article)
+        session.flush()
+        return article.id
+
+
+def test_index_matches_titles_and_bodies(database) -> None:
+    first = add_article("茅台公告", "摘要", "利润增长")
+    with session_scope() as session:
+        assert [hit.article_id for hit in search(session, "利润")] == [first]
+        assert [hit.article_id for hit in search(session, "茅")] == [first]
+
+
+def test_like_fallback_matches_titles_and_summaries_only(database, monkeypatch) -> None:
+    monkeypatch.setattr(search_module, "_has_fts_table", lambda conn: False)
+    newer = add_article("茅台公告", "年度摘要", "利润增长")
+    older = add_article("五粮液公告", "茅台对比", "营收", age=1)
+    add_article("旧公告", "", "利润下滑", age=2, inline=True)
+    with session_scope() as session:
+        assert session.get(NewsArticle, newer)._content is None  # the body is in content_blobs
+        assert [hit.article_id for hit in search(session, "茅台")] == [newer, older]
+        assert [hit.article_id for hit in search(session, "年度")] == [newer]
+        # Bodies are never matched, so legacy inline ones do not give different results.
+        assert search(session, "利润") == []
@@ -0,0 +1,32 @@
+"""Synthetic market: daily returns of the history and the live session roll."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime
+
+import numpy as np
+
+from app.services.simulator import MarketSimulator, SimulatedMarketDataProvider, SimulatorConfig
+
+
+def test_history_turnover_sees_returns_over_the_previous_close(monkeypatch) -> None:
+    simulator = MarketSimulator(SimulatorConfig(n_tickers=20))
+    seen = []
+    turnover = simulator._turnover
+    monkeypatch.setattr(simulator, "_turnover", lambda returns: seen.append(returns.copy()) or turnover(returns))
+    history = simulator.history(30, end=datetime(2026, 10, 16), dtype=np.float64)
+    (returns,) = seen
+    assert np.all(returns[0] == 0.0)
+    np.testing.assert_allclose(returns[1:], history.close[1:] / history.close[:-1] - 1.0)
+
+
+def test_first_fetch_of_a_new_day_rolls_the_reference_close() -> None:
+    provider = SimulatedMarketDataProvider(SimulatorConfig(n_tickers=20))
+    for _ in range(5):
+        asyncio.run(provider.fetch_snapshot())
+    yesterday_close = provider.simulator.universe.price.copy()
+    provider.session_date = date(2000, 1, 3)
+    snapshot = asyncio.run(provider.fetch_snapshot())
+    np.testing.assert_allclose(snapshot.columns["change"], (snapshot.columns["price"] - yesterday_close).round(2))
+    same_day = asyncio.run(provider.fetch_snapshot())
+    np.testing.assert_allclose(same_day.columns["change"], (same_day.columns["price"] - yesterday_close).round(2))